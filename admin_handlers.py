@@ -1,24 +1,61 @@
 """
 Обработчики команд для администраторов
 """
+import asyncio
+import io
+import os
+import tempfile
 from datetime import datetime
+from typing import Dict, Optional, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from database import Database
+from storage import Storage
 from date_utils import format_date
+from query_trace import format_report
+import bulk_io
+import holds
+import ical
+import inline_search
+import media
+import notifications
 import config
 
 
 class AdminHandlers:
     """Класс обработчиков администратора"""
     
-    def __init__(self, db: Database):
+    def __init__(self, db: Storage, calendar_cache: ical.CalendarCache = None,
+                 media_library: media.MediaLibrary = None,
+                 inline_results: inline_search.InlineResultCache = None):
         self.db = db
+        self.calendars = calendar_cache or ical.CalendarCache(db)
+        self.media = media_library or media.MediaLibrary(db)
+        self.inline_results = inline_results or inline_search.InlineResultCache(db)
+        # Альбомы, собираемые по (media_group_id, вид файла)
+        self._albums: Dict[Tuple[str, str], media.PendingAlbum] = {}
     
     def is_admin(self, user_id: int) -> bool:
         """Проверить, является ли пользователь администратором"""
         return user_id in config.ADMIN_IDS or self.db.get_admin(user_id) is not None
     
+    @staticmethod
+    def is_super_admin(user_id: int) -> bool:
+        """Администратор из ADMIN_IDS окружения: видит объекты всех владельцев"""
+        return user_id in config.SUPER_ADMIN_IDS
+    
+    def _scope(self, user_id: int, mine: bool = False) -> Optional[int]:
+        """Владелец, объектами которого ограничен экран (None - все объекты)"""
+        if self.is_super_admin(user_id) and not mine:
+            return None
+        return user_id
+    
+    def _can_manage(self, user_id: int, property_id: int) -> bool:
+        """Может ли администратор управлять объектом (своим или любым для суперадминистратора)"""
+        if self.is_super_admin(user_id):
+            return True
+        property_obj = self.db.get_property(property_id)
+        return property_obj is not None and property_obj.admin_id == user_id
+    
     async def start_admin_from_query(self, query):
         """Начало работы администратора из callback query"""
         keyboard = [
@@ -26,6 +63,7 @@ class AdminHandlers:
             [InlineKeyboardButton("📊 Статистика бронирований", callback_data="admin_stats")],
             [InlineKeyboardButton("👤 Мои контакты", callback_data="admin_contacts")],
             [InlineKeyboardButton("⚙️ Изменить контакты", callback_data="admin_edit_contacts")],
+            [InlineKeyboardButton("🔔 Уведомления", callback_data="admin_notifications")],
             [InlineKeyboardButton("🏠 Список объектов (пользователь)", callback_data="user_properties")],
             [InlineKeyboardButton("📅 Мои бронирования (пользователь)", callback_data="user_bookings")]
         ]
@@ -54,6 +92,7 @@ class AdminHandlers:
             [InlineKeyboardButton("📊 Статистика бронирований", callback_data="admin_stats")],
             [InlineKeyboardButton("👤 Мои контакты", callback_data="admin_contacts")],
             [InlineKeyboardButton("⚙️ Изменить контакты", callback_data="admin_edit_contacts")],
+            [InlineKeyboardButton("🔔 Уведомления", callback_data="admin_notifications")],
             [InlineKeyboardButton("🏠 Список объектов (пользователь)", callback_data="user_properties")],
             [InlineKeyboardButton("📅 Мои бронирования (пользователь)", callback_data="user_bookings")]
         ]
@@ -80,6 +119,173 @@ class AdminHandlers:
         else:
             await update.message.reply_text("❌ Ошибка при регистрации администратора.")
     
+    async def query_report(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Отчет по самым затратным SQL-запросам: /query_report [on|off|reset]"""
+        user_id = update.effective_user.id
+        
+        if not self.is_admin(user_id):
+            await update.message.reply_text("❌ У вас нет прав администратора.")
+            return
+        
+        action = context.args[0].lower() if context.args else None
+        if action in ("on", "off"):
+            self.db.set_tracing(action == "on")
+            await update.message.reply_text(
+                f"✅ Трассировка запросов {'включена' if action == 'on' else 'выключена'}."
+            )
+            return
+        if action == "reset":
+            self.db.reset_query_stats()
+            await update.message.reply_text("✅ Статистика запросов сброшена.")
+            return
+        
+        text = "🐢 Самые затратные запросы\n\n"
+        if not self.db.trace_enabled:
+            text += "Трассировка выключена. Включите: /query_report on\n\n"
+        text += format_report(self.db.get_query_stats())
+        
+        # Ограничение длины сообщения Telegram
+        await update.message.reply_text(text[:4000])
+    
+    async def rebuild_stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Пересчитать счетчики статистики: /rebuild_stats"""
+        if not self.is_admin(update.effective_user.id):
+            await update.message.reply_text("❌ У вас нет прав администратора.")
+            return
+        
+        if self.db.rebuild_property_stats():
+            await update.message.reply_text("✅ Статистика пересчитана.")
+        else:
+            await update.message.reply_text("❌ Ошибка при пересчете статистики.")
+    
+    async def analytics(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Аналитика загрузки с CSV: /analytics [DD.MM.YYYY [DD.MM.YYYY]]"""
+        if not self.is_admin(update.effective_user.id):
+            await update.message.reply_text("❌ У вас нет прав администратора.")
+            return
+        
+        # NumPy загружается только при первом обращении к аналитике
+        import analytics
+        try:
+            start, end = analytics.parse_period(context.args or [])
+        except ValueError:
+            await update.message.reply_text("❌ Используйте: /analytics [DD.MM.YYYY [DD.MM.YYYY]]")
+            return
+        if end < start:
+            await update.message.reply_text("❌ Дата окончания периода раньше даты начала.")
+            return
+        report = await self._send_analytics_csv(update.message, start, end, self._scope(update.effective_user.id))
+        await update.message.reply_text(report.summary())
+    
+    async def _send_analytics_csv(self, message, start, end, admin_id: Optional[int]):
+        """Рассчитать аналитику за период и отправить CSV. Возвращает отчет"""
+        import analytics
+        loop = asyncio.get_running_loop()
+        report = await loop.run_in_executor(None, analytics.compute_occupancy, self.db, start, end, admin_id)
+        buffer = io.StringIO()
+        report.write_csv(buffer)
+        await message.reply_document(
+            document=buffer.getvalue().encode('utf-8'),
+            filename=f"occupancy_{start:%Y%m%d}_{end:%Y%m%d}.csv",
+            caption=f"📈 Загрузка с {start:%d.%m.%Y} по {end:%d.%m.%Y}"
+        )
+        return report
+    
+    async def export_bookings(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Экспорт бронирований: /export_bookings [csv|json]"""
+        await self._export(update, context, 'bookings')
+    
+    async def export_properties(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Экспорт объектов: /export_properties [csv|json]"""
+        await self._export(update, context, 'properties')
+    
+    async def _export(self, update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str):
+        """Выгрузить данные в файл и отправить его документом (только свои объекты, кроме суперадминистратора)"""
+        user_id = update.effective_user.id
+        if not self.is_admin(user_id):
+            await update.message.reply_text("❌ У вас нет прав администратора.")
+            return
+        
+        fmt = context.args[0].lower() if context.args else 'csv'
+        if fmt not in bulk_io.FORMATS:
+            await update.message.reply_text("❌ Формат должен быть csv или json.")
+            return
+        
+        fd, path = tempfile.mkstemp(suffix=f'.{fmt}')
+        os.close(fd)
+        try:
+            # Запись файла идет построчно в отдельном потоке, чтобы не блокировать бота
+            count = await asyncio.get_running_loop().run_in_executor(
+                None, bulk_io.export_file, self.db, kind, path, fmt, self._scope(user_id)
+            )
+            with open(path, 'rb') as document:
+                await update.message.reply_document(
+                    document=document,
+                    filename=f"{kind}_{datetime.now():%Y%m%d_%H%M%S}.{fmt}",
+                    caption=f"📦 Экспортировано строк: {count}"
+                )
+        finally:
+            os.remove(path)
+    
+    async def import_bookings(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Импорт бронирований: команда, затем файл CSV/JSON"""
+        await self._import_start(update, context, 'bookings')
+    
+    async def import_properties(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Импорт объектов: команда, затем файл CSV/JSON"""
+        await self._import_start(update, context, 'properties')
+    
+    async def _import_start(self, update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str):
+        """Начать импорт: ожидаем файл от администратора"""
+        if not self.is_admin(update.effective_user.id):
+            await update.message.reply_text("❌ У вас нет прав администратора.")
+            return
+        
+        context.user_data['waiting_for_import'] = kind
+        fields = bulk_io.BOOKING_FIELDS if kind == 'bookings' else bulk_io.PROPERTY_FIELDS
+        await update.message.reply_text(
+            "📥 Отправьте файл .csv или .json для импорта.\n\n"
+            f"Поля: {', '.join(fields)}"
+        )
+    
+    async def handle_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработка файла импорта от администратора"""
+        user_id = update.effective_user.id
+        
+        if not self.is_admin(user_id):
+            return
+        
+        kind = context.user_data.pop('waiting_for_import', None)
+        if not kind:
+            return
+        
+        document = update.message.document
+        fmt = 'ics' if kind == 'ical' else bulk_io.detect_format(document.file_name)
+        fd, path = tempfile.mkstemp(suffix=f'.{fmt}')
+        os.close(fd)
+        try:
+            telegram_file = await context.bot.get_file(document.file_id)
+            await telegram_file.download_to_drive(path)
+            if kind == 'ical':
+                property_id = context.user_data.pop('waiting_for_import_property', None)
+                result = await asyncio.get_running_loop().run_in_executor(
+                    None, ical.import_ics, self.db, property_id, user_id, path
+                )
+            else:
+                # Администратор импортирует только в свои объекты, суперадминистратор - в любые
+                result = await asyncio.get_running_loop().run_in_executor(
+                    None, bulk_io.import_file, self.db, kind, path, fmt, self._scope(user_id)
+                )
+        except (ValueError, UnicodeDecodeError) as e:
+            await update.message.reply_text(f"❌ Не удалось прочитать файл: {e}")
+            return
+        finally:
+            os.remove(path)
+        
+        if kind == 'properties' and result.inserted:
+            self.inline_results.invalidate()
+        await update.message.reply_text(f"✅ Импорт завершен\n\n{result.summary()}")
+    
     async def admin_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обработка callback от администратора"""
         query = update.callback_query
@@ -92,16 +298,33 @@ class AdminHandlers:
         
         data = query.data
         
+        # Объект другого владельца недоступен (кроме суперадминистратора)
+        if data.startswith(("admin_property_", "admin_delete_property_", "admin_edit_property_",
+                            "admin_ical_", "admin_icalimport_")):
+            if not self._can_manage(user_id, int(data.split("_")[-1])):
+                await query.edit_message_text("❌ Это объект другого владельца.")
+                return
+        
         if data == "admin_back":
             await self.start_admin_from_query(query)
-        elif data == "admin_properties":
-            await self._show_properties_menu(query)
-        elif data == "admin_stats":
-            await self._show_statistics(query)
+        elif data in ("admin_properties", "admin_properties_mine"):
+            await self._show_properties_menu(query, mine=data.endswith("_mine"))
+        elif data in ("admin_stats", "admin_stats_mine"):
+            await self._show_statistics(query, mine=data.endswith("_mine"))
+        elif data == "admin_analytics":
+            await self._show_analytics(query)
+        elif data == "admin_analytics_csv":
+            import analytics
+            start, end = analytics.default_period()
+            await self._send_analytics_csv(query.message, start, end, self._scope(user_id))
         elif data == "admin_contacts":
             await self._show_contacts(query)
         elif data == "admin_edit_contacts":
             await self._edit_contacts(query)
+        elif data == "admin_notifications":
+            await self._show_notification_settings(query)
+        elif data.startswith("admin_notify_"):
+            await self._set_notification_mode(query, data[len("admin_notify_"):])
         # Обработка пользовательских callback для администратора
         elif data == "user_properties" or data == "user_bookings":
             # Перенаправляем на пользовательские обработчики
@@ -129,13 +352,30 @@ class AdminHandlers:
             action = parts[-2]
             await self._edit_property_action(query, property_id, action, context)
         elif data.startswith("admin_booking_"):
-            booking_id = int(data.split("_")[-1])
-            action = data.split("_")[-2]
-            await self._booking_action(query, booking_id, action)
+            # admin_booking_<действие>[_mine]_<id>: _mine - экран только своих объектов
+            parts = data.split("_")
+            booking_id = int(parts[-1])
+            mine = parts[-2] == "mine"
+            action = parts[-3] if mine else parts[-2]
+            await self._booking_action(query, booking_id, action, mine)
+        elif data.startswith("admin_ical_"):
+            property_id = int(data.split("_")[-1])
+            await self._send_calendar(query, property_id)
+        elif data.startswith("admin_icalimport_"):
+            property_id = int(data.split("_")[-1])
+            context.user_data['waiting_for_import'] = 'ical'
+            context.user_data['waiting_for_import_property'] = property_id
+            await query.edit_message_text(
+                "📥 Импорт календаря\n\n"
+                "Отправьте файл .ics. Занятые даты из него будут добавлены как бронирования, "
+                "пересекающиеся с существующими - пропущены."
+            )
     
-    async def _show_properties_menu(self, query):
-        """Показать меню управления объектами"""
-        properties = self.db.get_all_properties()
+    async def _show_properties_menu(self, query, mine: bool = False):
+        """Показать меню управления объектами (свои объекты, суперадминистратору - все)"""
+        user_id = query.from_user.id
+        admin_id = self._scope(user_id, mine)
+        properties = self.db.get_all_properties() if admin_id is None else self.db.get_admin_properties(admin_id)
         
         keyboard = []
         for prop in properties:
@@ -147,6 +387,9 @@ class AdminHandlers:
             ])
         
         keyboard.append([InlineKeyboardButton("➕ Добавить объект", callback_data="admin_add_property")])
+        if self.is_super_admin(user_id):
+            keyboard.append([InlineKeyboardButton("🌐 Все объекты", callback_data="admin_properties") if mine
+                             else InlineKeyboardButton("👤 Только мои", callback_data="admin_properties_mine")])
         keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="admin_back")])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
@@ -166,19 +409,20 @@ class AdminHandlers:
             await query.edit_message_text("❌ Объект не найден.")
             return
         
-        photos = self.db.get_property_photos(property_id)
-        videos = self.db.get_property_videos(property_id)
+        manifest = self.media.get_manifest(property_id)
         
         text = f"🏠 {property_obj.name}\n\n"
         if property_obj.description:
             text += f"📄 Описание:\n{property_obj.description}\n\n"
-        text += f"📷 Фотографий: {len(photos)}/{config.MAX_PHOTOS}\n"
-        text += f"🎥 Видео: {len(videos)}/{config.MAX_VIDEOS}\n"
+        text += f"📷 Фотографий: {len(manifest.photos)}/{config.MAX_PHOTOS}\n"
+        text += f"🎥 Видео: {len(manifest.videos)}/{config.MAX_VIDEOS}\n"
         
         keyboard = [
             [InlineKeyboardButton("✏️ Изменить описание", callback_data=f"admin_edit_property_desc_{property_id}")],
             [InlineKeyboardButton("📷 Управление фото", callback_data=f"admin_edit_property_photos_{property_id}")],
             [InlineKeyboardButton("🎥 Управление видео", callback_data=f"admin_edit_property_videos_{property_id}")],
+            [InlineKeyboardButton("📆 Календарь .ics", callback_data=f"admin_ical_{property_id}"),
+             InlineKeyboardButton("📥 Импорт .ics", callback_data=f"admin_icalimport_{property_id}")],
             [InlineKeyboardButton("🗑️ Удалить объект", callback_data=f"admin_delete_property_{property_id}")],
             [InlineKeyboardButton("◀️ Назад", callback_data="admin_properties")]
         ]
@@ -186,6 +430,19 @@ class AdminHandlers:
         
         await query.edit_message_text(text, reply_markup=reply_markup)
     
+    async def _send_calendar(self, query, property_id: int):
+        """Отправить календарь объекта файлом .ics"""
+        feed = self.calendars.get_feed(property_id)
+        if feed is None:
+            await query.edit_message_text("❌ Объект не найден.")
+            return
+        _, body = feed
+        await query.message.reply_document(
+            document=body,
+            filename=f"property_{property_id}.ics",
+            caption="📆 Календарь бронирований"
+        )
+    
     async def _add_property_start(self, query, context: ContextTypes.DEFAULT_TYPE):
         """Начать добавление объекта"""
         context.user_data['waiting_for_property_name'] = True
@@ -197,6 +454,8 @@ class AdminHandlers:
     async def _delete_property(self, query, property_id: int):
         """Удалить объект"""
         if self.db.delete_property(property_id):
+            self.media.invalidate(property_id)
+            self.inline_results.invalidate(property_id)
             await query.edit_message_text("✅ Объект успешно удален.")
         else:
             await query.edit_message_text("❌ Ошибка при удалении объекта.")
@@ -213,18 +472,20 @@ class AdminHandlers:
             context.user_data['waiting_for_property_photo'] = property_id
             await query.edit_message_text(
                 "📷 Управление фотографиями\n\n"
-                "Отправьте фотографию для добавления (максимум 10 штук)."
+                f"Отправьте фотографию или альбом для добавления (максимум {config.MAX_PHOTOS} штук)."
             )
         elif action == "videos":
             context.user_data['waiting_for_property_video'] = property_id
             await query.edit_message_text(
                 "🎥 Управление видео\n\n"
-                "Отправьте видео для добавления (максимум 2 штуки)."
+                f"Отправьте видео или альбом для добавления (максимум {config.MAX_VIDEOS} шт.)."
             )
     
-    async def _show_statistics(self, query):
-        """Показать статистику бронирований"""
-        stats = self.db.get_booking_statistics()
+    async def _show_statistics(self, query, mine: bool = False):
+        """Показать статистику бронирований (своих объектов, суперадминистратору - всех)"""
+        user_id = query.from_user.id
+        admin_id = self._scope(user_id, mine)
+        stats = self.db.get_booking_statistics(admin_id)
         
         text = "📊 Статистика бронирований\n\n"
         
@@ -234,57 +495,71 @@ class AdminHandlers:
             for stat in stats:
                 text += f"🏠 {stat['property_name']}\n"
                 text += f"   Бронирований: {stat['bookings_count']}\n"
-                text += f"   С оплатой: {stat['paid_count']}\n\n"
+                text += f"   С оплатой: {stat['paid_count']}\n"
+                text += f"   Ночей: {stat['booked_nights']}\n\n"
         
-        # Получаем все бронирования для детального просмотра
-        all_bookings = []
-        for prop in self.db.get_all_properties():
-            bookings = self.db.get_property_bookings(prop.id)
-            all_bookings.extend(bookings)
+        # Ближайшие бронирования объектов одним запросом (первые 10)
+        bookings = self.db.get_admin_bookings(admin_id, limit=10)
         
-        if all_bookings:
+        keyboard = []
+        if bookings:
             text += "\n📋 Детали бронирований:\n\n"
-            for booking in all_bookings[:10]:  # Показываем первые 10
-                prop = self.db.get_property(booking.property_id)
-                text += f"🏠 {prop.name if prop else 'Неизвестно'}\n"
+            for booking, property_name in bookings:
+                text += f"🏠 {property_name}\n"
                 text += f"   Период: {format_date(booking.start_date)} - {format_date(booking.end_date)}\n"
                 user_info = booking.user_username or booking.user_phone or f"ID: {booking.user_id}"
                 text += f"   Пользователь: {user_info}\n"
-                text += f"   Оплата: {'✅' if booking.advance_paid else '❌'}\n\n"
+                text += f"   Оплата: {'✅' if booking.advance_paid else '❌'}\n"
+                if booking.expires_at:
+                    text += f"   ⏳ Бронь до: {holds.format_expiry(booking.expires_at)}\n"
+                text += "\n"
                 
-                keyboard = [
-                    [InlineKeyboardButton(
-                        f"{'❌' if booking.advance_paid else '✅'} Оплата",
-                        callback_data=f"admin_booking_payment_{booking.id}"
-                    )]
-                ]
-        
-        keyboard = [[InlineKeyboardButton("◀️ Назад", callback_data="admin_back")]]
+                keyboard.append([
+                    InlineKeyboardButton(
+                        f"{'❌' if booking.advance_paid else '✅'} Оплата: {property_name}, {format_date(booking.start_date)}",
+                        callback_data=f"admin_booking_payment_{'mine_' if mine else ''}{booking.id}"
+                    )
+                ])
+        
+        keyboard.append([InlineKeyboardButton("📈 Аналитика загрузки", callback_data="admin_analytics")])
+        if self.is_super_admin(user_id):
+            keyboard.append([InlineKeyboardButton("🌐 Все объекты", callback_data="admin_stats") if mine
+                             else InlineKeyboardButton("👤 Только мои", callback_data="admin_stats_mine")])
+        keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="admin_back")])
         reply_markup = InlineKeyboardMarkup(keyboard)
         
         await query.edit_message_text(text, reply_markup=reply_markup)
     
-    async def _booking_action(self, query, booking_id: int, action: str):
-        """Действие с бронированием"""
+    async def _show_analytics(self, query):
+        """Показать загрузку объектов за последние 12 месяцев"""
+        import analytics
+        start, end = analytics.default_period()
+        report = await asyncio.get_running_loop().run_in_executor(
+            None, analytics.compute_occupancy, self.db, start, end, self._scope(query.from_user.id)
+        )
+        text = report.summary(limit=10)
+        text += "\nДругой период: /analytics DD.MM.YYYY DD.MM.YYYY"
+        keyboard = [
+            [InlineKeyboardButton("📄 Выгрузить CSV", callback_data="admin_analytics_csv")],
+            [InlineKeyboardButton("◀️ Назад", callback_data="admin_stats")]
+        ]
+        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+    
+    async def _booking_action(self, query, booking_id: int, action: str, mine: bool = False):
+        """Действие с бронированием (mine - вернуться к статистике только своих объектов)"""
         if action == "payment":
             # Переключаем статус оплаты
-            booking = None
-            for prop in self.db.get_all_properties():
-                bookings = self.db.get_property_bookings(prop.id)
-                for b in bookings:
-                    if b.id == booking_id:
-                        booking = b
-                        break
-                if booking:
-                    break
+            booking = self.db.get_booking(booking_id)
+            if booking is None or not self._can_manage(query.from_user.id, booking.property_id):
+                await query.answer("❌ Бронирование не найдено")
+                return
             
-            if booking:
-                new_status = not booking.advance_paid
-                if self.db.set_advance_paid(booking_id, new_status):
-                    await query.answer(f"Статус оплаты изменен на {'оплачено' if new_status else 'не оплачено'}")
-                    await self._show_statistics(query)
-                else:
-                    await query.answer("Ошибка при изменении статуса оплаты")
+            new_status = not booking.advance_paid
+            if self.db.set_advance_paid(booking_id, new_status):
+                await query.answer(f"Статус оплаты изменен на {'оплачено' if new_status else 'не оплачено'}")
+                await self._show_statistics(query, mine=mine)
+            else:
+                await query.answer("Ошибка при изменении статуса оплаты")
     
     async def _show_contacts(self, query):
         """Показать контакты администратора"""
@@ -303,6 +578,37 @@ class AdminHandlers:
         
         await query.edit_message_text(text, reply_markup=reply_markup)
     
+    async def _show_notification_settings(self, query):
+        """Показать настройку уведомлений о новых бронированиях"""
+        admin = self.db.get_admin(query.from_user.id)
+        current = admin.notifications if admin else notifications.OWN
+        text = (
+            "🔔 Уведомления о новых бронированиях\n\n"
+            "Только мои объекты - бронирования объектов, которыми вы владеете.\n"
+            "Все бронирования - бронирования всех объектов бота.\n\n"
+            f"Сейчас: {notifications.MODES.get(current, current)}"
+        )
+        keyboard = [
+            [InlineKeyboardButton(f"{'✅ ' if mode == current else ''}{title}",
+                                  callback_data=f"admin_notify_{mode}")]
+            for mode, title in notifications.MODES.items()
+        ]
+        keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="admin_back")])
+        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+    
+    async def _set_notification_mode(self, query, mode: str):
+        """Сохранить настройку уведомлений"""
+        if mode not in notifications.MODES:
+            return
+        user_id = query.from_user.id
+        # Администраторы из ADMIN_IDS могут не иметь записи в таблице
+        if self.db.get_admin(user_id) is None:
+            self.db.add_admin(user_id, telegram_username=query.from_user.username)
+        if self.db.set_admin_notifications(user_id, mode):
+            await self._show_notification_settings(query)
+        else:
+            await query.edit_message_text("❌ Ошибка при сохранении настройки.")
+    
     async def _edit_contacts(self, query):
         """Редактирование контактов"""
         await query.edit_message_text(
@@ -325,6 +631,7 @@ class AdminHandlers:
         if context.user_data.get('waiting_for_property_name'):
             property_id = self.db.add_property(text, user_id)
             if property_id:
+                self.inline_results.invalidate(property_id)
                 await update.message.reply_text(f"✅ Объект '{text}' успешно добавлен!")
                 context.user_data.pop('waiting_for_property_name', None)
             else:
@@ -335,6 +642,7 @@ class AdminHandlers:
         property_id = context.user_data.get('waiting_for_property_description')
         if property_id:
             if self.db.update_property_description(property_id, text):
+                self.inline_results.invalidate(property_id)
                 await update.message.reply_text("✅ Описание успешно обновлено!")
                 context.user_data.pop('waiting_for_property_description', None)
             else:
@@ -351,18 +659,12 @@ class AdminHandlers:
         # Проверяем, ожидаем ли мы фотографию для объекта
         property_id = context.user_data.get('waiting_for_property_photo')
         if property_id:
-            file_id = update.message.photo[-1].file_id
-            
-            if self.db.add_property_photo(property_id, file_id):
-                photos_count = len(self.db.get_property_photos(property_id))
-                await update.message.reply_text(
-                    f"✅ Фотография добавлена! ({photos_count}/{config.MAX_PHOTOS})"
-                )
-            else:
-                await update.message.reply_text(
-                    f"❌ Не удалось добавить фотографию. "
-                    f"Максимум {config.MAX_PHOTOS} фотографий на объект."
-                )
+            photo = update.message.photo[-1]
+            if update.message.media_group_id:
+                self._buffer_album(update, context, property_id, media.PHOTO,
+                                   photo.file_id, photo.file_unique_id)
+                return
+            await self._add_media(update, property_id, media.PHOTO, photo.file_id, photo.file_unique_id)
             context.user_data.pop('waiting_for_property_photo', None)
             return
     
@@ -376,17 +678,72 @@ class AdminHandlers:
         # Проверяем, ожидаем ли мы видео для объекта
         property_id = context.user_data.get('waiting_for_property_video')
         if property_id:
-            file_id = update.message.video.file_id
-            
-            if self.db.add_property_video(property_id, file_id):
-                videos_count = len(self.db.get_property_videos(property_id))
-                await update.message.reply_text(
-                    f"✅ Видео добавлено! ({videos_count}/{config.MAX_VIDEOS})"
-                )
-            else:
-                await update.message.reply_text(
-                    f"❌ Не удалось добавить видео. "
-                    f"Максимум {config.MAX_VIDEOS} видео на объект."
-                )
+            video = update.message.video
+            if update.message.media_group_id:
+                self._buffer_album(update, context, property_id, media.VIDEO,
+                                   video.file_id, video.file_unique_id)
+                return
+            await self._add_media(update, property_id, media.VIDEO, video.file_id, video.file_unique_id)
             context.user_data.pop('waiting_for_property_video', None)
             return
+    
+    def _buffer_album(self, update: Update, context: ContextTypes.DEFAULT_TYPE, property_id: int,
+                      kind: str, file_id: str, file_unique_id: str):
+        """
+        Отложить файл альбома. Альбом сохраняется, когда MEDIA_GROUP_WAIT_SECONDS
+        не приходит новых файлов с тем же media_group_id
+        """
+        key = (update.message.media_group_id, kind)
+        album = self._albums.get(key)
+        if album is None:
+            album = self._albums[key] = media.PendingAlbum(property_id, kind, update.effective_chat.id)
+        else:
+            album.job.schedule_removal()
+        album.items.append((file_id, file_unique_id))
+        album.job = context.job_queue.run_once(
+            self._flush_album, config.MEDIA_GROUP_WAIT_SECONDS, data=key,
+            chat_id=update.effective_chat.id, user_id=update.effective_user.id
+        )
+    
+    async def _flush_album(self, context: ContextTypes.DEFAULT_TYPE):
+        """Сохранить собранный альбом и ответить один раз"""
+        album = self._albums.pop(context.job.data, None)
+        if album is None:
+            return
+        loop = asyncio.get_running_loop()
+        added, duplicates, over_limit = await loop.run_in_executor(
+            None, self.media.add_many, album.property_id, album.kind, album.items
+        )
+        waiting_key = 'waiting_for_property_photo' if album.kind == media.PHOTO else 'waiting_for_property_video'
+        context.user_data.pop(waiting_key, None)
+        
+        count = len(self.media.get_manifest(album.property_id).items(album.kind))
+        label = "Фотографий" if album.kind == media.PHOTO else "Видео"
+        text = f"✅ Добавлено из альбома: {added} из {len(album.items)}\n"
+        text += f"{label} у объекта: {count}/{self.media.limit(album.kind)}"
+        if duplicates:
+            text += f"\nℹ️ Уже были добавлены: {duplicates}"
+        if over_limit:
+            text += f"\n❌ Не поместились в лимит: {over_limit}"
+        await context.bot.send_message(album.chat_id, text)
+    
+    async def _add_media(self, update: Update, property_id: int, kind: str,
+                         file_id: str, file_unique_id: str):
+        """Добавить фотографию или видео и сообщить результат"""
+        label = "Фотография" if kind == media.PHOTO else "Видео"
+        limit = self.media.limit(kind)
+        result = self.media.add(property_id, kind, file_id, file_unique_id)
+        if result == media.ADDED:
+            count = len(self.media.get_manifest(property_id).items(kind))
+            suffix = "добавлена" if kind == media.PHOTO else "добавлено"
+            await update.message.reply_text(f"✅ {label} {suffix}! ({count}/{limit})")
+        elif result == media.DUPLICATE:
+            suffix = "уже добавлена" if kind == media.PHOTO else "уже добавлено"
+            await update.message.reply_text(f"ℹ️ {label} {suffix} к этому объекту.")
+        else:
+            what = "фотографию" if kind == media.PHOTO else "видео"
+            limit_text = f"{limit} фотографий" if kind == media.PHOTO else f"{limit} видео"
+            await update.message.reply_text(
+                f"❌ Не удалось добавить {what}. "
+                f"Максимум {limit_text} на объект."
+            )
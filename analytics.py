@@ -0,0 +1,188 @@
+"""
+Аналитика загрузки объектов: доля занятых дней, ночи, срок бронирования заранее и длительность
+проживания по объектам и месяцам. Расчет векторный (NumPy), без циклов по бронированиям.
+"""
+import csv
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import IO, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from storage import Storage
+
+CSV_FIELDS = ['property_id', 'property_name', 'month', 'days', 'booked_nights', 'occupancy',
+              'bookings', 'avg_lead_days', 'avg_stay_days']
+
+
+def default_period(today: date = None) -> Tuple[date, date]:
+    """Последние 12 месяцев, включая текущий"""
+    today = today or date.today()
+    month = np.datetime64(today, 'M')
+    start = (month - 11).astype('datetime64[D]').item()
+    end = ((month + 1).astype('datetime64[D]') - 1).item()
+    return start, end
+
+
+@dataclass
+class OccupancyReport:
+    """
+    Показатели по объектам (строки) и месяцам периода (столбцы).
+    Бронирование занимает дни с даты заезда по дату выезда включительно (как в календаре),
+    каждый занятый день считается ночью. Срок заранее и длительность относятся к месяцу заезда.
+    """
+    start: date
+    end: date
+    property_ids: np.ndarray
+    property_names: List[str]
+    months: np.ndarray          # datetime64[M]
+    days: np.ndarray            # дней периода в каждом месяце
+    nights: np.ndarray          # занятых дней: объекты x месяцы
+    bookings: np.ndarray        # заездов
+    lead_days: np.ndarray       # сумма дней между созданием брони и заездом
+    stay_days: np.ndarray       # сумма длительностей проживания
+
+    @staticmethod
+    def _ratio(numerator, denominator) -> np.ndarray:
+        numerator = np.asarray(numerator, dtype=float)
+        denominator = np.asarray(denominator, dtype=float)
+        return np.divide(numerator, denominator, out=np.zeros_like(numerator), where=denominator > 0)
+
+    def totals(self) -> Iterator[dict]:
+        """Итоги по объектам за весь период"""
+        nights = self.nights.sum(axis=1)
+        bookings = self.bookings.sum(axis=1)
+        occupancy = self._ratio(nights, self.days.sum())
+        lead = self._ratio(self.lead_days.sum(axis=1), bookings)
+        stay = self._ratio(self.stay_days.sum(axis=1), bookings)
+        for i, property_id in enumerate(self.property_ids.tolist()):
+            yield {
+                'property_id': property_id,
+                'property_name': self.property_names[i],
+                'month': 'всего',
+                'days': int(self.days.sum()),
+                'booked_nights': int(nights[i]),
+                'occupancy': round(float(occupancy[i]), 4),
+                'bookings': int(bookings[i]),
+                'avg_lead_days': round(float(lead[i]), 1),
+                'avg_stay_days': round(float(stay[i]), 1),
+            }
+
+    def monthly(self) -> Iterator[dict]:
+        """Показатели по объектам и месяцам"""
+        occupancy = self._ratio(self.nights, np.broadcast_to(self.days, self.nights.shape))
+        lead = self._ratio(self.lead_days, self.bookings)
+        stay = self._ratio(self.stay_days, self.bookings)
+        month_names = [str(month) for month in self.months]
+        for i, property_id in enumerate(self.property_ids.tolist()):
+            for j, month in enumerate(month_names):
+                yield {
+                    'property_id': property_id,
+                    'property_name': self.property_names[i],
+                    'month': month,
+                    'days': int(self.days[j]),
+                    'booked_nights': int(self.nights[i, j]),
+                    'occupancy': round(float(occupancy[i, j]), 4),
+                    'bookings': int(self.bookings[i, j]),
+                    'avg_lead_days': round(float(lead[i, j]), 1),
+                    'avg_stay_days': round(float(stay[i, j]), 1),
+                }
+
+    def write_csv(self, out: IO[str]) -> int:
+        """Записать помесячные строки и итоги по объектам в CSV. Возвращает число строк"""
+        writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+        count = 0
+        for row in self.monthly():
+            writer.writerow(row)
+            count += 1
+        for row in self.totals():
+            writer.writerow(row)
+            count += 1
+        return count
+
+    def summary(self, limit: int = 20) -> str:
+        """Краткий текстовый отчет по объектам"""
+        text = (f"📈 Загрузка с {self.start:%d.%m.%Y} по {self.end:%d.%m.%Y}\n"
+                f"Дней в периоде: {int(self.days.sum())}\n\n")
+        rows = sorted(self.totals(), key=lambda row: row['occupancy'], reverse=True)
+        if not rows:
+            return text + "Нет объектов."
+        for row in rows[:limit]:
+            text += (
+                f"🏠 {row['property_name']}\n"
+                f"   Загрузка: {row['occupancy']:.0%} ({row['booked_nights']} ноч.)\n"
+                f"   Заездов: {row['bookings']}\n"
+                f"   Бронируют за: {row['avg_lead_days']:.1f} дн., проживание: {row['avg_stay_days']:.1f} дн.\n\n"
+            )
+        if len(rows) > limit:
+            text += f"... и еще объектов: {len(rows) - limit}\n"
+        return text
+
+
+def compute_occupancy(db: Storage, start: date, end: date, admin_id: Optional[int] = None) -> OccupancyReport:
+    """Рассчитать показатели объектов за период [start, end] (admin_id - только объекты владельца)"""
+    if end < start:
+        raise ValueError("Дата окончания периода раньше даты начала")
+    if admin_id is None:
+        properties = sorted((row['id'], row['name']) for row in db.iter_properties())
+    else:
+        properties = [(prop.id, prop.name) for prop in db.get_admin_properties(admin_id)]
+    property_ids = np.array([property_id for property_id, _ in properties], dtype=np.int64)
+    names = [name for _, name in properties]
+
+    first = np.datetime64(start, 'D')
+    last = np.datetime64(end, 'D')
+    n_days = int((last - first).astype(int)) + 1
+    day_months = np.arange(first, last + 1).astype('datetime64[M]')
+    months, month_starts, days = np.unique(day_months, return_index=True, return_counts=True)
+    n_props, n_months = len(property_ids), len(months)
+
+    spans = db.get_booking_day_spans(datetime.combine(start, datetime.min.time()),
+                                      datetime.combine(end, datetime.min.time()))
+    spans = np.array(spans, dtype=np.int64).reshape(-1, 4)
+    # Бронирования удаленных и чужих объектов не учитываются
+    index = np.searchsorted(property_ids, spans[:, 0])
+    known = index < n_props
+    known[known] = property_ids[index[known]] == spans[known, 0]
+    index, spans = index[known], spans[known]
+    offset = int(first.astype(int))
+    begin, finish, created = spans[:, 1] - offset, spans[:, 2] - offset, spans[:, 3] - offset
+
+    # Занятость по дням: +1 в день заезда и -1 после выезда, накопленная сумма по дням.
+    # Пересекающиеся брони (например, импортированные) не дают двойного счета
+    width = n_days + 1
+    size = n_props * width
+    marks = (np.bincount(index * width + np.clip(begin, 0, n_days), minlength=size)
+             - np.bincount(index * width + np.clip(finish + 1, 0, n_days), minlength=size))
+    occupied = np.cumsum(marks.reshape(n_props, width)[:, :n_days], axis=1) > 0
+    nights = (np.add.reduceat(occupied.astype(np.int64), month_starts, axis=1) if n_days and n_props
+              else np.zeros((n_props, n_months), dtype=np.int64))
+
+    # Заезды внутри периода: срок бронирования заранее и длительность по месяцу заезда
+    arrived = (begin >= 0) & (begin < n_days)
+    cell = index[arrived] * n_months + np.searchsorted(month_starts, begin[arrived], side='right') - 1
+    size = n_props * n_months
+
+    def per_cell(weights=None) -> np.ndarray:
+        return np.bincount(cell, weights=weights, minlength=size).reshape(n_props, n_months)
+
+    lead = np.maximum(begin[arrived] - created[arrived], 0)
+    stay = finish[arrived] - begin[arrived] + 1
+    return OccupancyReport(
+        start=start, end=end, property_ids=property_ids, property_names=names,
+        months=months, days=days, nights=nights, bookings=per_cell().astype(np.int64),
+        lead_days=per_cell(lead), stay_days=per_cell(stay),
+    )
+
+
+def parse_period(args: List[str], today: date = None) -> Tuple[date, date]:
+    """Период из аргументов команды: [DD.MM.YYYY [DD.MM.YYYY]]"""
+    if not args:
+        return default_period(today)
+    start = datetime.strptime(args[0], '%d.%m.%Y').date()
+    if len(args) > 1:
+        end = datetime.strptime(args[1], '%d.%m.%Y').date()
+    else:
+        end = start + timedelta(days=365) - timedelta(days=1)
+    return start, end
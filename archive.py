@@ -0,0 +1,37 @@
+"""
+Архивация завершившихся бронирований
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from telegram.ext import Application, ContextTypes
+from storage import Storage
+import config
+
+logger = logging.getLogger(__name__)
+
+
+def archive_old_bookings(db: Storage, now: datetime = None) -> int:
+    """Перенести в архив бронирования, закончившиеся более ARCHIVE_AFTER_DAYS дней назад"""
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=config.ARCHIVE_AFTER_DAYS)
+    return db.archive_bookings(cutoff, config.ARCHIVE_BATCH_SIZE)
+
+
+def schedule_archiving(application: Application, db: Storage):
+    """Запланировать регулярную архивацию в JobQueue"""
+    if config.ARCHIVE_AFTER_DAYS <= 0:
+        return
+
+    async def archive_job(context: ContextTypes.DEFAULT_TYPE):
+        # Порции INSERT...SELECT/DELETE выполняются вне цикла событий
+        archived = await asyncio.get_running_loop().run_in_executor(None, archive_old_bookings, db)
+        if archived:
+            logger.info(f"Перенесено в архив бронирований: {archived}")
+
+    application.job_queue.run_repeating(
+        archive_job,
+        interval=timedelta(hours=config.ARCHIVE_INTERVAL_HOURS),
+        first=timedelta(minutes=1),
+        name='archive_bookings'
+    )
@@ -1,51 +1,139 @@
 """
 Главный файл телеграм-бота для бронирования домов
 """
+from __future__ import annotations
+
+import asyncio
 import logging
-from telegram import Update
-from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters, ContextTypes
-from database import Database
-from admin_handlers import AdminHandlers
-from user_handlers import UserHandlers
+from typing import TYPE_CHECKING
+import startup
+import health
+import http_server
+import logs
+import metrics
 import config
 
-# Настройка логирования из config
-logging.basicConfig(
-    format=config.LOG_FORMAT,
-    level=getattr(logging, config.LOG_LEVEL.upper(), logging.INFO)
-)
+# Библиотека telegram и обработчики импортируются при создании бота,
+# чтобы запуск без токена и замер импорта не требовали их загрузки
+if TYPE_CHECKING:
+    from telegram import Update
+    from telegram.ext import Application, ContextTypes
+    from storage import Storage
+
+# Настройка логирования из config: запись в очередь, вывод в отдельном потоке
+logs.setup(config.LOG_LEVEL, config.LOG_JSON, config.LOG_FORMAT)
 logger = logging.getLogger(__name__)
 
 
 class HouseReservBot:
     """Главный класс бота"""
     
-    def __init__(self):
-        self.db = Database()
-        self.admin_handlers = AdminHandlers(self.db)
-        self.user_handlers = UserHandlers(self.db)
+    def __init__(self, db: Storage = None):
+        with startup.phase('import_telegram'):
+            import telegram.ext  # noqa: F401
+        with startup.phase('import_handlers'):
+            import ical
+            import inline_search
+            import media
+            from admin_handlers import AdminHandlers
+            from user_handlers import UserHandlers
+        with startup.phase('storage'):
+            from storage import create_storage
+            # Готовое хранилище передается стендом e2e_bench.py
+            self.db = db if db is not None else create_storage()
+        self.calendar_cache = ical.CalendarCache(self.db)
+        self.media_library = media.MediaLibrary(self.db)
+        self.inline_results = inline_search.InlineResultCache(self.db)
+        self.admin_handlers = AdminHandlers(self.db, self.calendar_cache, self.media_library, self.inline_results)
+        self.user_handlers = UserHandlers(self.db, self.media_library, inline_results=self.inline_results)
         self.application = None
     
     def setup_handlers(self):
         """Настройка обработчиков команд"""
+        from telegram import Update
+        from telegram.ext import (CommandHandler, CallbackQueryHandler, InlineQueryHandler, MessageHandler,
+                                  TypeHandler, filters)
+        import throttle
+        
+        # Отметка первого полученного обновления (до всех остальных обработчиков)
+        self.application.add_handler(TypeHandler(Update, self._on_update), group=-2)
+        
+        # Ограничение частоты входящих обновлений
+        throttle.install(self.application)
+        
         # Команды для пользователей
         self.application.add_handler(CommandHandler("start", self.user_handlers.start))
         self.application.add_handler(CommandHandler("my_bookings", self._show_my_bookings))
+        self.application.add_handler(CommandHandler("search", self.user_handlers.search))
         
         # Команды для администраторов
         self.application.add_handler(CommandHandler("admin", self.admin_handlers.start_admin))
         self.application.add_handler(CommandHandler("register_admin", self.admin_handlers.register_admin))
         self.application.add_handler(CommandHandler("set_phone", self._set_phone))
         self.application.add_handler(CommandHandler("set_username", self._set_username))
+        self.application.add_handler(CommandHandler("query_report", self.admin_handlers.query_report))
+        self.application.add_handler(CommandHandler("rebuild_stats", self.admin_handlers.rebuild_stats))
+        self.application.add_handler(CommandHandler("analytics", self.admin_handlers.analytics))
+        self.application.add_handler(CommandHandler("export_bookings", self.admin_handlers.export_bookings))
+        self.application.add_handler(CommandHandler("export_properties", self.admin_handlers.export_properties))
+        self.application.add_handler(CommandHandler("import_bookings", self.admin_handlers.import_bookings))
+        self.application.add_handler(CommandHandler("import_properties", self.admin_handlers.import_properties))
         
         # Callback обработчики
         self.application.add_handler(CallbackQueryHandler(self.admin_handlers.admin_callback, pattern="^admin_"))
         self.application.add_handler(CallbackQueryHandler(self.user_handlers.user_callback, pattern="^user_"))
         
+        # Встроенный режим (@бот запрос)
+        self.application.add_handler(InlineQueryHandler(self.user_handlers.inline_query))
+        
         # Обработчики сообщений
         self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self._handle_text))
         self.application.add_handler(MessageHandler(filters.PHOTO, self._handle_photo))
         self.application.add_handler(MessageHandler(filters.VIDEO, self._handle_video))
+        self.application.add_handler(MessageHandler(filters.Document.ALL, self._handle_document))
+        
+        # Замер длительности всех зарегистрированных обработчиков
+        metrics.instrument_handlers(self.application)
+    
+    async def _on_update(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Замер времени до первого обновления и отметка для проверки готовности"""
+        health.mark_update()
+        startup.mark_first_update()
+    
+    async def _post_init(self, application):
+        """Запуск замера задержки цикла событий"""
+        health.LOOP.start()
+    
+    async def _post_stop(self, application):
+        await health.LOOP.stop()
+    
+    def _register_health(self):
+        """Показатели и кэши для /stats, хранилище для /ready"""
+        health.set_storage(self.db)
+        health.register_stat('pending_updates', self.application.update_queue.qsize)
+        health.register_stat('outbound_queue', self.application.bot.rate_limiter.depth)
+        health.register_cache('calendars', lambda: len(self.calendar_cache))
+        health.register_cache('calendar_months', lambda: len(self.user_handlers.availability))
+        health.register_cache('media', lambda: len(self.media_library))
+        health.register_cache('inline_catalog', lambda: len(self.inline_results))
+        health.register_cache('edit_fingerprints', lambda: len(self.application.bot.fingerprints))
+    
+    async def _warm_caches(self, context: ContextTypes.DEFAULT_TYPE):
+        """Фоновый прогрев кэшей после начала опроса"""
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(None, self._warm_caches_sync)
+        except Exception as e:
+            logger.error(f"Ошибка при прогреве кэшей: {e}")
+    
+    def _warm_caches_sync(self):
+        """Собрать календари и списки медиафайлов всех объектов"""
+        with startup.phase('warm_caches'):
+            for prop in self.db.iter_properties():
+                self.calendar_cache.get_feed(prop['id'])
+                self.media_library.get_manifest(prop['id'])
+            self.inline_results.build()
+        logger.info(f"Кэши прогреты, календарей: {len(self.calendar_cache)}")
     
     async def _show_my_bookings(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Показать бронирования пользователя через команду"""
@@ -139,6 +227,11 @@ class HouseReservBot:
                 await self.admin_handlers.handle_text(update, context)
                 return
         
+        # Проверяем, ожидает ли пользователь ввода поискового запроса
+        if context.user_data.get('waiting_for_search'):
+            await self.user_handlers.handle_search_text(update, context)
+            return
+        
         # Проверяем, ожидает ли пользователь ввода дат для бронирования
         if context.user_data.get('booking_property_id'):
             await self.user_handlers.handle_booking_text(update, context)
@@ -163,24 +256,69 @@ class HouseReservBot:
         if self.admin_handlers.is_admin(user_id):
             await self.admin_handlers.handle_video(update, context)
     
+    async def _handle_document(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработка документов (файлы импорта)"""
+        user_id = update.effective_user.id
+        
+        if self.admin_handlers.is_admin(user_id):
+            await self.admin_handlers.handle_document(update, context)
+    
+    def build_application(self) -> Application:
+        """Создать приложение: бот, обработчики и плановые задачи"""
+        with startup.phase('import_jobs'):
+            from telegram.ext import Application
+            from request_metrics import InstrumentedHTTPXRequest
+            from outbound import PrioritizedRateLimiter
+            from edits import EditAwareBot
+            import archive
+            import holds
+            import reminders
+        
+        with startup.phase('application'):
+            # Создаем Application с правильными параметрами
+            bot = EditAwareBot(
+                token=config.BOT_TOKEN,
+                base_url=config.BOT_API_BASE_URL,
+                base_file_url=config.BOT_API_FILE_URL,
+                request=InstrumentedHTTPXRequest(connection_pool_size=256),
+                get_updates_request=InstrumentedHTTPXRequest(),
+                rate_limiter=PrioritizedRateLimiter(),
+            )
+            self.application = (Application.builder().bot(bot)
+                                .post_init(self._post_init).post_stop(self._post_stop).build())
+            self.setup_handlers()
+            archive.schedule_archiving(self.application, self.db)
+            reminders.schedule_reminders(self.application, self.db)
+            holds.schedule_hold_sweeper(self.application, self.db, (self.user_handlers.availability,))
+            # Задачи JobQueue запускаются после начала опроса
+            self.application.job_queue.run_once(self._warm_caches, 0, name='warm_caches')
+        return self.application
+    
     def run(self):
         """Запуск бота"""
-        if not config.BOT_TOKEN:
-            logger.error("BOT_TOKEN не установлен! Установите его в переменных окружения или в .env файле.")
-            return
+        import ical
+        self.build_application()
         
-        # Создаем Application с правильными параметрами
-        self.application = (
-            Application.builder()
-            .token(config.BOT_TOKEN)
-            .build()
-        )
-        self.setup_handlers()
+        if config.HTTP_PORT:
+            ical.register_http_route(self.calendar_cache)
+            self._register_health()
+            http_server.start_http_server(config.HTTP_HOST, config.HTTP_PORT)
         
+        logger.info(startup.report())
         logger.info("Бот запущен...")
-        # Используем run_polling() - он сам управляет жизненным циклом
+        # run_polling() и run_webhook() сами управляют жизненным циклом
         try:
-            self.application.run_polling(drop_pending_updates=True)
+            if config.WEBHOOK_URL:
+                self.application.run_webhook(
+                    listen=config.WEBHOOK_LISTEN,
+                    port=config.WEBHOOK_PORT,
+                    url_path=config.WEBHOOK_PATH,
+                    webhook_url=config.WEBHOOK_URL,
+                    secret_token=config.WEBHOOK_SECRET or None,
+                    drop_pending_updates=True,
+                )
+            else:
+                self.application.run_polling(drop_pending_updates=True)
         except KeyboardInterrupt:
             logger.info("Бот остановлен пользователем")
         except Exception as e:
@@ -190,6 +328,10 @@ class HouseReservBot:
 
 def main():
     """Главная функция"""
+    # Токен проверяется до загрузки библиотеки telegram и подключения к БД
+    if not config.BOT_TOKEN:
+        logger.error("BOT_TOKEN не установлен! Установите его в переменных окружения или в .env файле.")
+        return
     bot = HouseReservBot()
     bot.run()
 
@@ -0,0 +1,269 @@
+"""
+Массовый импорт и экспорт бронирований и объектов (CSV и JSON)
+
+Использование из командной строки:
+    python bulk_io.py export bookings --format csv --output bookings.csv
+    python bulk_io.py import bookings bookings.csv
+"""
+import argparse
+import csv
+import json
+import sys
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import IO, Iterable, Iterator, List, Optional, Set, Tuple
+
+from storage import Storage
+
+BOOKING_FIELDS = ['id', 'property_id', 'user_id', 'user_username', 'user_phone',
+                  'start_date', 'end_date', 'advance_paid', 'created_at']
+PROPERTY_FIELDS = ['id', 'name', 'description', 'admin_id', 'created_at']
+
+FORMATS = ('csv', 'json')
+
+
+@dataclass
+class ImportResult:
+    """Результат импорта"""
+    inserted: int = 0
+    rejected: List[Tuple[dict, str]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+
+    def summary(self, limit: int = 10) -> str:
+        """Краткий текстовый отчет"""
+        text = f"Добавлено: {self.inserted}\n"
+        text += f"Отклонено: {len(self.rejected)}\n"
+        text += f"Ошибок разбора: {len(self.errors)}\n"
+        details = [f"• {row.get('property_id')} {row.get('start_date'):%d.%m.%Y}: {reason}"
+                   for row, reason in self.rejected[:limit]]
+        details += [f"• {error}" for error in self.errors[:limit]]
+        if details:
+            text += "\n" + "\n".join(details[:limit])
+        return text
+
+
+def detect_format(filename: str) -> str:
+    """Определить формат по расширению файла"""
+    name = (filename or '').lower()
+    if name.endswith('.json') or name.endswith('.jsonl'):
+        return 'json'
+    return 'csv'
+
+
+# Экспорт
+def _serialize(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def write_csv(rows: Iterable[dict], fields: List[str], out: IO[str]) -> int:
+    """Потоково записать строки в CSV. Возвращает число записанных строк"""
+    writer = csv.DictWriter(out, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow({key: _serialize(row.get(key)) for key in fields})
+        count += 1
+    return count
+
+
+def write_json(rows: Iterable[dict], fields: List[str], out: IO[str]) -> int:
+    """Потоково записать строки JSON-массивом (по одному объекту на строку)"""
+    count = 0
+    out.write('[')
+    for row in rows:
+        out.write(',\n' if count else '\n')
+        json.dump({key: _serialize(row.get(key)) for key in fields}, out, ensure_ascii=False)
+        count += 1
+    out.write('\n]\n')
+    return count
+
+
+def _owned_property_ids(db: Storage, admin_id: int) -> Set[int]:
+    return {prop.id for prop in db.get_admin_properties(admin_id)}
+
+
+def export_rows(db: Storage, kind: str, fmt: str, out: IO[str], admin_id: Optional[int] = None) -> int:
+    """
+    Экспортировать бронирования или объекты в открытый текстовый файл
+    (admin_id - только объекты владельца и бронирования по ним)
+    """
+    if kind == 'bookings':
+        rows, fields = db.iter_bookings(include_archive=True, admin_id=admin_id), BOOKING_FIELDS
+    elif kind == 'properties':
+        rows, fields = db.iter_properties(admin_id=admin_id), PROPERTY_FIELDS
+    else:
+        raise ValueError(f"Неизвестный тип данных: {kind}")
+    if fmt == 'json':
+        return write_json(rows, fields, out)
+    return write_csv(rows, fields, out)
+
+
+# Импорт
+def read_rows(source: IO[str], fmt: str) -> Iterator[dict]:
+    """Прочитать строки из CSV, JSON-массива или JSON Lines"""
+    if fmt == 'csv':
+        yield from csv.DictReader(source)
+        return
+    head = source.read(1)
+    while head and head.isspace():
+        head = source.read(1)
+    if head == '[':
+        # JSON-массив читается целиком
+        yield from json.loads(head + source.read())
+        return
+    # JSON Lines: по объекту на строку
+    first = head + source.readline()
+    if first.strip():
+        yield json.loads(first)
+    for line in source:
+        if line.strip():
+            yield json.loads(line)
+
+
+def parse_date_value(value) -> datetime:
+    """Разобрать дату в формате YYYY-MM-DD или DD.MM.YYYY"""
+    value = str(value).strip()
+    for fmt in ('%Y-%m-%d', '%d.%m.%Y'):
+        try:
+            return datetime.strptime(value[:10], fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"неверная дата: {value}")
+
+
+def _parse_bool(value) -> bool:
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'да')
+
+
+def _optional(value):
+    return value if value not in (None, '') else None
+
+
+def _optional_int(value):
+    return int(value) if value not in (None, '') else None
+
+
+def normalize_booking(raw: dict) -> dict:
+    """Привести строку импорта к виду, принимаемому Database.bulk_add_bookings"""
+    return {
+        'property_id': int(raw['property_id']),
+        'user_id': int(raw.get('user_id') or 0),
+        'user_username': _optional(raw.get('user_username')),
+        'user_phone': _optional(raw.get('user_phone')),
+        'start_date': parse_date_value(raw['start_date']),
+        'end_date': parse_date_value(raw['end_date']),
+        'advance_paid': _parse_bool(raw.get('advance_paid', False)),
+    }
+
+
+def normalize_property(raw: dict) -> dict:
+    """Привести строку импорта к виду, принимаемому Database.bulk_add_properties"""
+    name = (raw.get('name') or '').strip()
+    if not name:
+        raise ValueError("не указано название объекта")
+    return {
+        'id': _optional_int(raw.get('id')),
+        'name': name,
+        'description': _optional(raw.get('description')),
+        'admin_id': _optional_int(raw.get('admin_id')),
+    }
+
+
+def _normalized(rows: Iterable[dict], normalize, result: ImportResult) -> Iterator[dict]:
+    """Нормализовать строки, собирая ошибки разбора в result"""
+    for line_no, raw in enumerate(rows, 1):
+        try:
+            yield normalize(raw)
+        except (KeyError, TypeError, ValueError) as e:
+            result.errors.append(f"строка {line_no}: {e}")
+
+
+def _owned_only(rows: Iterable[dict], owned: Set[int], result: ImportResult) -> Iterator[dict]:
+    """Пропустить строки по объектам владельца, остальные отклонить"""
+    for row in rows:
+        if row['property_id'] in owned:
+            yield row
+        else:
+            result.rejected.append((row, "объект другого владельца"))
+
+
+def import_bookings(db: Storage, rows: Iterable[dict], chunk_size: int = 500,
+                    admin_id: Optional[int] = None) -> ImportResult:
+    """Импортировать бронирования с проверкой пересечений (admin_id - только по объектам владельца)"""
+    result = ImportResult()
+    rows = _normalized(rows, normalize_booking, result)
+    if admin_id is not None:
+        rows = _owned_only(rows, _owned_property_ids(db, admin_id), result)
+    inserted, rejected = db.bulk_add_bookings(rows, chunk_size)
+    result.inserted = inserted
+    result.rejected.extend(rejected)
+    return result
+
+
+def import_properties(db: Storage, rows: Iterable[dict], chunk_size: int = 500,
+                      admin_id: Optional[int] = None) -> ImportResult:
+    """Импортировать объекты (admin_id - владелец всех добавленных объектов)"""
+    result = ImportResult()
+    rows = _normalized(rows, normalize_property, result)
+    if admin_id is not None:
+        rows = ({**row, 'admin_id': admin_id} for row in rows)
+    result.inserted = db.bulk_add_properties(rows, chunk_size)
+    return result
+
+
+def import_file(db: Storage, kind: str, path: str, fmt: str = None,
+                admin_id: Optional[int] = None) -> ImportResult:
+    """Импортировать данные из файла (admin_id - от имени владельца, см. import_bookings и import_properties)"""
+    fmt = fmt or detect_format(path)
+    with open(path, 'r', encoding='utf-8', newline='') as source:
+        rows = read_rows(source, fmt)
+        if kind == 'bookings':
+            return import_bookings(db, rows, admin_id=admin_id)
+        if kind == 'properties':
+            return import_properties(db, rows, admin_id=admin_id)
+    raise ValueError(f"Неизвестный тип данных: {kind}")
+
+
+def export_file(db: Storage, kind: str, path: str, fmt: str = None, admin_id: Optional[int] = None) -> int:
+    """Экспортировать данные в файл (admin_id - только данные владельца)"""
+    fmt = fmt or detect_format(path)
+    with open(path, 'w', encoding='utf-8', newline='') as out:
+        return export_rows(db, kind, fmt, out, admin_id)
+
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description="Импорт и экспорт бронирований и объектов")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    export_parser = subparsers.add_parser('export', help="экспорт данных")
+    export_parser.add_argument('kind', choices=('bookings', 'properties'))
+    export_parser.add_argument('--format', choices=FORMATS,
+                               help="по умолчанию - по расширению --output, для stdout - csv")
+    export_parser.add_argument('--output', help="файл для записи (по умолчанию stdout)")
+
+    import_parser = subparsers.add_parser('import', help="импорт данных")
+    import_parser.add_argument('kind', choices=('bookings', 'properties'))
+    import_parser.add_argument('path')
+    import_parser.add_argument('--format', choices=FORMATS)
+
+    parser.add_argument('--db', help="путь к базе данных (по умолчанию DATABASE_PATH)")
+    args = parser.parse_args(argv)
+
+    from database import Database
+    db = Database(args.db) if args.db else Database()
+    if args.command == 'export':
+        if args.output:
+            count = export_file(db, args.kind, args.output, args.format)
+        else:
+            count = export_rows(db, args.kind, args.format or 'csv', sys.stdout)
+        print(f"Экспортировано строк: {count}", file=sys.stderr)
+    else:
+        result = import_file(db, args.kind, args.path, args.format)
+        print(result.summary(), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
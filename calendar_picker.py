@@ -0,0 +1,203 @@
+"""
+Выбор дат бронирования в календаре из inline-кнопок
+"""
+import calendar
+import threading
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+import metrics
+from storage import Storage
+
+# На сколько месяцев вперед можно листать календарь
+MONTHS_AHEAD = 12
+
+MONTH_NAMES = ['Январь', 'Февраль', 'Март', 'Апрель', 'Май', 'Июнь', 'Июль',
+               'Август', 'Сентябрь', 'Октябрь', 'Ноябрь', 'Декабрь']
+WEEKDAY_NAMES = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+
+# Недели месяца: номера дней (0 - день другого месяца) и признак занятости
+MonthGrid = List[List[Tuple[int, bool]]]
+
+NOOP = 'user_calnoop'
+
+
+def month_key(day: date) -> int:
+    """Месяц в виде числа YYYYMM"""
+    return day.year * 100 + day.month
+
+
+def shift_month(key: int, delta: int) -> int:
+    year, month = divmod(key, 100)
+    index = year * 12 + month - 1 + delta
+    return (index // 12) * 100 + index % 12 + 1
+
+
+class AvailabilityCache:
+    """
+    Сетки месяцев с занятыми днями по объектам. Занятые дни объекта загружаются одним
+    запросом, сетки строятся по ним и кэшируются до смены дня, поэтому листание месяцев
+    не перечитывает бронирования. Актуальность проверяется по версии бронирований объекта
+    (refresh) при каждом действии в календаре.
+    """
+
+    def __init__(self, db: Storage):
+        self.db = db
+        self._names: Dict[int, str] = {}
+        # Занятые дни: (версия бронирований, день расчета, дни)
+        self._occupied: Dict[int, Tuple[int, date, Set[date]]] = {}
+        self._grids: Dict[Tuple[int, int, date], MonthGrid] = {}
+        self._lock = threading.Lock()
+
+    def refresh(self, property_id: int) -> bool:
+        """Сбросить кэш объекта, если его бронирования изменились. False, если объекта нет"""
+        state = self.db.get_calendar_state(property_id)
+        if state is None:
+            self.invalidate(property_id)
+            return False
+        with self._lock:
+            self._names[property_id] = state[0]
+            cached = self._occupied.get(property_id)
+        if cached is not None and cached[0] != state[1]:
+            self.invalidate(property_id)
+        return True
+
+    def invalidate(self, property_id: int):
+        """Сбросить занятые дни и сетки объекта"""
+        with self._lock:
+            self._names.pop(property_id, None)
+            self._occupied.pop(property_id, None)
+            for key in [key for key in self._grids if key[0] == property_id]:
+                del self._grids[key]
+
+    def occupied_days(self, property_id: int) -> Set[date]:
+        """Занятые дни объекта от сегодняшнего дня на MONTHS_AHEAD месяцев вперед"""
+        today = date.today()
+        with self._lock:
+            cached = self._occupied.get(property_id)
+        if cached is not None:
+            if cached[1] == today:
+                return cached[2]
+            # Наступил новый день: дни и сетки считались от вчерашней даты
+            self.invalidate(property_id)
+        state = self.db.get_calendar_state(property_id)
+        version = state[1] if state else 0
+        if state:
+            with self._lock:
+                self._names[property_id] = state[0]
+        horizon = today + timedelta(days=31 * (MONTHS_AHEAD + 1))
+        days = set()
+        for booking in self.db.iter_property_bookings(property_id):
+            day = max(booking.start_date.date(), today)
+            last = min(booking.end_date.date(), horizon)
+            while day <= last:
+                days.add(day)
+                day += timedelta(days=1)
+        with self._lock:
+            self._occupied[property_id] = (version, today, days)
+        return days
+
+    def property_name(self, property_id: int) -> str:
+        """Название объекта (из кэша)"""
+        with self._lock:
+            name = self._names.get(property_id)
+        if name is None:
+            self.occupied_days(property_id)
+            name = self._names.get(property_id, "объект")
+        return name
+
+    def get_month(self, property_id: int, key: int) -> MonthGrid:
+        """Сетка месяца YYYYMM с отметками занятых дней"""
+        cache_key = (property_id, key, date.today())
+        with self._lock:
+            grid = self._grids.get(cache_key)
+        if grid is not None:
+            metrics.cache_hit('calendar_month')
+            return grid
+        metrics.cache_miss('calendar_month')
+        occupied = self.occupied_days(property_id)
+        year, month = divmod(key, 100)
+        grid = [
+            [(day, day != 0 and date(year, month, day) in occupied) for day in week]
+            for week in calendar.Calendar().monthdayscalendar(year, month)
+        ]
+        with self._lock:
+            self._grids[cache_key] = grid
+        return grid
+
+    def __len__(self):
+        return len(self._grids)
+
+    def first_occupied_after(self, property_id: int, start: date) -> Optional[date]:
+        """Первый занятый день после start (граница для выбора даты выезда)"""
+        later = [day for day in self.occupied_days(property_id) if day > start]
+        return min(later) if later else None
+
+
+def _selectable(day: date, today: date, occupied: bool,
+                checkin: Optional[date], limit: Optional[date]) -> bool:
+    if checkin:
+        return today <= checkin <= day and (limit is None or day < limit)
+    return day >= today and not occupied
+
+
+def is_selectable(cache: AvailabilityCache, property_id: int, day: date,
+                  checkin: Optional[date] = None) -> bool:
+    """
+    Можно ли выбрать день по актуальным данным кэша: дату заезда - свободный день
+    не раньше сегодняшнего, дату выезда - день от checkin до первого занятого дня
+    """
+    limit = cache.first_occupied_after(property_id, checkin) if checkin else None
+    return _selectable(day, date.today(), day in cache.occupied_days(property_id), checkin, limit)
+
+
+def build_keyboard(cache: AvailabilityCache, property_id: int, key: int,
+                   checkin: Optional[date] = None) -> InlineKeyboardMarkup:
+    """
+    Клавиатура месяца. Без checkin выбирается дата заезда, с checkin - дата выезда:
+    доступны дни от checkin до первого занятого дня
+    """
+    today = date.today()
+    year, month = divmod(key, 100)
+    limit = cache.first_occupied_after(property_id, checkin) if checkin else None
+    keyboard = [
+        [InlineKeyboardButton(f"{MONTH_NAMES[month - 1]} {year}", callback_data=NOOP)],
+        [InlineKeyboardButton(name, callback_data=NOOP) for name in WEEKDAY_NAMES],
+    ]
+    for week in cache.get_month(property_id, key):
+        row = []
+        for day, occupied in week:
+            if day == 0:
+                row.append(InlineKeyboardButton(" ", callback_data=NOOP))
+                continue
+            current = date(year, month, day)
+            selectable = _selectable(current, today, occupied, checkin, limit)
+            if occupied:
+                label = "✖"
+            elif checkin and current == checkin:
+                label = f"[{day}]"
+            else:
+                label = str(day) if selectable else "·"
+            callback = f"user_calpick_{property_id}_{current:%Y%m%d}" if selectable else NOOP
+            row.append(InlineKeyboardButton(label, callback_data=callback))
+        keyboard.append(row)
+
+    navigation = []
+    if key > month_key(today):
+        navigation.append(InlineKeyboardButton("◀️", callback_data=f"user_cal_{property_id}_{shift_month(key, -1)}"))
+    if key < shift_month(month_key(today), MONTHS_AHEAD):
+        navigation.append(InlineKeyboardButton("▶️", callback_data=f"user_cal_{property_id}_{shift_month(key, 1)}"))
+    if navigation:
+        keyboard.append(navigation)
+    if checkin:
+        keyboard.append([InlineKeyboardButton("↩️ Выбрать другую дату заезда",
+                                              callback_data=f"user_calreset_{property_id}")])
+    keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data=f"user_property_{property_id}")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+def parse_day(value: str) -> datetime:
+    """Дата из callback (YYYYMMDD)"""
+    return datetime.strptime(value, '%Y%m%d')
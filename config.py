@@ -18,11 +18,94 @@ MAX_PHOTOS = int(os.getenv('MAX_PHOTOS', '10'))
 # Максимальное количество видео на объект
 MAX_VIDEOS = int(os.getenv('MAX_VIDEOS', '2'))
 
+# Сколько секунд ждать остальные файлы альбома (media group) перед сохранением
+MEDIA_GROUP_WAIT_SECONDS = float(os.getenv('MEDIA_GROUP_WAIT_SECONDS', '1.5'))
+
 # ID администраторов (можно добавить через команду)
 # Формат: ADMIN_IDS=123456789,987654321 (через запятую)
 ADMIN_IDS_STR = os.getenv('ADMIN_IDS', '')
 ADMIN_IDS = set(int(admin_id.strip()) for admin_id in ADMIN_IDS_STR.split(',') if admin_id.strip()) if ADMIN_IDS_STR else set()
+# Администраторы из переменной окружения видят объекты всех владельцев
+# (ADMIN_IDS дополняется при регистрации администраторов, этот список - нет)
+SUPER_ADMIN_IDS = frozenset(ADMIN_IDS)
+
+# Наблюдатели: получают уведомления о всех новых бронированиях (ID через запятую).
+# Остальные уведомления получает только владелец объекта
+NOTIFY_WATCHER_IDS_STR = os.getenv('NOTIFY_WATCHER_IDS', '')
+NOTIFY_WATCHER_IDS = frozenset(int(user_id.strip()) for user_id in NOTIFY_WATCHER_IDS_STR.split(',') if user_id.strip())
 
 # Настройки логирования
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
 LOG_FORMAT = os.getenv('LOG_FORMAT', '%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+# Логи в JSON (одна запись - одна строка, с контекстом обработчика и запроса); LOG_FORMAT тогда не используется
+LOG_JSON = os.getenv('LOG_JSON', 'false').lower() in ('1', 'true', 'yes')
+
+# Локальный HTTP-сервер для служебных эндпоинтов (/metrics). 0 - отключен
+HTTP_HOST = os.getenv('HTTP_HOST', '127.0.0.1')
+HTTP_PORT = int(os.getenv('HTTP_PORT', '0'))
+
+# Проверки /health и /ready: через сколько секунд без отклика цикл событий считается зависшим
+# и сколько секунд без опроса Telegram и без обновлений бот считается неготовым
+HEALTH_LOOP_STALL_SECONDS = float(os.getenv('HEALTH_LOOP_STALL_SECONDS', '10'))
+HEALTH_UPDATE_MAX_AGE_SECONDS = float(os.getenv('HEALTH_UPDATE_MAX_AGE_SECONDS', '120'))
+
+# Адрес Bot API и адрес загрузки файлов (для собственного сервера Bot API или стенда e2e_bench.py)
+BOT_API_BASE_URL = os.getenv('BOT_API_BASE_URL', 'https://api.telegram.org/bot')
+BOT_API_FILE_URL = os.getenv('BOT_API_FILE_URL', 'https://api.telegram.org/file/bot')
+
+# Прием обновлений через webhook вместо опроса getUpdates: публичный адрес webhook (пусто - опрос),
+# адрес и порт локального сервера, путь на нем и секрет (заголовок X-Telegram-Bot-Api-Secret-Token)
+WEBHOOK_URL = os.getenv('WEBHOOK_URL', '')
+WEBHOOK_LISTEN = os.getenv('WEBHOOK_LISTEN', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', '8443'))
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', 'telegram')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+
+# Трассировка SQL-запросов (журнал медленных запросов и планы выполнения)
+DB_TRACE = os.getenv('DB_TRACE', '0').lower() in ('1', 'true', 'yes')
+# Порог медленного запроса в миллисекундах
+DB_SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '100'))
+
+# Архивация: бронирования, закончившиеся более N дней назад, переносятся в архив. 0 - отключена
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '30'))
+# Периодичность архивации в часах
+ARCHIVE_INTERVAL_HOURS = float(os.getenv('ARCHIVE_INTERVAL_HOURS', '24'))
+# Размер порции (одна транзакция)
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', '500'))
+
+# Напоминания о заезде: за сколько дней до заезда напоминать (0 - отключены)
+REMINDER_DAYS_AHEAD = int(os.getenv('REMINDER_DAYS_AHEAD', '1'))
+# Периодичность проверки в минутах
+REMINDER_INTERVAL_MINUTES = float(os.getenv('REMINDER_INTERVAL_MINUTES', '60'))
+# Максимум отправляемых напоминаний в секунду
+REMINDER_SEND_RATE = float(os.getenv('REMINDER_SEND_RATE', '10'))
+
+# Временные брони: неоплаченное бронирование гостя снимается через N часов.
+# По умолчанию 0 - брони бессрочные, снятие включается явно
+HOLD_TTL_HOURS = float(os.getenv('HOLD_TTL_HOURS', '0'))
+# Периодичность снятия истекших броней в минутах и размер порции (одна транзакция)
+HOLD_SWEEP_INTERVAL_MINUTES = float(os.getenv('HOLD_SWEEP_INTERVAL_MINUTES', '5'))
+HOLD_SWEEP_BATCH_SIZE = int(os.getenv('HOLD_SWEEP_BATCH_SIZE', '500'))
+
+# Ограничение частоты входящих обновлений (token bucket): обновлений в секунду и запас.
+# Лимит на пользователя и общий лимит бота; 0 - проверка отключена
+THROTTLE_USER_RATE = float(os.getenv('THROTTLE_USER_RATE', '2'))
+THROTTLE_USER_BURST = float(os.getenv('THROTTLE_USER_BURST', '8'))
+THROTTLE_GLOBAL_RATE = float(os.getenv('THROTTLE_GLOBAL_RATE', '50'))
+THROTTLE_GLOBAL_BURST = float(os.getenv('THROTTLE_GLOBAL_BURST', '100'))
+# Повторное нажатие той же кнопки в течение N секунд не обрабатывается
+THROTTLE_COALESCE_SECONDS = float(os.getenv('THROTTLE_COALESCE_SECONDS', '1'))
+
+# Исходящие запросы к Bot API: общий лимит в секунду, лимит на личный чат в секунду и запас,
+# лимит на группу в минуту и число повторов после RetryAfter
+OUTBOUND_GLOBAL_RATE = float(os.getenv('OUTBOUND_GLOBAL_RATE', '30'))
+OUTBOUND_CHAT_RATE = float(os.getenv('OUTBOUND_CHAT_RATE', '1'))
+OUTBOUND_CHAT_BURST = float(os.getenv('OUTBOUND_CHAT_BURST', '3'))
+OUTBOUND_GROUP_RATE_PER_MINUTE = float(os.getenv('OUTBOUND_GROUP_RATE_PER_MINUTE', '20'))
+OUTBOUND_MAX_RETRIES = int(os.getenv('OUTBOUND_MAX_RETRIES', '3'))
+
+# Встроенный режим (@бот запрос): сколько секунд Telegram может кэшировать ответ на запрос
+INLINE_CACHE_TIME = int(os.getenv('INLINE_CACHE_TIME', '60'))
+
+# Хранилище данных: sqlite (по умолчанию) или memory (в памяти, данные не сохраняются)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
@@ -1,25 +1,47 @@
 """
 Модуль для работы с базой данных
 """
+import logging
 import sqlite3
-from datetime import datetime
-from typing import List, Optional, Tuple
+from datetime import date, datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 from contextlib import contextmanager
 import config
+import metrics
+import query_trace
+import search
 from models import Admin, Property, Booking, PropertyPhoto, PropertyVideo
+from storage import Storage
 
+logger = logging.getLogger(__name__)
 
-class Database:
-    """Класс для работы с базой данных"""
+# Версия схемы БД, хранится в PRAGMA user_version.
+# Увеличивается при каждом изменении таблиц, индексов или триггеров
+SCHEMA_VERSION = 7
+
+# Юлианский день 1970-01-01 (для перевода дат в номера дней)
+_UNIX_EPOCH_JULIAN = 2440587.5
+
+# Пути БД, схема которых уже проверена в этом процессе
+_checked_schemas = set()
+
+
+@metrics.instrumented(exclude=('get_connection',))
+class Database(Storage):
+    """Класс для работы с базой данных SQLite"""
     
     def __init__(self, db_path: str = config.DATABASE_PATH):
         self.db_path = db_path
+        self.trace_enabled = config.DB_TRACE
         self.init_database()
     
     @contextmanager
     def get_connection(self):
         """Контекстный менеджер для работы с БД"""
-        conn = sqlite3.connect(self.db_path)
+        if self.trace_enabled:
+            conn = sqlite3.connect(self.db_path, factory=query_trace.TracingConnection)
+        else:
+            conn = sqlite3.connect(self.db_path)
         conn.row_factory = sqlite3.Row
         try:
             yield conn
@@ -28,12 +50,47 @@ class Database:
             conn.rollback()
             raise
         finally:
+            if isinstance(conn, query_trace.TracingConnection):
+                conn.flush_trace()
             conn.close()
     
+    def set_tracing(self, enabled: bool):
+        """Включить или выключить трассировку SQL-запросов"""
+        self.trace_enabled = enabled
+    
+    def get_query_stats(self, limit: int = 10) -> List[query_trace.QueryStats]:
+        """Получить запросы с наибольшим суммарным временем выполнения"""
+        return query_trace.TRACER.top(limit)
+    
+    def reset_query_stats(self):
+        """Сбросить статистику трассировки"""
+        query_trace.TRACER.reset()
+    
+    def ping(self) -> bool:
+        """Проверить, что файл БД открывается и читается (заголовок с версией схемы)"""
+        try:
+            with self.get_connection() as conn:
+                conn.execute('PRAGMA user_version').fetchone()
+            return True
+        except Exception as e:
+            logger.warning("База данных недоступна: %s", e)
+            return False
+    
     def init_database(self):
-        """Инициализация базы данных и создание таблиц"""
+        """
+        Инициализация базы данных и создание таблиц.
+        Схема создается только если версия файла меньше SCHEMA_VERSION,
+        в пределах процесса версия проверяется один раз.
+        """
+        if self.db_path in _checked_schemas:
+            return
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute('PRAGMA user_version')
+            version = cursor.fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                _checked_schemas.add(self.db_path)
+                return
             
             # Таблица администраторов
             cursor.execute('''
@@ -42,10 +99,16 @@ class Database:
                     user_id INTEGER UNIQUE NOT NULL,
                     phone TEXT,
                     telegram_username TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    notifications TEXT NOT NULL DEFAULT 'own'
                 )
             ''')
             
+            # Настройка уведомлений администратора о новых бронированиях
+            cursor.execute('PRAGMA table_info(admins)')
+            if 'notifications' not in [row['name'] for row in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE admins ADD COLUMN notifications TEXT NOT NULL DEFAULT 'own'")
+            
             # Таблица объектов
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS properties (
@@ -58,6 +121,51 @@ class Database:
                 )
             ''')
             
+            # Индекс для выборки объектов владельца
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_properties_admin
+                ON properties (admin_id)
+            ''')
+            
+            # Полнотекстовый индекс по названию и описанию объектов (FTS5, rowid - ID объекта).
+            # Текст хранится с заменой "ё" на "е", поэтому "елка" находит "Ёлку"
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'properties_fts'")
+            fts_exists = cursor.fetchone() is not None
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS properties_fts USING fts5(
+                    name, description, tokenize='unicode61 remove_diacritics 2'
+                )
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS properties_fts_insert
+                AFTER INSERT ON properties
+                BEGIN
+                    INSERT INTO properties_fts (rowid, name, description)
+                    VALUES (NEW.id, {search.fold_sql('NEW.name')}, {search.fold_sql('NEW.description')});
+                END
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS properties_fts_delete
+                AFTER DELETE ON properties
+                BEGIN
+                    DELETE FROM properties_fts WHERE rowid = OLD.id;
+                END
+            ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS properties_fts_update
+                AFTER UPDATE OF name, description ON properties
+                BEGIN
+                    UPDATE properties_fts
+                    SET name = {search.fold_sql('NEW.name')}, description = {search.fold_sql('NEW.description')}
+                    WHERE rowid = NEW.id;
+                END
+            ''')
+            if not fts_exists:
+                cursor.execute(f'''
+                    INSERT INTO properties_fts (rowid, name, description)
+                    SELECT id, {search.fold_sql('name')}, {search.fold_sql('description')} FROM properties
+                ''')
+            
             # Таблица бронирований
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS bookings (
@@ -70,16 +178,153 @@ class Database:
                     end_date DATE NOT NULL,
                     advance_paid BOOLEAN DEFAULT 0,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    expires_at TIMESTAMP,
                     FOREIGN KEY (property_id) REFERENCES properties(id)
                 )
             ''')
             
+            # Срок действия неоплаченной брони (NULL - бессрочно)
+            cursor.execute('PRAGMA table_info(bookings)')
+            if 'expires_at' not in [row['name'] for row in cursor.fetchall()]:
+                cursor.execute('ALTER TABLE bookings ADD COLUMN expires_at TIMESTAMP')
+            
+            # Частичный индекс только по броням со сроком: очистка читает лишь истекшие строки
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_bookings_expires
+                ON bookings (expires_at) WHERE expires_at IS NOT NULL
+            ''')
+            
+            # Счетчик версий бронирований объекта (для кэширования календарей)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS property_booking_versions (
+                    property_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            for event, ref in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS bookings_version_{event.lower()}
+                    AFTER {event} ON bookings
+                    BEGIN
+                        INSERT INTO property_booking_versions (property_id, version)
+                        VALUES ({ref}.property_id, 1)
+                        ON CONFLICT(property_id) DO UPDATE SET version = version + 1;
+                    END
+                ''')
+            # При переносе бронирования на другой объект меняется и старый календарь
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS bookings_version_move
+                AFTER UPDATE OF property_id ON bookings
+                WHEN OLD.property_id != NEW.property_id
+                BEGIN
+                    INSERT INTO property_booking_versions (property_id, version)
+                    VALUES (OLD.property_id, 1)
+                    ON CONFLICT(property_id) DO UPDATE SET version = version + 1;
+                END
+            ''')
+            
+            # Индекс для проверки пересечений при массовом импорте
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_bookings_property_end
+                ON bookings (property_id, end_date)
+            ''')
+            
+            # Архив завершившихся бронирований (не читается горячими запросами)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS bookings_archive (
+                    id INTEGER PRIMARY KEY,
+                    property_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    user_username TEXT,
+                    user_phone TEXT,
+                    start_date DATE NOT NULL,
+                    end_date DATE NOT NULL,
+                    advance_paid BOOLEAN DEFAULT 0,
+                    created_at TIMESTAMP,
+                    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Индекс для выборки бронирований к архивации
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_bookings_end
+                ON bookings (end_date)
+            ''')
+            
+            # Индекс для выборки ближайших заездов
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_bookings_start
+                ON bookings (start_date)
+            ''')
+            
+            # Отправленные напоминания
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS sent_reminders (
+                    booking_id INTEGER NOT NULL,
+                    kind TEXT NOT NULL,
+                    sent_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (booking_id, kind)
+                )
+            ''')
+            cursor.execute('''
+                CREATE TRIGGER IF NOT EXISTS bookings_reminders_cleanup
+                AFTER DELETE ON bookings
+                BEGIN
+                    DELETE FROM sent_reminders WHERE booking_id = OLD.id;
+                END
+            ''')
+            
+            # Счетчики статистики по объектам (поддерживаются триггерами)
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'property_stats'")
+            stats_exists = cursor.fetchone() is not None
+            # До версии 7 ночи считались как end_date - start_date (на одну меньше, чем занятых дней):
+            # триггеры пересоздаются с новой формулой, счетчики пересчитываются
+            stale_stats = stats_exists and version < 7
+            if stale_stats:
+                for trigger in ('bookings_stats_insert', 'bookings_stats_delete', 'bookings_stats_update',
+                                'bookings_archive_stats_insert', 'bookings_archive_stats_delete'):
+                    cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS property_stats (
+                    property_id INTEGER PRIMARY KEY,
+                    bookings_count INTEGER NOT NULL DEFAULT 0,
+                    paid_count INTEGER NOT NULL DEFAULT 0,
+                    booked_nights INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            for table in ('bookings', 'bookings_archive'):
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_stats_insert
+                    AFTER INSERT ON {table}
+                    BEGIN
+                        {_stats_delta_sql('NEW', 1)}
+                    END
+                ''')
+                cursor.execute(f'''
+                    CREATE TRIGGER IF NOT EXISTS {table}_stats_delete
+                    AFTER DELETE ON {table}
+                    BEGIN
+                        {_stats_delta_sql('OLD', -1)}
+                    END
+                ''')
+            cursor.execute(f'''
+                CREATE TRIGGER IF NOT EXISTS bookings_stats_update
+                AFTER UPDATE OF property_id, start_date, end_date, advance_paid ON bookings
+                BEGIN
+                    {_stats_delta_sql('OLD', -1)}
+                    {_stats_delta_sql('NEW', 1)}
+                END
+            ''')
+            if not stats_exists or stale_stats:
+                _rebuild_property_stats(cursor)
+            
             # Таблица фотографий объектов
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS property_photos (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     property_id INTEGER NOT NULL,
                     file_id TEXT NOT NULL,
+                    file_unique_id TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (property_id) REFERENCES properties(id)
                 )
@@ -91,10 +336,26 @@ class Database:
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     property_id INTEGER NOT NULL,
                     file_id TEXT NOT NULL,
+                    file_unique_id TEXT,
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (property_id) REFERENCES properties(id)
                 )
             ''')
+            
+            # Один и тот же файл не добавляется к объекту дважды
+            # (у старых записей без file_unique_id ограничение не действует)
+            for table in ('property_photos', 'property_videos'):
+                cursor.execute(f'PRAGMA table_info({table})')
+                if 'file_unique_id' not in [row['name'] for row in cursor.fetchall()]:
+                    cursor.execute(f'ALTER TABLE {table} ADD COLUMN file_unique_id TEXT')
+                cursor.execute(f'''
+                    CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_unique
+                    ON {table}(property_id, file_unique_id)
+                ''')
+            
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        if self.db_path != ':memory:':
+            _checked_schemas.add(self.db_path)
     
     # Методы для работы с администраторами
     def add_admin(self, user_id: int, phone: Optional[str] = None, 
@@ -109,8 +370,8 @@ class Database:
                 ''', (user_id, phone, telegram_username))
                 config.ADMIN_IDS.add(user_id)
                 return True
-        except Exception as e:
-            print(f"Ошибка при добавлении администратора: {e}")
+        except Exception:
+            logger.exception("Ошибка при добавлении администратора", extra={'user_id': user_id})
             return False
     
     def get_admin(self, user_id: int) -> Optional[Admin]:
@@ -125,7 +386,8 @@ class Database:
                     user_id=row['user_id'],
                     phone=row['phone'],
                     telegram_username=row['telegram_username'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
+                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
+                    notifications=row['notifications']
                 )
             return None
     
@@ -150,8 +412,8 @@ class Database:
                         WHERE user_id = ?
                     ''', params)
                 return True
-        except Exception as e:
-            print(f"Ошибка при обновлении контактов администратора: {e}")
+        except Exception:
+            logger.exception("Ошибка при обновлении контактов администратора", extra={'user_id': user_id})
             return False
     
     def get_all_admins(self) -> List[Admin]:
@@ -165,11 +427,48 @@ class Database:
                     user_id=row['user_id'],
                     phone=row['phone'],
                     telegram_username=row['telegram_username'],
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
+                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
+                    notifications=row['notifications']
                 )
                 for row in cursor.fetchall()
             ]
     
+    def set_admin_notifications(self, user_id: int, mode: str) -> bool:
+        """Изменить настройку уведомлений администратора (own, all, off)"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('UPDATE admins SET notifications = ? WHERE user_id = ?', (mode, user_id))
+                return cursor.rowcount > 0
+        except Exception:
+            logger.exception("Ошибка при изменении настройки уведомлений", extra={'user_id': user_id, 'mode': mode})
+            return False
+    
+    def get_watching_admins(self) -> List[int]:
+        """user_id администраторов, подписанных на уведомления по всем объектам"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT user_id FROM admins WHERE notifications = 'all' ORDER BY user_id")
+            return [row['user_id'] for row in cursor.fetchall()]
+    
+    def get_property_owners(self, property_ids: List[int]) -> Dict[int, Tuple[Optional[int], str]]:
+        """
+        Владельцы объектов и их настройка уведомлений: {property_id: (admin_id, notifications)}.
+        Один запрос по первичному ключу объектов и уникальному индексу admins.user_id
+        """
+        if not property_ids:
+            return {}
+        placeholders = ','.join('?' * len(property_ids))
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT p.id, p.admin_id, COALESCE(a.notifications, 'own') as notifications
+                FROM properties p
+                LEFT JOIN admins a ON a.user_id = p.admin_id
+                WHERE p.id IN ({placeholders})
+            ''', list(property_ids))
+            return {row['id']: (row['admin_id'], row['notifications']) for row in cursor.fetchall()}
+    
     # Методы для работы с объектами
     def add_property(self, name: str, admin_id: int, description: Optional[str] = None) -> Optional[int]:
         """Добавить объект"""
@@ -181,8 +480,8 @@ class Database:
                     VALUES (?, ?, ?)
                 ''', (name, description, admin_id))
                 return cursor.lastrowid
-        except Exception as e:
-            print(f"Ошибка при добавлении объекта: {e}")
+        except Exception:
+            logger.exception("Ошибка при добавлении объекта", extra={'admin_id': admin_id})
             return None
     
     def delete_property(self, property_id: int) -> bool:
@@ -194,10 +493,13 @@ class Database:
                 cursor.execute('DELETE FROM property_photos WHERE property_id = ?', (property_id,))
                 cursor.execute('DELETE FROM property_videos WHERE property_id = ?', (property_id,))
                 cursor.execute('DELETE FROM bookings WHERE property_id = ?', (property_id,))
+                cursor.execute('DELETE FROM bookings_archive WHERE property_id = ?', (property_id,))
+                cursor.execute('DELETE FROM property_booking_versions WHERE property_id = ?', (property_id,))
+                cursor.execute('DELETE FROM property_stats WHERE property_id = ?', (property_id,))
                 cursor.execute('DELETE FROM properties WHERE id = ?', (property_id,))
                 return True
-        except Exception as e:
-            print(f"Ошибка при удалении объекта: {e}")
+        except Exception:
+            logger.exception("Ошибка при удалении объекта", extra={'property_id': property_id})
             return False
     
     def get_property(self, property_id: int) -> Optional[Property]:
@@ -232,6 +534,55 @@ class Database:
                 for row in cursor.fetchall()
             ]
     
+    def get_admin_properties(self, admin_id: int) -> List[Property]:
+        """Получить объекты владельца (по индексу idx_properties_admin)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM properties WHERE admin_id = ? ORDER BY id', (admin_id,))
+            return [
+                Property(
+                    id=row['id'],
+                    name=row['name'],
+                    description=row['description'],
+                    admin_id=row['admin_id'],
+                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
+                )
+                for row in cursor.fetchall()
+            ]
+    
+    def search_properties(self, text: str, limit: int = 10, offset: int = 0) -> List[Property]:
+        """
+        Найти объекты по словам в названии и описании (индекс properties_fts).
+        Результаты упорядочены по bm25, совпадения в названии весят больше
+        """
+        terms = search.query_terms(text)
+        if not terms:
+            return []
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT p.* FROM properties_fts
+                    JOIN properties p ON p.id = properties_fts.rowid
+                    WHERE properties_fts MATCH ?
+                    ORDER BY bm25(properties_fts, ?, ?), p.id
+                    LIMIT ? OFFSET ?
+                ''', (search.match_expression(terms), search.NAME_WEIGHT, search.DESCRIPTION_WEIGHT,
+                      limit, offset))
+                return [
+                    Property(
+                        id=row['id'],
+                        name=row['name'],
+                        description=row['description'],
+                        admin_id=row['admin_id'],
+                        created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
+                    )
+                    for row in cursor.fetchall()
+                ]
+        except Exception:
+            logger.exception("Ошибка при поиске объектов", extra={'terms': len(terms), 'limit': limit, 'offset': offset})
+            return []
+    
     def update_property_description(self, property_id: int, description: str) -> bool:
         """Обновить описание объекта"""
         try:
@@ -241,36 +592,41 @@ class Database:
                     UPDATE properties SET description = ? WHERE id = ?
                 ''', (description, property_id))
                 return True
-        except Exception as e:
-            print(f"Ошибка при обновлении описания: {e}")
+        except Exception:
+            logger.exception("Ошибка при обновлении описания", extra={'property_id': property_id})
             return False
     
-    # Методы для работы с фотографиями
-    def add_property_photo(self, property_id: int, file_id: str) -> bool:
-        """Добавить фотографию к объекту"""
+    # Методы для работы с фотографиями и видео
+    def _add_media(self, table: str, property_id: int, file_id: str,
+                   file_unique_id: Optional[str], limit: int) -> bool:
+        """
+        Добавить файл одним условным INSERT: строка не вставляется, если достигнут лимит
+        или файл с таким file_unique_id уже есть у объекта
+        """
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                # Проверяем количество фотографий
-                cursor.execute('SELECT COUNT(*) as count FROM property_photos WHERE property_id = ?', 
-                             (property_id,))
-                count = cursor.fetchone()['count']
-                if count >= config.MAX_PHOTOS:
-                    return False
-                cursor.execute('''
-                    INSERT INTO property_photos (property_id, file_id)
-                    VALUES (?, ?)
-                ''', (property_id, file_id))
-                return True
-        except Exception as e:
-            print(f"Ошибка при добавлении фотографии: {e}")
+                cursor.execute(f'''
+                    INSERT OR IGNORE INTO {table} (property_id, file_id, file_unique_id)
+                    SELECT ?, ?, ?
+                    WHERE (SELECT COUNT(*) FROM {table} WHERE property_id = ?) < ?
+                ''', (property_id, file_id, file_unique_id, property_id, limit))
+                return cursor.rowcount == 1
+        except Exception:
+            logger.exception("Ошибка при добавлении медиафайла", extra={'table': table, 'property_id': property_id})
             return False
     
+    def add_property_photo(self, property_id: int, file_id: str,
+                           file_unique_id: Optional[str] = None) -> bool:
+        """Добавить фотографию к объекту"""
+        return self._add_media('property_photos', property_id, file_id, file_unique_id, config.MAX_PHOTOS)
+    
     def get_property_photos(self, property_id: int) -> List[str]:
         """Получить все фотографии объекта"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT file_id FROM property_photos WHERE property_id = ?', (property_id,))
+            cursor.execute('SELECT file_id FROM property_photos WHERE property_id = ? ORDER BY id',
+                           (property_id,))
             return [row['file_id'] for row in cursor.fetchall()]
     
     def delete_property_photo(self, property_id: int, file_id: str) -> bool:
@@ -282,38 +638,80 @@ class Database:
                     DELETE FROM property_photos WHERE property_id = ? AND file_id = ?
                 ''', (property_id, file_id))
                 return True
-        except Exception as e:
-            print(f"Ошибка при удалении фотографии: {e}")
+        except Exception:
+            logger.exception("Ошибка при удалении фотографии", extra={'property_id': property_id})
             return False
     
-    # Методы для работы с видео
-    def add_property_video(self, property_id: int, file_id: str) -> bool:
+    def add_property_video(self, property_id: int, file_id: str,
+                           file_unique_id: Optional[str] = None) -> bool:
         """Добавить видео к объекту"""
-        try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                # Проверяем количество видео
-                cursor.execute('SELECT COUNT(*) as count FROM property_videos WHERE property_id = ?', 
-                             (property_id,))
-                count = cursor.fetchone()['count']
-                if count >= config.MAX_VIDEOS:
-                    return False
-                cursor.execute('''
-                    INSERT INTO property_videos (property_id, file_id)
-                    VALUES (?, ?)
-                ''', (property_id, file_id))
-                return True
-        except Exception as e:
-            print(f"Ошибка при добавлении видео: {e}")
-            return False
+        return self._add_media('property_videos', property_id, file_id, file_unique_id, config.MAX_VIDEOS)
     
     def get_property_videos(self, property_id: int) -> List[str]:
         """Получить все видео объекта"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT file_id FROM property_videos WHERE property_id = ?', (property_id,))
+            cursor.execute('SELECT file_id FROM property_videos WHERE property_id = ? ORDER BY id',
+                           (property_id,))
             return [row['file_id'] for row in cursor.fetchall()]
     
+    def add_property_media_batch(self, property_id: int, kind: str,
+                                 items: List[Tuple[str, Optional[str]]]) -> Tuple[int, int]:
+        """
+        Добавить несколько файлов (kind: photo или video) одной транзакцией.
+        Лимит и уникальность проверяются для каждой строки.
+        Возвращает (добавлено, уже были у объекта); остальные не поместились в лимит
+        """
+        table, limit = ('property_photos', config.MAX_PHOTOS) if kind == 'photo' \
+            else ('property_videos', config.MAX_VIDEOS)
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                added = duplicates = 0
+                for file_id, file_unique_id in items:
+                    cursor.execute(f'''
+                        INSERT OR IGNORE INTO {table} (property_id, file_id, file_unique_id)
+                        SELECT ?, ?, ?
+                        WHERE (SELECT COUNT(*) FROM {table} WHERE property_id = ?) < ?
+                    ''', (property_id, file_id, file_unique_id, property_id, limit))
+                    if cursor.rowcount == 1:
+                        added += 1
+                        continue
+                    # Строка отклонена: файл уже есть у объекта или достигнут лимит
+                    if file_unique_id is not None and cursor.execute(
+                            f'SELECT 1 FROM {table} WHERE property_id = ? AND file_unique_id = ?',
+                            (property_id, file_unique_id)).fetchone():
+                        duplicates += 1
+                return added, duplicates
+        except Exception:
+            logger.exception("Ошибка при добавлении медиафайлов", extra={'kind': kind, 'property_id': property_id, 'items': len(items)})
+            return 0, 0
+    
+    def get_property_media(self, property_id: int) -> Tuple[List[PropertyPhoto], List[PropertyVideo]]:
+        """Получить фотографии и видео объекта одним запросом (в порядке добавления)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT 'photo' AS kind, id, property_id, file_id, file_unique_id, created_at
+                FROM property_photos WHERE property_id = ?
+                UNION ALL
+                SELECT 'video', id, property_id, file_id, file_unique_id, created_at
+                FROM property_videos WHERE property_id = ?
+                ORDER BY kind, id
+            ''', (property_id, property_id))
+            photos, videos = [], []
+            for row in cursor.fetchall():
+                model = PropertyPhoto if row['kind'] == 'photo' else PropertyVideo
+                item = model(
+                    id=row['id'],
+                    property_id=row['property_id'],
+                    file_id=row['file_id'],
+                    file_unique_id=row['file_unique_id'],
+                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
+                )
+                (photos if row['kind'] == 'photo' else videos).append(item)
+            return photos, videos
+    
     def delete_property_video(self, property_id: int, file_id: str) -> bool:
         """Удалить видео объекта"""
         try:
@@ -323,28 +721,86 @@ class Database:
                     DELETE FROM property_videos WHERE property_id = ? AND file_id = ?
                 ''', (property_id, file_id))
                 return True
-        except Exception as e:
-            print(f"Ошибка при удалении видео: {e}")
+        except Exception:
+            logger.exception("Ошибка при удалении видео", extra={'property_id': property_id})
             return False
     
     # Методы для работы с бронированиями
     def add_booking(self, property_id: int, user_id: int, user_username: Optional[str],
-                   user_phone: Optional[str], start_date: datetime, end_date: datetime) -> Optional[int]:
-        """Добавить бронирование"""
+                   user_phone: Optional[str], start_date: datetime, end_date: datetime,
+                   expires_at: Optional[datetime] = None) -> Optional[int]:
+        """Добавить бронирование (с expires_at - бронь, которая снимается, если не оплачена к сроку)"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO bookings (property_id, user_id, user_username, user_phone, 
-                                         start_date, end_date)
-                    VALUES (?, ?, ?, ?, ?, ?)
+                                         start_date, end_date, expires_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
                 ''', (property_id, user_id, user_username, user_phone, 
-                     start_date.date(), end_date.date()))
+                     start_date.date(), end_date.date(), _timestamp(expires_at)))
                 return cursor.lastrowid
-        except Exception as e:
-            print(f"Ошибка при добавлении бронирования: {e}")
+        except Exception:
+            logger.exception("Ошибка при добавлении бронирования", extra={'property_id': property_id, 'user_id': user_id})
             return None
     
+    def add_bookings_batch(self, user_id: int, user_username: Optional[str], user_phone: Optional[str],
+                           ranges: List[Tuple[int, datetime, datetime]],
+                           expires_at: Optional[datetime] = None
+                           ) -> Tuple[List[int], List[Tuple[Tuple[int, datetime, datetime], str]]]:
+        """
+        Добавить несколько бронирований (объект, начало, конец) одной транзакцией по принципу
+        "все или ничего". Возвращает (ID добавленных, []) или ([], конфликты с причинами)
+        """
+        conflicts = []
+        today = date.today()
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # Блокировка записи до проверки, чтобы между проверкой и вставкой не вклинились
+                cursor.execute('BEGIN IMMEDIATE')
+                accepted: Dict[int, List[Tuple[datetime, datetime]]] = {}
+                for item in ranges:
+                    property_id, start_date, end_date = item
+                    if start_date > end_date:
+                        conflicts.append((item, 'неверный диапазон дат'))
+                        continue
+                    if start_date.date() < today:
+                        conflicts.append((item, 'дата заезда уже прошла'))
+                        continue
+                    cursor.execute('SELECT 1 FROM properties WHERE id = ?', (property_id,))
+                    if cursor.fetchone() is None:
+                        conflicts.append((item, 'объект не найден'))
+                        continue
+                    if any(start <= end_date and end >= start_date
+                           for start, end in accepted.get(property_id, ())):
+                        conflicts.append((item, 'пересекается с другим периодом заказа'))
+                        continue
+                    cursor.execute('''
+                        SELECT 1 FROM bookings
+                        WHERE property_id = ? AND end_date >= ? AND start_date <= ?
+                        LIMIT 1
+                    ''', (property_id, start_date.date(), end_date.date()))
+                    if cursor.fetchone():
+                        conflicts.append((item, 'даты уже забронированы'))
+                        continue
+                    accepted.setdefault(property_id, []).append((start_date, end_date))
+                if conflicts:
+                    return [], conflicts
+                booking_ids = []
+                for property_id, start_date, end_date in ranges:
+                    cursor.execute('''
+                        INSERT INTO bookings (property_id, user_id, user_username, user_phone,
+                                              start_date, end_date, expires_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', (property_id, user_id, user_username, user_phone, start_date.date(), end_date.date(),
+                          _timestamp(expires_at)))
+                    booking_ids.append(cursor.lastrowid)
+                return booking_ids, []
+        except Exception:
+            logger.exception("Ошибка при добавлении бронирований", extra={'user_id': user_id, 'ranges': len(ranges)})
+            return [], [(item, 'ошибка базы данных') for item in ranges]
+    
     def check_date_availability(self, property_id: int, start_date: datetime, 
                                end_date: datetime, exclude_booking_id: Optional[int] = None) -> bool:
         """Проверить доступность дат для бронирования"""
@@ -375,6 +831,38 @@ class Database:
                      end_date.date(), end_date.date(), start_date.date(), end_date.date()))
             return cursor.fetchone()['count'] == 0
     
+    def get_booking(self, booking_id: int) -> Optional[Booking]:
+        """Получить бронирование по ID"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT * FROM bookings WHERE id = ?', (booking_id,))
+            row = cursor.fetchone()
+            return _row_to_booking(row) if row else None
+    
+    def get_admin_bookings(self, admin_id: Optional[int] = None,
+                           limit: Optional[int] = None) -> List[Tuple[Booking, str]]:
+        """
+        Бронирования объектов владельца в порядке дат одним запросом с JOIN
+        (admin_id=None - всех объектов). Возвращает (бронирование, название объекта)
+        """
+        query = '''
+            SELECT b.*, p.name as property_name
+            FROM properties p
+            JOIN bookings b ON b.property_id = p.id
+        '''
+        params: list = []
+        if admin_id is not None:
+            query += ' WHERE p.admin_id = ?'
+            params.append(admin_id)
+        query += ' ORDER BY b.start_date, b.id'
+        if limit is not None:
+            query += ' LIMIT ?'
+            params.append(limit)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            return [(_row_to_booking(row), row['property_name']) for row in cursor.fetchall()]
+    
     def get_property_bookings(self, property_id: int) -> List[Booking]:
         """Получить все бронирования объекта"""
         with self.get_connection() as conn:
@@ -382,22 +870,34 @@ class Database:
             cursor.execute('''
                 SELECT * FROM bookings WHERE property_id = ? ORDER BY start_date
             ''', (property_id,))
-            return [
-                Booking(
-                    id=row['id'],
-                    property_id=row['property_id'],
-                    user_id=row['user_id'],
-                    user_username=row['user_username'],
-                    user_phone=row['user_phone'],
-                    start_date=datetime.fromisoformat(row['start_date']) if isinstance(row['start_date'], str) 
-                             else datetime.combine(row['start_date'], datetime.min.time()),
-                    end_date=datetime.fromisoformat(row['end_date']) if isinstance(row['end_date'], str)
-                           else datetime.combine(row['end_date'], datetime.min.time()),
-                    advance_paid=bool(row['advance_paid']),
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-                for row in cursor.fetchall()
-            ]
+            return [_row_to_booking(row) for row in cursor.fetchall()]
+    
+    def iter_property_bookings(self, property_id: int, batch_size: int = 500) -> Iterator[Booking]:
+        """Построчно выдать бронирования объекта в порядке дат"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT * FROM bookings WHERE property_id = ? ORDER BY start_date
+            ''', (property_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield _row_to_booking(row)
+    
+    def get_calendar_state(self, property_id: int) -> Optional[Tuple[str, int]]:
+        """Получить название объекта и версию его бронирований (None, если объекта нет)"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT p.name, COALESCE(v.version, 0) as version
+                FROM properties p
+                LEFT JOIN property_booking_versions v ON v.property_id = p.id
+                WHERE p.id = ?
+            ''', (property_id,))
+            row = cursor.fetchone()
+            return (row['name'], row['version']) if row else None
     
     def get_user_bookings(self, user_id: int) -> List[Booking]:
         """Получить все бронирования пользователя"""
@@ -406,22 +906,7 @@ class Database:
             cursor.execute('''
                 SELECT * FROM bookings WHERE user_id = ? ORDER BY start_date
             ''', (user_id,))
-            return [
-                Booking(
-                    id=row['id'],
-                    property_id=row['property_id'],
-                    user_id=row['user_id'],
-                    user_username=row['user_username'],
-                    user_phone=row['user_phone'],
-                    start_date=datetime.fromisoformat(row['start_date']) if isinstance(row['start_date'], str)
-                             else datetime.combine(row['start_date'], datetime.min.time()),
-                    end_date=datetime.fromisoformat(row['end_date']) if isinstance(row['end_date'], str)
-                           else datetime.combine(row['end_date'], datetime.min.time()),
-                    advance_paid=bool(row['advance_paid']),
-                    created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None
-                )
-                for row in cursor.fetchall()
-            ]
+            return [_row_to_booking(row) for row in cursor.fetchall()]
     
     def delete_booking(self, booking_id: int, user_id: int) -> bool:
         """Удалить бронирование (только свое)"""
@@ -432,44 +917,374 @@ class Database:
                     DELETE FROM bookings WHERE id = ? AND user_id = ?
                 ''', (booking_id, user_id))
                 return cursor.rowcount > 0
-        except Exception as e:
-            print(f"Ошибка при удалении бронирования: {e}")
+        except Exception:
+            logger.exception("Ошибка при удалении бронирования", extra={'booking_id': booking_id, 'user_id': user_id})
             return False
     
     def set_advance_paid(self, booking_id: int, paid: bool) -> bool:
-        """Установить признак оплаты аванса"""
+        """Установить признак оплаты аванса (оплаченная бронь становится бессрочной)"""
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
-                    UPDATE bookings SET advance_paid = ? WHERE id = ?
-                ''', (1 if paid else 0, booking_id))
+                    UPDATE bookings
+                    SET advance_paid = ?, expires_at = CASE WHEN ? THEN NULL ELSE expires_at END
+                    WHERE id = ?
+                ''', (1 if paid else 0, 1 if paid else 0, booking_id))
                 return True
-        except Exception as e:
-            print(f"Ошибка при установке признака оплаты: {e}")
+        except Exception:
+            logger.exception("Ошибка при установке признака оплаты", extra={'booking_id': booking_id, 'paid': paid})
             return False
     
-    def get_booking_statistics(self) -> List[dict]:
-        """Получить статистику бронирований"""
+    def get_booking_statistics(self, admin_id: Optional[int] = None) -> List[dict]:
+        """
+        Получить статистику бронирований (включая архив) из счетчиков property_stats.
+        admin_id - только объекты владельца
+        """
+        query = '''
+            SELECT 
+                p.id as property_id,
+                p.name as property_name,
+                COALESCE(s.bookings_count, 0) as bookings_count,
+                COALESCE(s.paid_count, 0) as paid_count,
+                COALESCE(s.booked_nights, 0) as booked_nights
+            FROM properties p
+            LEFT JOIN property_stats s ON s.property_id = p.id
+        '''
+        params = ()
+        if admin_id is not None:
+            query += ' WHERE p.admin_id = ?'
+            params = (admin_id,)
         with self.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT 
-                    p.id as property_id,
-                    p.name as property_name,
-                    COUNT(b.id) as bookings_count,
-                    SUM(CASE WHEN b.advance_paid = 1 THEN 1 ELSE 0 END) as paid_count
-                FROM properties p
-                LEFT JOIN bookings b ON p.id = b.property_id
-                GROUP BY p.id, p.name
-                ORDER BY p.id
-            ''')
+            cursor.execute(query + ' ORDER BY p.id', params)
             return [
                 {
                     'property_id': row['property_id'],
                     'property_name': row['property_name'],
                     'bookings_count': row['bookings_count'],
-                    'paid_count': row['paid_count']
+                    'paid_count': row['paid_count'],
+                    'booked_nights': row['booked_nights']
                 }
                 for row in cursor.fetchall()
             ]
+    
+    def get_booking_day_spans(self, start: datetime, end: datetime) -> List[Tuple[int, int, int, int]]:
+        """
+        Бронирования (включая архив), пересекающие [start, end], в виде чисел:
+        (property_id, день начала, день окончания, день создания), дни - от 1970-01-01.
+        Преобразование дат выполняет SQLite, поэтому результат сразу подходит для NumPy.
+        """
+        columns = f'''
+            property_id,
+            CAST(julianday(start_date) - {_UNIX_EPOCH_JULIAN} AS INTEGER),
+            CAST(julianday(end_date) - {_UNIX_EPOCH_JULIAN} AS INTEGER),
+            CAST(julianday(date(COALESCE(created_at, start_date))) - {_UNIX_EPOCH_JULIAN} AS INTEGER)
+        '''
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT {columns} FROM bookings WHERE end_date >= ? AND start_date <= ?
+                UNION ALL
+                SELECT {columns} FROM bookings_archive WHERE end_date >= ? AND start_date <= ?
+            ''', (start.date(), end.date()) * 2)
+            return [tuple(row) for row in cursor.fetchall()]
+    
+    def rebuild_property_stats(self) -> bool:
+        """Пересчитать счетчики статистики по всем бронированиям и архиву"""
+        try:
+            with self.get_connection() as conn:
+                _rebuild_property_stats(conn.cursor())
+                return True
+        except Exception:
+            logger.exception("Ошибка при пересчете статистики")
+            return False
+    
+    # Методы для архивации
+    def archive_bookings(self, cutoff: datetime, batch_size: int = 500) -> int:
+        """
+        Перенести в архив бронирования, закончившиеся до cutoff.
+        Перенос идет порциями, каждая в своей транзакции. Возвращает число перенесенных.
+        """
+        archived = 0
+        while True:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT id FROM bookings WHERE end_date < ? ORDER BY end_date LIMIT ?
+                ''', (cutoff.date(), batch_size))
+                ids = [row['id'] for row in cursor.fetchall()]
+                if not ids:
+                    break
+                placeholders = ','.join('?' * len(ids))
+                cursor.execute(f'''
+                    INSERT OR REPLACE INTO bookings_archive (id, property_id, user_id, user_username, user_phone,
+                                                             start_date, end_date, advance_paid, created_at)
+                    SELECT id, property_id, user_id, user_username, user_phone,
+                           start_date, end_date, advance_paid, created_at
+                    FROM bookings WHERE id IN ({placeholders})
+                ''', ids)
+                cursor.execute(f'DELETE FROM bookings WHERE id IN ({placeholders})', ids)
+                archived += len(ids)
+            if len(ids) < batch_size:
+                break
+        return archived
+    
+    # Методы для временных броней
+    def release_expired_holds(self, now: datetime, batch_size: int = 500) -> List[Booking]:
+        """
+        Удалить неоплаченные брони со сроком expires_at <= now.
+        Выборка идет по частичному индексу idx_bookings_expires, удаление - порциями,
+        каждая в своей транзакции. Возвращает удаленные бронирования.
+        """
+        released = []
+        while True:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute('''
+                    SELECT * FROM bookings
+                    WHERE expires_at <= ? AND advance_paid = 0
+                    ORDER BY expires_at LIMIT ?
+                ''', (_timestamp(now), batch_size))
+                batch = [_row_to_booking(row) for row in cursor.fetchall()]
+                if not batch:
+                    break
+                placeholders = ','.join('?' * len(batch))
+                cursor.execute(f'DELETE FROM bookings WHERE id IN ({placeholders})',
+                               [booking.id for booking in batch])
+                released.extend(batch)
+            if len(batch) < batch_size:
+                break
+        return released
+    
+    # Методы для напоминаний
+    def get_bookings_due_for_reminder(self, start: datetime, end: datetime,
+                                      kind: str) -> List[Tuple[Booking, str, Optional[int]]]:
+        """
+        Бронирования с заездом в [start, end], по которым напоминание kind еще не отправлено.
+        Возвращает (бронирование, название объекта, user_id владельца).
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT b.*, p.name as property_name, p.admin_id as owner_id
+                FROM bookings b
+                JOIN properties p ON p.id = b.property_id
+                WHERE b.start_date BETWEEN ? AND ?
+                AND NOT EXISTS (
+                    SELECT 1 FROM sent_reminders r WHERE r.booking_id = b.id AND r.kind = ?
+                )
+                ORDER BY b.start_date
+            ''', (start.date(), end.date(), kind))
+            return [(_row_to_booking(row), row['property_name'], row['owner_id'])
+                    for row in cursor.fetchall()]
+    
+    def mark_reminders_sent(self, booking_ids: List[int], kind: str) -> bool:
+        """Отметить напоминания как отправленные"""
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO sent_reminders (booking_id, kind) VALUES (?, ?)
+                ''', [(booking_id, kind) for booking_id in booking_ids])
+                return True
+        except Exception:
+            logger.exception("Ошибка при сохранении отметки о напоминании", extra={'bookings': len(booking_ids), 'kind': kind})
+            return False
+    
+    # Методы для массового импорта и экспорта
+    def iter_properties(self, batch_size: int = 1000, admin_id: Optional[int] = None) -> Iterator[dict]:
+        """Построчно выдать объекты (без загрузки таблицы в память; admin_id - только объекты владельца)"""
+        query = 'SELECT id, name, description, admin_id, created_at FROM properties'
+        params: list = []
+        if admin_id is not None:
+            query += ' WHERE admin_id = ?'
+            params.append(admin_id)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query + ' ORDER BY id', params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+    
+    def iter_bookings(self, batch_size: int = 1000, include_archive: bool = False,
+                      admin_id: Optional[int] = None) -> Iterator[dict]:
+        """
+        Построчно выдать бронирования (без загрузки таблицы в память).
+        admin_id - только бронирования объектов владельца (JOIN с properties)
+        """
+        columns = ', '.join(f'b.{column} AS {column}' for column in (
+            'id', 'property_id', 'user_id', 'user_username', 'user_phone',
+            'start_date', 'end_date', 'advance_paid', 'created_at'))
+        tables = ['bookings', 'bookings_archive'] if include_archive else ['bookings']
+        params: list = []
+        selects = []
+        for table in tables:
+            select = f'SELECT {columns} FROM {table} b'
+            if admin_id is not None:
+                select += ' JOIN properties p ON p.id = b.property_id WHERE p.admin_id = ?'
+                params.append(admin_id)
+            selects.append(select)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(' UNION ALL '.join(selects) + ' ORDER BY id', params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(row)
+    
+    def bulk_add_properties(self, rows: Iterable[dict], chunk_size: int = 500) -> int:
+        """
+        Массово добавить объекты порциями в отдельных транзакциях.
+        Объекты с уже существующим id пропускаются. Возвращает число добавленных.
+        """
+        inserted = 0
+        for chunk in _chunks(rows, chunk_size):
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                # rowcount, а не total_changes: вставки триггеров в properties_fts не считаются
+                cursor.executemany('''
+                    INSERT OR IGNORE INTO properties (id, name, description, admin_id)
+                    VALUES (?, ?, ?, ?)
+                ''', [(row.get('id'), row['name'], row.get('description'), row.get('admin_id'))
+                      for row in chunk])
+                inserted += cursor.rowcount
+        return inserted
+    
+    def bulk_add_bookings(self, rows: Iterable[dict],
+                          chunk_size: int = 500) -> Tuple[int, List[Tuple[dict, str]]]:
+        """
+        Массово добавить бронирования порциями в отдельных транзакциях.
+        Каждая строка проверяется на пересечение с существующими бронированиями
+        и с уже принятыми строками импорта. Возвращает (число добавленных, отклоненные строки с причиной).
+        """
+        inserted = 0
+        rejected: List[Tuple[dict, str]] = []
+        property_ids = None
+        for chunk in _chunks(rows, chunk_size):
+            # Строки предыдущих порций уже в таблице, внутри порции проверяем по памяти
+            accepted: Dict[int, List[Tuple[datetime, datetime]]] = {}
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                if property_ids is None:
+                    cursor.execute('SELECT id FROM properties')
+                    property_ids = {row['id'] for row in cursor.fetchall()}
+                to_insert = []
+                for row in chunk:
+                    property_id = row['property_id']
+                    start_date, end_date = row['start_date'], row['end_date']
+                    if property_id not in property_ids:
+                        rejected.append((row, 'объект не найден'))
+                        continue
+                    if start_date > end_date:
+                        rejected.append((row, 'неверный диапазон дат'))
+                        continue
+                    if any(start <= end_date and end >= start_date
+                           for start, end in accepted.get(property_id, ())):
+                        rejected.append((row, 'пересечение внутри импорта'))
+                        continue
+                    cursor.execute('''
+                        SELECT 1 FROM bookings
+                        WHERE property_id = ? AND end_date >= ? AND start_date <= ?
+                        LIMIT 1
+                    ''', (property_id, start_date.date(), end_date.date()))
+                    if cursor.fetchone():
+                        rejected.append((row, 'даты уже забронированы'))
+                        continue
+                    accepted.setdefault(property_id, []).append((start_date, end_date))
+                    to_insert.append((
+                        property_id, row['user_id'], row.get('user_username'), row.get('user_phone'),
+                        start_date.date(), end_date.date(), 1 if row.get('advance_paid') else 0
+                    ))
+                if to_insert:
+                    cursor.executemany('''
+                        INSERT INTO bookings (property_id, user_id, user_username, user_phone,
+                                             start_date, end_date, advance_paid)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                    ''', to_insert)
+                    inserted += len(to_insert)
+        return inserted, rejected
+
+
+def _nights_sql(prefix: str = '') -> str:
+    """
+    SQL числа ночей бронирования: дата выезда - последний день проживания (как в календаре и .ics),
+    поэтому ночей на одну больше разности дат (как в analytics.compute_occupancy)
+    """
+    return f'(CAST(julianday({prefix}end_date) - julianday({prefix}start_date) AS INTEGER) + 1)'
+
+
+def _stats_delta_sql(ref: str, sign: int) -> str:
+    """SQL для триггера: прибавить (sign=1) или вычесть (sign=-1) бронирование ref из счетчиков"""
+    return f'''
+        INSERT INTO property_stats (property_id, bookings_count, paid_count, booked_nights)
+        VALUES (
+            {ref}.property_id,
+            {sign},
+            {sign} * ({ref}.advance_paid = 1),
+            {sign} * {_nights_sql(ref + '.')}
+        )
+        ON CONFLICT(property_id) DO UPDATE SET
+            bookings_count = bookings_count + excluded.bookings_count,
+            paid_count = paid_count + excluded.paid_count,
+            booked_nights = booked_nights + excluded.booked_nights;
+    '''
+
+
+def _rebuild_property_stats(cursor):
+    """Заполнить property_stats заново по bookings и bookings_archive"""
+    cursor.execute('DELETE FROM property_stats')
+    cursor.execute(f'''
+        INSERT INTO property_stats (property_id, bookings_count, paid_count, booked_nights)
+        SELECT
+            property_id,
+            COUNT(*),
+            SUM(advance_paid = 1),
+            SUM({_nights_sql()})
+        FROM (
+            SELECT property_id, start_date, end_date, advance_paid FROM bookings
+            UNION ALL
+            SELECT property_id, start_date, end_date, advance_paid FROM bookings_archive
+        )
+        GROUP BY property_id
+    ''')
+
+
+def _row_to_booking(row) -> Booking:
+    """Преобразовать строку таблицы bookings в модель"""
+    return Booking(
+        id=row['id'],
+        property_id=row['property_id'],
+        user_id=row['user_id'],
+        user_username=row['user_username'],
+        user_phone=row['user_phone'],
+        start_date=datetime.fromisoformat(row['start_date']) if isinstance(row['start_date'], str)
+                 else datetime.combine(row['start_date'], datetime.min.time()),
+        end_date=datetime.fromisoformat(row['end_date']) if isinstance(row['end_date'], str)
+               else datetime.combine(row['end_date'], datetime.min.time()),
+        advance_paid=bool(row['advance_paid']),
+        created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else None,
+        expires_at=datetime.fromisoformat(row['expires_at']) if row['expires_at'] else None
+    )
+
+
+def _timestamp(value: Optional[datetime]) -> Optional[str]:
+    """Время в формате колонок TIMESTAMP (сравнивается как строка)"""
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    """Разбить поток строк на порции"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
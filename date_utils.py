@@ -3,7 +3,7 @@
 """
 from datetime import datetime, timedelta
 from typing import List, Tuple
-from database import Database
+from storage import Storage
 
 
 def parse_date(date_str: str) -> datetime:
@@ -20,7 +20,7 @@ def format_date(date: datetime) -> str:
 
 
 def get_available_dates(property_id: int, start_date: datetime, 
-                       end_date: datetime, db: Database) -> List[Tuple[datetime, datetime]]:
+                       end_date: datetime, db: Storage) -> List[Tuple[datetime, datetime]]:
     """
     Получить список доступных периодов для бронирования
     Возвращает список кортежей (start, end) доступных периодов
@@ -54,7 +54,7 @@ def get_available_dates(property_id: int, start_date: datetime,
 
 
 def find_nearest_available_dates(property_id: int, start_date: datetime, 
-                                 end_date: datetime, db: Database, 
+                                 end_date: datetime, db: Storage, 
                                  days_ahead: int = 30) -> List[Tuple[datetime, datetime]]:
     """
     Найти ближайшие доступные даты после запрошенного периода
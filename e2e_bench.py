@@ -0,0 +1,602 @@
+"""
+Сквозной замер пропускной способности бота: локальная замена Telegram Bot API и сценарий нагрузки.
+
+Бот (HouseReservBot целиком: обработчики, хранилище, ограничители, JobQueue) обращается к локальному
+серверу через BOT_API_BASE_URL. Сервер раздает обновления сценария через getUpdates (режим polling)
+или отправляет их на webhook бота (режим webhook) и записывает вызовы методов (sendMessage,
+editMessageText, sendMediaGroup и остальные). Виртуальный пользователь отправляет следующее
+обновление, когда бот полностью ответил на предыдущее, поэтому число обработанных обновлений
+в секунду - устойчивая пропускная способность бота вместе с сетевым циклом.
+
+Использование из командной строки:
+    python e2e_bench.py --mode polling --users 50 --duration 30
+    python e2e_bench.py --mode webhook --users 50 --duration 30 --storage memory
+"""
+import argparse
+import asyncio
+import http.client
+import itertools
+import json
+import os
+import queue
+import socket
+import tempfile
+import threading
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl
+
+import config
+import logs
+from bot import HouseReservBot
+
+BOT_TOKEN = '123456:BENCH'
+BOT_USER = {
+    'id': 123456, 'is_bot': True, 'first_name': 'HouseReserv', 'username': 'house_reserv_bench_bot',
+    'can_join_groups': True, 'can_read_all_group_messages': False, 'supports_inline_queries': True,
+}
+
+# ID первого виртуального пользователя (он же ID его личного чата) и владельца объектов стенда
+FIRST_USER_ID = 10_000
+OWNER_ID = 1_000
+
+# Слово из названия всех объектов стенда: поиск находит каждый объект
+SEARCH_TEXT = 'озера'
+
+# Сколько фотографий объекта бот отправляет вместе с описанием (user_handlers._show_property_info)
+PHOTOS_SHOWN = 5
+
+WEBHOOK_PATH = 'telegram'
+WEBHOOK_SECRET = 'bench-secret'
+
+# Методы, которые не считаются ответом пользователю
+NOT_REPLIES = frozenset({'sendChatAction'})
+
+
+@dataclass(frozen=True)
+class Step:
+    """Обновление сценария (текст сообщения или данные кнопки) и число ожидаемых запросов бота в чат"""
+    text: str
+    callback: bool = False
+    replies: int = 1
+
+
+def script(property_id: int, photos: int) -> List[Step]:
+    """
+    Сценарий пользователя: меню, список объектов, объект с фотографиями, календарь, поиск и возврат в меню.
+    Соседние редактирования одного сообщения различаются, иначе EditAwareBot их пропустит
+    """
+    return [
+        Step('/start'),
+        Step('user_properties', callback=True),
+        Step(f'user_property_{property_id}', callback=True, replies=1 + min(photos, PHOTOS_SHOWN)),
+        Step(f'user_book_{property_id}', callback=True),
+        Step('user_search', callback=True),
+        Step(SEARCH_TEXT),
+        Step('user_back', callback=True),
+    ]
+
+
+class VirtualUser:
+    """Пользователь, который ждет полного ответа бота перед следующим обновлением"""
+
+    def __init__(self, user_id: int, steps: List[Step]):
+        self.id = user_id
+        self.steps = steps
+        self.position = 0
+        # Последнее сообщение бота в чате: к нему привязаны нажатия кнопок
+        self.message_id = 0
+        self.step: Optional[Step] = None
+        self.dispatched_at: Optional[float] = None
+        self.first_reply_at: Optional[float] = None
+        self.replies = 0
+
+    def next_step(self) -> Step:
+        step = self.steps[self.position % len(self.steps)]
+        self.position += 1
+        return step
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    return values[min(len(values) - 1, int(fraction * len(values)))] if values else 0.0
+
+
+def _parse_params(content_type: str, body: bytes) -> Dict[str, object]:
+    """
+    Параметры запроса бота: форма (значения-строки, сложные значения в JSON) или multipart при загрузке файлов.
+    chat_id и message_id приводятся к int, media разбирается из JSON
+    """
+    if content_type.startswith('multipart/form-data'):
+        message = BytesParser(policy=HTTP).parsebytes(
+            b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body)
+        params = {}
+        for part in message.iter_parts():
+            name = part.get_param('name', header='content-disposition')
+            if part.get_filename():
+                params[name] = '<file>'
+            else:
+                params[name] = part.get_payload(decode=True).decode('utf-8')
+    else:
+        params = dict(parse_qsl(body.decode('utf-8'), keep_blank_values=True))
+    for key in ('chat_id', 'message_id'):
+        value = params.get(key)
+        if isinstance(value, str) and value.lstrip('-').isdigit():
+            params[key] = int(value)
+    if isinstance(params.get('media'), str):
+        params['media'] = json.loads(params['media'])
+    return params
+
+
+class _ApiRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Заголовки и тело ответа уходят разными записями: без TCP_NODELAY каждый ответ ждал бы ~40 мс
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        method = self.path.rstrip('/').rsplit('/', 1)[-1]
+        params = _parse_params(self.headers.get('Content-Type', ''), body)
+        payload = json.dumps({'ok': True, 'result': self.server.api.call(method, params)}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except OSError:
+            # Бот закрыл соединение при остановке, не дождавшись ответа getUpdates
+            self.close_connection = True
+
+    do_GET = do_POST
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeBotApi:
+    """
+    Локальная замена Bot API: отдает getUpdates из очереди сценария (с ожиданием, как long polling),
+    на остальные методы отвечает правдоподобными объектами и считает вызовы.
+    on_reply(chat_id, method, message_id, время) вызывается для каждого запроса бота в чат
+    """
+
+    def __init__(self, on_reply: Callable[[int, str, Optional[int], float], None], host: str = '127.0.0.1'):
+        self.on_reply = on_reply
+        self.calls: Counter = Counter()
+        self._lock = threading.Lock()
+        self._pending: deque = deque()
+        self._pending_ready = threading.Condition()
+        self._message_ids = itertools.count(1)
+        self._closed = False
+        self._server = ThreadingHTTPServer((host, 0), _ApiRequestHandler)
+        self._server.daemon_threads = True
+        self._server.api = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/bot'
+
+    @property
+    def file_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/file/bot'
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fake-bot-api', daemon=True)
+        self._thread.start()
+
+    def close(self):
+        with self._pending_ready:
+            self._closed = True
+            self._pending_ready.notify_all()
+        self._server.shutdown()
+        self._server.server_close()
+
+    def enqueue(self, update: dict, on_deliver: Callable[[float], None]):
+        """Поставить обновление в очередь getUpdates; on_deliver вызывается в момент выдачи боту"""
+        with self._pending_ready:
+            self._pending.append((update, on_deliver))
+            self._pending_ready.notify()
+
+    def next_message_id(self) -> int:
+        return next(self._message_ids)
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def call(self, method: str, params: dict):
+        with self._lock:
+            self.calls[method] += 1
+        if method == 'getUpdates':
+            return self._get_updates(params)
+        if method == 'getMe':
+            return BOT_USER
+        now = time.monotonic()
+        chat_id = params.get('chat_id')
+        if method == 'sendMediaGroup':
+            result = [self._message(chat_id, {}) for _ in params.get('media') or ()]
+            message_id = result[0]['message_id'] if result else None
+        elif method.startswith('send'):
+            result = self._message(chat_id, params)
+            message_id = result['message_id']
+        elif method.startswith('editMessage') and chat_id is not None:
+            result = self._message(chat_id, params, params.get('message_id'))
+            message_id = result['message_id']
+        else:
+            result, message_id = True, None
+        if isinstance(chat_id, int) and method not in NOT_REPLIES:
+            self.on_reply(chat_id, method, message_id, now)
+        return result
+
+    def _message(self, chat_id: int, params: dict, message_id: int = None) -> dict:
+        message = {
+            'message_id': message_id or self.next_message_id(),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private' if isinstance(chat_id, int) and chat_id > 0 else 'group'},
+            'from': BOT_USER,
+        }
+        for key in ('text', 'caption'):
+            if isinstance(params.get(key), str):
+                message[key] = params[key]
+        return message
+
+    def _get_updates(self, params: dict) -> List[dict]:
+        deadline = time.monotonic() + float(params.get('timeout') or 0)
+        limit = int(params.get('limit') or 100)
+        with self._pending_ready:
+            while not self._pending and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._pending_ready.wait(remaining)
+            batch = [self._pending.popleft() for _ in range(min(limit, len(self._pending)))]
+        now = time.monotonic()
+        for _, on_deliver in batch:
+            on_deliver(now)
+        return [update for update, _ in batch]
+
+
+class _WebhookSender(threading.Thread):
+    """Поток, который отправляет обновления на webhook бота по постоянному соединению"""
+
+    def __init__(self, port: int, jobs: 'queue.SimpleQueue', on_error: Callable[[], None]):
+        super().__init__(name='webhook-sender', daemon=True)
+        self.port = port
+        self.jobs = jobs
+        self.on_error = on_error
+
+    def run(self):
+        connection = None
+        headers = {'Content-Type': 'application/json', 'X-Telegram-Bot-Api-Secret-Token': WEBHOOK_SECRET}
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            update, on_deliver = job
+            body = json.dumps(update).encode('utf-8')
+            on_deliver(time.monotonic())
+            try:
+                if connection is None:
+                    connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+                connection.request('POST', f'/{WEBHOOK_PATH}', body, headers)
+                response = connection.getresponse()
+                response.read()
+                if response.status != 200:
+                    self.on_error()
+            except (OSError, http.client.HTTPException):
+                self.on_error()
+                if connection is not None:
+                    connection.close()
+                connection = None
+        if connection is not None:
+            connection.close()
+
+
+@dataclass
+class BenchReport:
+    """Результат замера за период измерения (без разогрева)"""
+    mode: str
+    users: int
+    duration: float
+    updates: int = 0
+    timeouts: int = 0
+    delivery_errors: int = 0
+    first_reply: List[float] = field(default_factory=list)
+    complete: List[float] = field(default_factory=list)
+    calls: Counter = field(default_factory=Counter)
+
+    @property
+    def updates_per_second(self) -> float:
+        return self.updates / self.duration if self.duration > 0 else 0.0
+
+    @staticmethod
+    def _latency(values: List[float]) -> str:
+        values = sorted(values)
+        if not values:
+            return "нет данных"
+        return ', '.join(f"{name} {_percentile(values, fraction) * 1000:.1f}"
+                         for name, fraction in (('p50', 0.5), ('p95', 0.95), ('p99', 0.99), ('max', 1.0)))
+
+    def summary(self) -> str:
+        calls = ', '.join(f"{method} {count}" for method, count in self.calls.most_common())
+        return (
+            f"Режим: {self.mode}, пользователей: {self.users}, замер: {self.duration:.1f} с\n"
+            f"Обработано обновлений: {self.updates} ({self.updates_per_second:.1f} в секунду)\n"
+            f"Без полного ответа за отведенное время: {self.timeouts}, ошибок доставки: {self.delivery_errors}\n"
+            f"Первый ответ, мс: {self._latency(self.first_reply)}\n"
+            f"Полный ответ, мс: {self._latency(self.complete)}\n"
+            f"Запросы к Bot API: {calls or 'нет'}"
+        )
+
+
+class LoadDriver:
+    """
+    Замкнутая нагрузка: каждый пользователь отправляет следующее обновление сценария, когда бот сделал
+    в его чат все ожидаемые запросы (или истекло step_timeout). Задержка считается от выдачи обновления
+    боту (ответ getUpdates или запрос на webhook) до первого и до последнего запроса бота в чат
+    """
+
+    def __init__(self, users: List[VirtualUser], step_timeout: float):
+        self.users = {user.id: user for user in users}
+        self.step_timeout = step_timeout
+        self.api: Optional[FakeBotApi] = None
+        self._deliver: Optional[Callable[[dict, Callable[[float], None]], None]] = None
+        self._lock = threading.Lock()
+        self._update_ids = itertools.count(1)
+        self._measure_from: Optional[float] = None
+        self._stopped = threading.Event()
+        self._report: Optional[BenchReport] = None
+        self._webhook_jobs: Optional[queue.SimpleQueue] = None
+        self._senders: List[_WebhookSender] = []
+        self._watchdog = threading.Thread(target=self._watch, name='bench-watchdog', daemon=True)
+
+    def use_polling(self):
+        self._deliver = self.api.enqueue
+
+    def use_webhook(self, port: int, senders: int):
+        self._webhook_jobs = queue.SimpleQueue()
+        self._senders = [_WebhookSender(port, self._webhook_jobs, self._delivery_error) for _ in range(senders)]
+        for sender in self._senders:
+            sender.start()
+        self._deliver = lambda update, on_deliver: self._webhook_jobs.put((update, on_deliver))
+
+    def start(self):
+        self._watchdog.start()
+        for user in self.users.values():
+            self._dispatch(user)
+
+    def begin_measurement(self, report: BenchReport):
+        with self._lock:
+            self._report = report
+            self._measure_from = time.monotonic()
+        self.api.reset_calls()
+
+    def finish(self) -> BenchReport:
+        with self._lock:
+            self._stopped.set()
+            report = self._report
+            report.duration = time.monotonic() - self._measure_from
+            report.calls = Counter(self.api.calls)
+        for _ in self._senders:
+            self._webhook_jobs.put(None)
+        return report
+
+    async def drain(self, timeout: float):
+        """Дождаться ответов на уже выданные обновления (новые после finish() не отправляются)"""
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            with self._lock:
+                if all(user.step is None for user in self.users.values()):
+                    return
+            await asyncio.sleep(0.05)
+
+    def on_reply(self, chat_id: int, method: str, message_id: Optional[int], now: float):
+        user = self.users.get(chat_id)
+        if user is None:
+            return
+        with self._lock:
+            if method == 'sendMessage':
+                user.message_id = message_id
+            if user.dispatched_at is None:
+                return
+            if user.first_reply_at is None:
+                user.first_reply_at = now
+            user.replies += 1
+            if user.replies < user.step.replies:
+                return
+            self._record(user, now)
+        self._dispatch(user)
+
+    def _record(self, user: VirtualUser, now: float):
+        if self._report is None or self._stopped.is_set() or user.dispatched_at < self._measure_from:
+            return
+        self._report.updates += 1
+        self._report.first_reply.append(user.first_reply_at - user.dispatched_at)
+        self._report.complete.append(now - user.dispatched_at)
+
+    def _delivery_error(self):
+        with self._lock:
+            if self._report is not None and not self._stopped.is_set():
+                self._report.delivery_errors += 1
+
+    def _dispatch(self, user: VirtualUser):
+        with self._lock:
+            if self._stopped.is_set():
+                user.step = None
+                return
+            step = user.step = user.next_step()
+            user.dispatched_at = user.first_reply_at = None
+            user.replies = 0
+            update = self._build_update(user, step)
+
+        def delivered(moment: float):
+            with self._lock:
+                user.dispatched_at = moment
+
+        self._deliver(update, delivered)
+
+    def _build_update(self, user: VirtualUser, step: Step) -> dict:
+        update_id = next(self._update_ids)
+        sender = {'id': user.id, 'is_bot': False, 'first_name': f'Гость {user.id}', 'language_code': 'ru'}
+        chat = {'id': user.id, 'type': 'private', 'first_name': sender['first_name']}
+        now = int(time.time())
+        if step.callback:
+            return {'update_id': update_id, 'callback_query': {
+                'id': str(update_id), 'from': sender, 'chat_instance': str(user.id), 'data': step.text,
+                'message': {'message_id': user.message_id, 'date': now, 'chat': chat, 'from': BOT_USER, 'text': '…'},
+            }}
+        message = {'message_id': self.api.next_message_id(), 'date': now, 'chat': chat, 'from': sender,
+                   'text': step.text}
+        if step.text.startswith('/'):
+            message['entities'] = [{'type': 'bot_command', 'offset': 0, 'length': len(step.text.split()[0])}]
+        return {'update_id': update_id, 'message': message}
+
+    def _watch(self):
+        """
+        Пользователь без полного ответа за step_timeout переходит к следующему шагу (поздние ответы
+        на пропущенный шаг засчитываются следующему, поэтому при таймаутах задержки приблизительны)
+        """
+        while not self._stopped.wait(min(0.5, self.step_timeout / 4)):
+            now = time.monotonic()
+            expired = []
+            with self._lock:
+                for user in self.users.values():
+                    if user.dispatched_at is not None and now - user.dispatched_at > self.step_timeout:
+                        if self._report is not None and user.dispatched_at >= self._measure_from:
+                            self._report.timeouts += 1
+                        user.dispatched_at = None
+                        expired.append(user)
+            for user in expired:
+                self._dispatch(user)
+
+
+def seed_storage(db, properties: int, photos: int) -> List[int]:
+    """Владелец и объекты стенда с фотографиями (file_id не настоящие: бот их только пересылает)"""
+    db.add_admin(OWNER_ID)
+    ids = []
+    for number in range(1, properties + 1):
+        property_id = db.add_property(f"Дом у озера №{number}", OWNER_ID,
+                                      "Баня, мангал и причал. До воды пятьдесят метров")
+        for index in range(photos):
+            file_id = f"bench-photo-{property_id}-{index}"
+            db.add_property_photo(property_id, file_id, file_id)
+        ids.append(property_id)
+    return ids
+
+
+def _configure(api: FakeBotApi, with_limits: bool):
+    """Бот обращается к локальному серверу; ограничения частоты по умолчанию отключены"""
+    config.BOT_TOKEN = BOT_TOKEN
+    config.BOT_API_BASE_URL = api.base_url
+    config.BOT_API_FILE_URL = api.file_url
+    if not with_limits:
+        config.THROTTLE_USER_RATE = config.THROTTLE_GLOBAL_RATE = 0
+        config.THROTTLE_COALESCE_SECONDS = 0
+        config.OUTBOUND_GLOBAL_RATE = config.OUTBOUND_CHAT_RATE = 0
+        config.OUTBOUND_GROUP_RATE_PER_MINUTE = 0
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(('127.0.0.1', 0))
+        return probe.getsockname()[1]
+
+
+async def run_bench(mode: str = 'polling', users: int = 20, duration: float = 20.0, warmup: float = 3.0,
+                    properties: int = 50, photos: int = 2, storage: str = 'sqlite',
+                    step_timeout: float = 5.0, with_limits: bool = False) -> BenchReport:
+    """Запустить бота против локального Bot API и замерить нагрузку за duration секунд после разогрева"""
+    driver_users: List[VirtualUser] = []
+    driver = LoadDriver(driver_users, step_timeout)
+    api = driver.api = FakeBotApi(driver.on_reply)
+    api.start()
+    _configure(api, with_limits)
+
+    with tempfile.TemporaryDirectory(prefix='house-reserv-bench-') as workdir:
+        if storage == 'memory':
+            from memory_storage import InMemoryStorage
+            db = InMemoryStorage()
+        else:
+            from database import Database
+            db = Database(os.path.join(workdir, 'bench.db'))
+        property_ids = seed_storage(db, properties, photos)
+        for index in range(users):
+            user = VirtualUser(FIRST_USER_ID + index, script(property_ids[index % len(property_ids)], photos))
+            driver_users.append(user)
+            driver.users[user.id] = user
+
+        bot = HouseReservBot(db)
+        application = bot.build_application()
+        try:
+            async with application:
+                if application.post_init:
+                    await application.post_init(application)
+                if mode == 'webhook':
+                    port = _free_port()
+                    await application.updater.start_webhook(
+                        listen='127.0.0.1', port=port, url_path=WEBHOOK_PATH,
+                        webhook_url=f'http://127.0.0.1:{port}/{WEBHOOK_PATH}', secret_token=WEBHOOK_SECRET)
+                    driver.use_webhook(port, senders=min(users, 8))
+                else:
+                    await application.updater.start_polling(poll_interval=0.0, timeout=10)
+                    driver.use_polling()
+                await application.start()
+
+                driver.start()
+                await asyncio.sleep(warmup)
+                driver.begin_measurement(BenchReport(mode=mode, users=users, duration=duration))
+                await asyncio.sleep(duration)
+                report = driver.finish()
+                # Иначе Updater остановится с обновлениями, которые уже забрал из getUpdates
+                await driver.drain(step_timeout)
+
+                await application.updater.stop()
+                await application.stop()
+                if application.post_stop:
+                    await application.post_stop(application)
+        finally:
+            api.close()
+            if hasattr(db, 'close'):
+                db.close()
+    return report
+
+
+def main(argv=None):
+    """Точка входа командной строки"""
+    parser = argparse.ArgumentParser(description="Сквозной замер бота против локального Bot API")
+    parser.add_argument('--mode', choices=('polling', 'webhook'), default='polling')
+    parser.add_argument('--users', type=int, default=20, help="виртуальных пользователей")
+    parser.add_argument('--duration', type=float, default=20.0, help="длительность замера, секунд")
+    parser.add_argument('--warmup', type=float, default=3.0, help="разогрев перед замером, секунд")
+    parser.add_argument('--properties', type=int, default=50, help="объектов в хранилище")
+    parser.add_argument('--photos', type=int, default=2, help="фотографий у каждого объекта")
+    parser.add_argument('--storage', choices=('sqlite', 'memory'), default='sqlite',
+                        help="хранилище (sqlite - временная база)")
+    parser.add_argument('--step-timeout', type=float, default=5.0,
+                        help="сколько секунд ждать полного ответа бота на обновление")
+    parser.add_argument('--with-limits', action='store_true',
+                        help="не отключать ограничения частоты входящих и исходящих (THROTTLE_*, OUTBOUND_*)")
+    parser.add_argument('--log-level', default='WARNING', help="уровень журнала бота")
+    args = parser.parse_args(argv)
+    if args.users < 1 or args.properties < 1:
+        parser.error("нужен хотя бы один пользователь и один объект")
+
+    logs.setup(args.log_level, False, config.LOG_FORMAT)
+    report = asyncio.run(run_bench(
+        mode=args.mode, users=args.users, duration=args.duration, warmup=args.warmup,
+        properties=args.properties, photos=args.photos, storage=args.storage,
+        step_timeout=args.step_timeout, with_limits=args.with_limits,
+    ))
+    print(report.summary())
+
+
+if __name__ == '__main__':
+    main()
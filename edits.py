@@ -0,0 +1,139 @@
+"""
+Пропуск повторных редактирований сообщений с тем же содержимым
+"""
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from typing import Hashable, Optional
+
+from telegram import TelegramObject
+from telegram.error import BadRequest
+from telegram.ext import ExtBot
+
+import metrics
+
+EDITS_SKIPPED = metrics.REGISTRY.counter(
+    'housereserv_edits_skipped_total', 'Редактирования сообщений без изменений, не отправленные в Bot API', ['reason'])
+
+# Аргументы, которые не влияют на содержимое сообщения
+_IGNORED_ARGS = frozenset({
+    'self', 'chat_id', 'message_id', 'inline_message_id', 'business_connection_id',
+    'read_timeout', 'write_timeout', 'connect_timeout', 'pool_timeout', 'rate_limit_args',
+})
+
+
+def _serialize(value) -> str:
+    if isinstance(value, TelegramObject):
+        return value.to_json()
+    if isinstance(value, (list, tuple)):
+        return '[' + ','.join(_serialize(item) for item in value) + ']'
+    return repr(value)
+
+
+def fingerprint(arguments: dict) -> str:
+    """Хэш отображаемого содержимого: текст, клавиатура, разметка"""
+    digest = hashlib.blake2b(digest_size=16)
+    for name in sorted(arguments):
+        if name not in _IGNORED_ARGS:
+            digest.update(f'{name}={_serialize(arguments[name])};'.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class EditFingerprints:
+    """Последние отправленные отпечатки по сообщениям (LRU)"""
+
+    def __init__(self, max_size: int = 10000):
+        self.max_size = max_size
+        self._items: 'OrderedDict[Hashable, str]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(arguments: dict) -> Optional[Hashable]:
+        if arguments.get('inline_message_id'):
+            return arguments['inline_message_id']
+        if arguments.get('chat_id') is not None and arguments.get('message_id') is not None:
+            return arguments['chat_id'], arguments['message_id']
+        return None
+
+    def is_same(self, key: Hashable, value: str) -> bool:
+        with self._lock:
+            if self._items.get(key) == value:
+                self._items.move_to_end(key)
+                return True
+            return False
+
+    def remember(self, key: Hashable, value: str):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def forget(self, key: Optional[Hashable]):
+        if key is None:
+            return
+        with self._lock:
+            self._items.pop(key, None)
+
+    def __len__(self):
+        return len(self._items)
+
+
+def _bind(method, args, kwargs) -> dict:
+    bound = inspect.signature(method).bind(None, *args, **kwargs)
+    arguments = dict(bound.arguments)
+    arguments.update(arguments.pop('kwargs', {}) or {})
+    return arguments
+
+
+class EditAwareBot(ExtBot):
+    """
+    ExtBot, который не отправляет editMessageText, если текст и клавиатура сообщения
+    совпадают с последним отправленным вариантом. Ответ Telegram "message is not modified"
+    тоже считается пропуском, а не ошибкой.
+    """
+
+    def __init__(self, *args, fingerprints: EditFingerprints = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fingerprints = fingerprints or EditFingerprints()
+
+    @property
+    def fingerprints(self) -> EditFingerprints:
+        return self._fingerprints
+
+    async def edit_message_text(self, *args, **kwargs):
+        arguments = _bind(ExtBot.edit_message_text, args, kwargs)
+        key = EditFingerprints.key(arguments)
+        value = fingerprint(arguments) if key is not None else None
+        if key is not None and self._fingerprints.is_same(key, value):
+            EDITS_SKIPPED.inc(reason='unchanged')
+            return True
+        try:
+            result = await super().edit_message_text(*args, **kwargs)
+        except BadRequest as e:
+            if 'not modified' not in str(e).lower():
+                self._fingerprints.forget(key)
+                raise
+            EDITS_SKIPPED.inc(reason='not_modified')
+            result = True
+        if key is not None:
+            self._fingerprints.remember(key, value)
+        return result
+
+    # Остальные изменения сообщения делают сохраненный отпечаток неактуальным
+    async def edit_message_reply_markup(self, *args, **kwargs):
+        self._fingerprints.forget(EditFingerprints.key(_bind(ExtBot.edit_message_reply_markup, args, kwargs)))
+        return await super().edit_message_reply_markup(*args, **kwargs)
+
+    async def edit_message_caption(self, *args, **kwargs):
+        self._fingerprints.forget(EditFingerprints.key(_bind(ExtBot.edit_message_caption, args, kwargs)))
+        return await super().edit_message_caption(*args, **kwargs)
+
+    async def edit_message_media(self, *args, **kwargs):
+        self._fingerprints.forget(EditFingerprints.key(_bind(ExtBot.edit_message_media, args, kwargs)))
+        return await super().edit_message_media(*args, **kwargs)
+
+    async def delete_message(self, *args, **kwargs):
+        self._fingerprints.forget(EditFingerprints.key(_bind(ExtBot.delete_message, args, kwargs)))
+        return await super().delete_message(*args, **kwargs)
@@ -0,0 +1,177 @@
+"""
+Проверки живости и готовности и текущее состояние процесса для HTTP-эндпоинтов
+/health, /ready и /stats (для healthcheck контейнера)
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, Optional
+
+import config
+import http_server
+import metrics
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# Период замера задержки цикла событий
+LOOP_PROBE_INTERVAL = 1.0
+
+EVENT_LOOP_LAG = metrics.REGISTRY.gauge(
+    'housereserv_event_loop_lag_seconds', 'Задержка цикла событий при последнем замере')
+
+_STARTED_AT = time.monotonic()
+_last_update_at: Optional[float] = None
+_last_poll_at: Optional[float] = None
+_storage: Optional[Storage] = None
+_stats: Dict[str, Callable[[], Any]] = {}
+_caches: Dict[str, Callable[[], int]] = {}
+
+
+def mark_update():
+    """Отметить обработанное входящее обновление"""
+    global _last_update_at
+    _last_update_at = time.monotonic()
+
+
+def mark_poll():
+    """Отметить завершенный запрос getUpdates: опрос жив, даже если обновлений нет"""
+    global _last_poll_at
+    _last_poll_at = time.monotonic()
+
+
+def register_stat(name: str, value: Callable[[], Any]):
+    """Показатель для /stats (например, очередь входящих обновлений)"""
+    _stats[name] = value
+
+
+def register_cache(name: str, size: Callable[[], int]):
+    """Размер кэша для /stats"""
+    _caches[name] = size
+
+
+def set_storage(db: Storage):
+    """Хранилище, доступность которого проверяет /ready"""
+    global _storage
+    _storage = db
+
+
+class LoopMonitor:
+    """
+    Задача в цикле событий, которая каждые LOOP_PROBE_INTERVAL секунд замеряет, насколько позже
+    срока она просыпается. Пока цикл работает, отметка обновляется; зависший цикл виден
+    по устаревшей отметке из потока HTTP-сервера
+    """
+
+    def __init__(self, interval: float = LOOP_PROBE_INTERVAL):
+        self.interval = interval
+        self.lag = 0.0
+        self.max_lag = 0.0
+        self.beat_at: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        EVENT_LOOP_LAG.set_function(lambda: self.lag)
+
+    def start(self):
+        self.beat_at = time.monotonic()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.lag = max(0.0, now - expected)
+            self.max_lag = max(self.max_lag, self.lag)
+            self.beat_at = now
+
+
+LOOP = LoopMonitor()
+
+
+def _age(moment: Optional[float], now: float) -> Optional[float]:
+    return None if moment is None else round(now - moment, 3)
+
+
+def rss_bytes() -> Optional[int]:
+    """Резидентная память процесса (Linux, /proc); None, если недоступно"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def liveness(now: float = None) -> Dict[str, Any]:
+    """Цикл событий отвечает: отметка монитора не старше HEALTH_LOOP_STALL_SECONDS"""
+    now = time.monotonic() if now is None else now
+    beat_age = _age(LOOP.beat_at, now)
+    live = beat_age is not None and beat_age <= config.HEALTH_LOOP_STALL_SECONDS
+    return {'live': live, 'loop_heartbeat_age_seconds': beat_age}
+
+
+def readiness(now: float = None) -> Dict[str, Any]:
+    """
+    Бот готов: цикл событий жив, хранилище отвечает, а опрос Telegram (getUpdates) или
+    обработка обновления были не позже HEALTH_UPDATE_MAX_AGE_SECONDS назад
+    """
+    now = time.monotonic() if now is None else now
+    result = liveness(now)
+    result['database'] = _storage.ping() if _storage is not None else False
+    result['seconds_since_poll'] = _age(_last_poll_at, now)
+    result['seconds_since_update'] = _age(_last_update_at, now)
+    # До первого опроса отсчет идет от запуска процесса. С webhook опроса нет: обновления
+    # приходят, только когда они есть, поэтому тишина не признак неготовности
+    activity = max(moment for moment in (_last_poll_at, _last_update_at, _STARTED_AT) if moment is not None)
+    polling = bool(config.WEBHOOK_URL) or now - activity <= config.HEALTH_UPDATE_MAX_AGE_SECONDS
+    result['polling'] = polling
+    result['ready'] = result['live'] and result['database'] and polling
+    return result
+
+
+def runtime_stats() -> Dict[str, Any]:
+    """Готовность и показатели процесса для /stats"""
+    now = time.monotonic()
+    stats = readiness(now)
+    stats['uptime_seconds'] = round(now - _STARTED_AT, 3)
+    stats['event_loop_lag_ms'] = round(LOOP.lag * 1000, 3)
+    stats['event_loop_max_lag_ms'] = round(LOOP.max_lag * 1000, 3)
+    stats['rss_bytes'] = rss_bytes()
+    for name, value in _stats.items():
+        stats[name] = value()
+    stats['caches'] = {name: size() for name, size in _caches.items()}
+    return stats
+
+
+def _json_response(status: int, payload: Dict[str, Any]):
+    body = (json.dumps(payload, ensure_ascii=False) + '\n').encode('utf-8')
+    return status, {'Content-Type': 'application/json; charset=utf-8', 'Cache-Control': 'no-store'}, body
+
+
+def _health_route(path: str, query: dict, headers: dict):
+    result = liveness()
+    return _json_response(200 if result['live'] else 503, result)
+
+
+def _ready_route(path: str, query: dict, headers: dict):
+    result = readiness()
+    return _json_response(200 if result['ready'] else 503, result)
+
+
+def _stats_route(path: str, query: dict, headers: dict):
+    return _json_response(200, runtime_stats())
+
+
+http_server.register_route('/health', _health_route)
+http_server.register_route('/ready', _ready_route)
+http_server.register_route('/stats', _stats_route)
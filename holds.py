@@ -0,0 +1,88 @@
+"""
+Временные брони: неоплаченные бронирования гостей снимаются по истечении срока
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from telegram.ext import Application, ContextTypes
+from models import Booking
+from storage import Storage
+from date_utils import format_date, format_date_range
+import metrics
+import outbound
+import config
+
+logger = logging.getLogger(__name__)
+
+HOLDS_RELEASED = metrics.REGISTRY.counter(
+    'housereserv_holds_released_total', 'Неоплаченные брони, снятые по истечении срока')
+
+
+def hold_expires_at(now: datetime = None) -> Optional[datetime]:
+    """Срок новой брони гостя (None, если брони бессрочные)"""
+    if config.HOLD_TTL_HOURS <= 0:
+        return None
+    return (now or datetime.now()) + timedelta(hours=config.HOLD_TTL_HOURS)
+
+
+def format_expiry(value: datetime) -> str:
+    return f"{format_date(value)} {value:%H:%M}"
+
+
+def release_expired_holds(db: Storage, calendars=(), now: datetime = None) -> List[Booking]:
+    """
+    Снять истекшие брони и сбросить кэши календарей только затронутых объектов.
+    calendars - кэши с методом invalidate(property_id)
+    """
+    released = db.release_expired_holds(now or datetime.now(), config.HOLD_SWEEP_BATCH_SIZE)
+    for property_id in {booking.property_id for booking in released}:
+        for cache in calendars:
+            cache.invalidate(property_id)
+    HOLDS_RELEASED.inc(len(released))
+    return released
+
+
+async def notify_guests(bot, db: Storage, released: List[Booking]):
+    """Сообщить гостям о снятых бронях"""
+    names = {}
+    for booking in released:
+        # У импортированных бронирований гость может быть неизвестен
+        if booking.user_id <= 0:
+            continue
+        if booking.property_id not in names:
+            prop = db.get_property(booking.property_id)
+            names[booking.property_id] = prop.name if prop else "объект"
+        try:
+            await bot.send_message(
+                chat_id=booking.user_id,
+                text=(
+                    f"⌛ Бронь снята: аванс не поступил вовремя\n\n"
+                    f"🏠 Объект: {names[booking.property_id]}\n"
+                    f"📅 Период: {format_date_range(booking.start_date, booking.end_date)}\n\n"
+                    f"Если даты еще свободны, их можно забронировать снова."
+                ),
+                rate_limit_args=outbound.priority_args(outbound.NOTIFICATION)
+            )
+        except Exception as e:
+            logger.warning(f"Не удалось уведомить гостя {booking.user_id} о снятой брони: {e}")
+
+
+def schedule_hold_sweeper(application: Application, db: Storage, calendars=()):
+    """Запланировать регулярное снятие истекших броней в JobQueue"""
+    if config.HOLD_TTL_HOURS <= 0:
+        return
+
+    async def holds_job(context: ContextTypes.DEFAULT_TYPE):
+        released = await asyncio.get_running_loop().run_in_executor(
+            None, release_expired_holds, db, calendars)
+        if released:
+            logger.info(f"Снято истекших броней: {len(released)}")
+            await notify_guests(context.bot, db, released)
+
+    application.job_queue.run_repeating(
+        holds_job,
+        interval=timedelta(minutes=config.HOLD_SWEEP_INTERVAL_MINUTES),
+        first=timedelta(seconds=15),
+        name='expired_holds'
+    )
@@ -0,0 +1,85 @@
+"""
+Локальный HTTP-сервер для служебных эндпоинтов (метрики и т.п.)
+"""
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+logger = logging.getLogger(__name__)
+
+# Обработчик маршрута: (path, query, headers) -> (status, headers, body)
+RouteHandler = Callable[[str, Dict[str, list], dict], Tuple[int, Dict[str, str], bytes]]
+
+_routes: Dict[str, RouteHandler] = {}
+_server: Optional[ThreadingHTTPServer] = None
+
+
+def register_route(path: str, handler: RouteHandler):
+    """
+    Зарегистрировать обработчик маршрута.
+    Путь, оканчивающийся на '/', обрабатывает все вложенные пути.
+    """
+    _routes[path] = handler
+
+
+def _resolve(path: str) -> Optional[RouteHandler]:
+    """Найти обработчик: сначала точное совпадение, затем самый длинный префикс"""
+    if path in _routes:
+        return _routes[path]
+    prefixes = [p for p in _routes if p.endswith('/') and path.startswith(p)]
+    if prefixes:
+        return _routes[max(prefixes, key=len)]
+    return None
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP-запросов"""
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        handler = _resolve(parts.path)
+        if handler is None:
+            self._send(404, {'Content-Type': 'text/plain; charset=utf-8'}, b'not found\n')
+            return
+        try:
+            status, headers, body = handler(parts.path, parse_qs(parts.query), dict(self.headers))
+        except Exception:
+            logger.exception("Ошибка при обработке HTTP-запроса %s", parts.path)
+            self._send(500, {'Content-Type': 'text/plain; charset=utf-8'}, b'internal error\n')
+            return
+        self._send(status, headers, body)
+
+    def _send(self, status: int, headers: Dict[str, str], body: bytes):
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.debug("HTTP %s - %s", self.address_string(), format % args)
+
+
+def start_http_server(host: str, port: int) -> Optional[ThreadingHTTPServer]:
+    """Запустить HTTP-сервер в фоновом потоке (один раз на процесс)"""
+    global _server
+    if _server is not None:
+        return _server
+    _server = ThreadingHTTPServer((host, port), _RequestHandler)
+    _server.daemon_threads = True
+    thread = threading.Thread(target=_server.serve_forever, name='http-server', daemon=True)
+    thread.start()
+    logger.info(f"HTTP-сервер запущен на {host}:{port}")
+    return _server
+
+
+def stop_http_server():
+    """Остановить HTTP-сервер"""
+    global _server
+    if _server is not None:
+        _server.shutdown()
+        _server.server_close()
+        _server = None
@@ -0,0 +1,207 @@
+"""
+Календари объектов в формате iCalendar (.ics)
+"""
+import io
+import re
+import threading
+import zlib
+from datetime import datetime, timedelta
+from typing import IO, Dict, Iterable, Iterator, Optional, Tuple
+
+import http_server
+import metrics
+from bulk_io import ImportResult
+from storage import Storage
+from models import Booking
+
+PRODID = '-//HouseReserv//Booking calendar//RU'
+
+
+def _escape(text: str) -> str:
+    """Экранирование текстовых значений по RFC 5545"""
+    return (text.replace('\\', '\\\\').replace(';', '\\;')
+            .replace(',', '\\,').replace('\n', '\\n'))
+
+
+def _fold(line: str) -> str:
+    """Перенос строк длиннее 75 октетов"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    parts = []
+    current = ''
+    limit = 75
+    for char in line:
+        if len((current + char).encode('utf-8')) > limit:
+            parts.append(current)
+            current = char
+            limit = 74  # строки продолжения начинаются с пробела
+        else:
+            current += char
+    parts.append(current)
+    return '\r\n '.join(parts) + '\r\n'
+
+
+def iter_ics(property_id: int, property_name: str, bookings: Iterable[Booking]) -> Iterator[str]:
+    """Потоково сформировать строки календаря объекта"""
+    stamp = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
+    yield _fold('BEGIN:VCALENDAR')
+    yield _fold('VERSION:2.0')
+    yield _fold(f'PRODID:{PRODID}')
+    yield _fold('CALSCALE:GREGORIAN')
+    yield _fold(f'X-WR-CALNAME:{_escape(property_name)}')
+    for booking in bookings:
+        yield _fold('BEGIN:VEVENT')
+        yield _fold(f'UID:booking-{booking.id}@property-{property_id}.housereserv')
+        created = booking.created_at.strftime('%Y%m%dT%H%M%SZ') if booking.created_at else stamp
+        yield _fold(f'DTSTAMP:{created}')
+        yield _fold(f'DTSTART;VALUE=DATE:{booking.start_date:%Y%m%d}')
+        # В iCalendar дата окончания не входит в событие
+        yield _fold(f'DTEND;VALUE=DATE:{booking.end_date + timedelta(days=1):%Y%m%d}')
+        status = 'аванс оплачен' if booking.advance_paid else 'аванс не оплачен'
+        yield _fold(f'SUMMARY:{_escape("Забронировано (" + status + ")")}')
+        yield _fold('TRANSP:OPAQUE')
+        yield _fold('END:VEVENT')
+    yield _fold('END:VCALENDAR')
+
+
+def write_ics(out: IO[str], property_id: int, property_name: str, bookings: Iterable[Booking]):
+    """Записать календарь в открытый файл"""
+    for line in iter_ics(property_id, property_name, bookings):
+        out.write(line)
+
+
+class CalendarCache:
+    """
+    Кэш готовых календарей. Ключ действительности - версия бронирований объекта,
+    которую поддерживают триггеры БД, поэтому проверка стоит один запрос по первичному ключу.
+    """
+
+    def __init__(self, db: Storage):
+        self.db = db
+        self._feeds: Dict[int, Tuple[str, bytes]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_etag(property_id: int, name: str, version: int) -> str:
+        return f'"{property_id}-{version}-{zlib.crc32(name.encode("utf-8")):08x}"'
+
+    def get_etag(self, property_id: int) -> Optional[str]:
+        """Текущий ETag календаря (None, если объекта нет)"""
+        state = self.db.get_calendar_state(property_id)
+        if state is None:
+            return None
+        name, version = state
+        return self.make_etag(property_id, name, version)
+
+    def get_feed(self, property_id: int) -> Optional[Tuple[str, bytes]]:
+        """Получить (ETag, содержимое .ics); пересобирается только при изменениях"""
+        state = self.db.get_calendar_state(property_id)
+        if state is None:
+            with self._lock:
+                self._feeds.pop(property_id, None)
+            return None
+        name, version = state
+        etag = self.make_etag(property_id, name, version)
+        with self._lock:
+            cached = self._feeds.get(property_id)
+        if cached and cached[0] == etag:
+            metrics.cache_hit('ical')
+            return cached
+        metrics.cache_miss('ical')
+        out = io.StringIO()
+        write_ics(out, property_id, name, self.db.iter_property_bookings(property_id))
+        feed = (etag, out.getvalue().encode('utf-8'))
+        with self._lock:
+            self._feeds[property_id] = feed
+        return feed
+
+    def __len__(self):
+        return len(self._feeds)
+
+
+# Импорт
+def _unfold(source: IO[str]) -> Iterator[str]:
+    """Склеить перенесенные строки календаря"""
+    current = None
+    for raw in source:
+        line = raw.rstrip('\r\n')
+        if line.startswith((' ', '\t')) and current is not None:
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+
+def _parse_ics_date(value: str) -> datetime:
+    match = re.match(r'(\d{4})(\d{2})(\d{2})', value.strip())
+    if not match:
+        raise ValueError(f"неверная дата: {value}")
+    return datetime(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+
+
+def read_events(source: IO[str]) -> Iterator[Tuple[datetime, datetime]]:
+    """Прочитать периоды событий (начало, последний день включительно)"""
+    start = end = None
+    in_event = False
+    for line in _unfold(source):
+        name, _, value = line.partition(':')
+        key = name.split(';', 1)[0].upper()
+        if key == 'BEGIN' and value.upper() == 'VEVENT':
+            in_event, start, end = True, None, None
+        elif key == 'END' and value.upper() == 'VEVENT':
+            in_event = False
+            if start is None:
+                continue
+            if end is None or end <= start:
+                yield start, start
+            else:
+                # DTEND не входит в событие
+                yield start, end - timedelta(days=1)
+        elif in_event and key == 'DTSTART':
+            start = _parse_ics_date(value)
+        elif in_event and key == 'DTEND':
+            end = _parse_ics_date(value)
+
+
+def import_ics(db: Storage, property_id: int, user_id: int, path: str) -> ImportResult:
+    """Импортировать события календаря как бронирования объекта"""
+    result = ImportResult()
+    with open(path, 'r', encoding='utf-8') as source:
+        try:
+            rows = [
+                {'property_id': property_id, 'user_id': user_id, 'user_username': None,
+                 'user_phone': None, 'start_date': start, 'end_date': end, 'advance_paid': False}
+                for start, end in read_events(source)
+            ]
+        except ValueError as e:
+            result.errors.append(str(e))
+            return result
+    result.inserted, result.rejected = db.bulk_add_bookings(rows)
+    return result
+
+
+def register_http_route(cache: CalendarCache):
+    """Отдавать календари по адресу /ical/<id>.ics"""
+    def route(path: str, query: dict, headers: dict):
+        match = re.fullmatch(r'/ical/(\d+)\.ics', path)
+        if not match:
+            return 404, {'Content-Type': 'text/plain; charset=utf-8'}, b'not found\n'
+        property_id = int(match.group(1))
+        # Если календарь не менялся, содержимое даже не читается из кэша
+        if_none_match = headers.get('If-None-Match')
+        if if_none_match:
+            etag = cache.get_etag(property_id)
+            if etag and etag == if_none_match:
+                metrics.cache_hit('ical')
+                return 304, {'ETag': etag}, b''
+        feed = cache.get_feed(property_id)
+        if feed is None:
+            return 404, {'Content-Type': 'text/plain; charset=utf-8'}, b'not found\n'
+        etag, body = feed
+        return 200, {'Content-Type': 'text/calendar; charset=utf-8', 'ETag': etag}, body
+
+    http_server.register_route('/ical/', route)
@@ -0,0 +1,194 @@
+"""
+Поиск объектов во встроенном режиме (@бот запрос): готовые карточки и кэш результатов по запросам
+"""
+import threading
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from telegram import (InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle,
+                      InputTextMessageContent)
+
+import metrics
+import search
+from storage import Storage
+
+# Результатов в одном ответе (Telegram допускает до 50)
+PAGE_SIZE = 20
+
+# Сколько последних запросов хранить в кэше результатов
+MAX_CACHED_QUERIES = 1000
+
+# Длина описания в карточке и в подписи результата
+CARD_DESCRIPTION_LENGTH = 1000
+RESULT_DESCRIPTION_LENGTH = 100
+
+# Параметр /start для перехода из карточки к объекту
+START_PREFIX = 'property_'
+
+
+class _CatalogEntry:
+    __slots__ = ('id', 'name', 'description', 'words', 'article')
+
+    def __init__(self, property_id: int, name: str, description: Optional[str]):
+        self.id = property_id
+        self.name = name
+        self.description = description
+        # Вес каждого слова объекта: совпадения в названии весят больше, чем в описании
+        self.words: Dict[str, float] = {}
+        for word in search.tokenize(name):
+            self.words[word] = self.words.get(word, 0.0) + search.NAME_WEIGHT
+        for word in search.tokenize(description):
+            self.words[word] = self.words.get(word, 0.0) + search.DESCRIPTION_WEIGHT
+        self.article: Optional[InlineQueryResultArticle] = None
+
+
+def _shorten(text: str, length: int) -> str:
+    return text if len(text) <= length else text[:length - 1].rstrip() + "…"
+
+
+def build_article(entry: _CatalogEntry, bot_username: str) -> InlineQueryResultArticle:
+    """Карточка объекта: текст сообщения и кнопка перехода к бронированию в боте"""
+    description = entry.description or ""
+    text = f"🏠 {entry.name}"
+    if description:
+        text += f"\n\n{_shorten(description, CARD_DESCRIPTION_LENGTH)}"
+    keyboard = InlineKeyboardMarkup([[InlineKeyboardButton(
+        "📅 Забронировать", url=f"https://t.me/{bot_username}?start={START_PREFIX}{entry.id}")]])
+    return InlineQueryResultArticle(
+        id=str(entry.id),
+        title=entry.name,
+        description=_shorten(description, RESULT_DESCRIPTION_LENGTH) or None,
+        input_message_content=InputTextMessageContent(text),
+        reply_markup=keyboard,
+    )
+
+
+class InlineResultCache:
+    """
+    Каталог объектов в памяти: готовые карточки и словарь слов (отсортированный, для поиска
+    по префиксу) со списками объектов. Ранжированные результаты кэшируются по нормализованному
+    запросу, поэтому повторные и соседние нажатия клавиш не обращаются ни к БД, ни к словарю.
+    Оценка совпадает с search.score: взвешенное число слов, начинающихся со слов запроса.
+    Каталог обновляется через invalidate() при изменении объектов.
+    """
+
+    def __init__(self, db: Storage, max_queries: int = MAX_CACHED_QUERIES):
+        self.db = db
+        self.max_queries = max_queries
+        self._catalog: Optional[Dict[int, _CatalogEntry]] = None
+        self._postings: Dict[str, Dict[int, float]] = {}
+        self._vocabulary: List[str] = []
+        self._results: 'OrderedDict[str, List[int]]' = OrderedDict()
+        self._bot_username: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def build(self) -> int:
+        """Загрузить каталог из хранилища. Возвращает число объектов"""
+        entries = [_CatalogEntry(row['id'], row['name'], row['description']) for row in self.db.iter_properties()]
+        postings: Dict[str, Dict[int, float]] = {}
+        for entry in entries:
+            for word, weight in entry.words.items():
+                postings.setdefault(word, {})[entry.id] = weight
+        with self._lock:
+            self._catalog = {entry.id: entry for entry in entries}
+            self._postings = postings
+            self._vocabulary = sorted(postings)
+            self._results.clear()
+        return len(entries)
+
+    def invalidate(self, property_id: int = None):
+        """Обновить объект в каталоге (после добавления, изменения или удаления) или сбросить весь каталог"""
+        if property_id is None:
+            with self._lock:
+                self._catalog = None
+                self._results.clear()
+            return
+        prop = self.db.get_property(property_id)
+        with self._lock:
+            self._results.clear()
+            if self._catalog is None:
+                return
+            old = self._catalog.pop(property_id, None)
+            if old is not None:
+                for word in old.words:
+                    posting = self._postings.get(word)
+                    posting.pop(property_id, None)
+                    if not posting:
+                        del self._postings[word]
+                        del self._vocabulary[bisect_left(self._vocabulary, word)]
+            if prop is not None:
+                entry = self._catalog[property_id] = _CatalogEntry(prop.id, prop.name, prop.description)
+                for word, weight in entry.words.items():
+                    if word not in self._postings:
+                        self._postings[word] = {}
+                        insort(self._vocabulary, word)
+                    self._postings[word][property_id] = weight
+
+    def _ensure_catalog(self) -> Dict[int, _CatalogEntry]:
+        with self._lock:
+            catalog = self._catalog
+        if catalog is None:
+            self.build()
+            with self._lock:
+                catalog = self._catalog
+        return catalog
+
+    def _match(self, term: str) -> Dict[int, float]:
+        """Объекты со словами, начинающимися с term, и сумма их весов"""
+        scores: Dict[int, float] = {}
+        index = bisect_left(self._vocabulary, term)
+        while index < len(self._vocabulary) and self._vocabulary[index].startswith(term):
+            for pid, weight in self._postings[self._vocabulary[index]].items():
+                scores[pid] = scores.get(pid, 0.0) + weight
+            index += 1
+        return scores
+
+    def lookup(self, text: str) -> List[int]:
+        """ID объектов по запросу, лучшие совпадения первыми (пустой запрос - все объекты по порядку)"""
+        terms = search.query_terms(text)
+        key = ' '.join(terms)
+        catalog = self._ensure_catalog()
+        with self._lock:
+            cached = self._results.get(key)
+            if cached is not None:
+                self._results.move_to_end(key)
+                metrics.cache_hit('inline_results')
+                return cached
+            metrics.cache_miss('inline_results')
+            if not terms:
+                found = sorted(catalog)
+            else:
+                # Начинаем с самого редкого слова: пересечение сразу становится маленьким
+                matches = sorted((self._match(term) for term in terms), key=len)
+                scores = matches[0]
+                for other in matches[1:]:
+                    scores = {pid: score + other[pid] for pid, score in scores.items() if pid in other}
+                found = [pid for _, pid in sorted((-score, pid) for pid, score in scores.items())]
+            self._results[key] = found
+            while len(self._results) > self.max_queries:
+                self._results.popitem(last=False)
+        return found
+
+    def page(self, text: str, offset: int, bot_username: str) -> Tuple[List[InlineQueryResultArticle], str]:
+        """Карточки страницы результатов и next_offset для следующей (пустая строка - страниц больше нет)"""
+        found = self.lookup(text)
+        catalog = self._ensure_catalog()
+        with self._lock:
+            if bot_username != self._bot_username:
+                self._bot_username = bot_username
+                for entry in catalog.values():
+                    entry.article = None
+        articles = []
+        for pid in found[offset:offset + PAGE_SIZE]:
+            entry = catalog.get(pid)
+            if entry is None:
+                continue
+            if entry.article is None:
+                entry.article = build_article(entry, bot_username)
+            articles.append(entry.article)
+        next_offset = str(offset + PAGE_SIZE) if offset + PAGE_SIZE < len(found) else ""
+        return articles, next_offset
+
+    def __len__(self):
+        return len(self._catalog or ())
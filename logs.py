@@ -0,0 +1,114 @@
+"""
+Структурированное логирование: JSON-записи с контекстом обработчика и запроса к хранилищу,
+вывод через очередь в отдельном потоке
+"""
+import atexit
+import contextvars
+import json
+import logging
+import queue
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Iterator, Optional
+
+# Контекст текущего обновления и вызова хранилища (update_id, user_id, handler, db_method)
+_context: contextvars.ContextVar[Dict[str, Any]] = contextvars.ContextVar('log_context', default={})
+
+# Стандартные атрибуты LogRecord; остальные (из extra=...) попадают в JSON как поля записи
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'context'}
+
+_listener: Optional[QueueListener] = None
+
+
+@contextmanager
+def bind(**fields) -> Iterator[None]:
+    """Добавить поля к контексту записей внутри блока (значения None не добавляются)"""
+    token = _context.set({**_context.get(), **{key: value for key, value in fields.items() if value is not None}})
+    try:
+        yield
+    finally:
+        _context.reset(token)
+
+
+def current() -> Dict[str, Any]:
+    """Поля текущего контекста"""
+    return dict(_context.get())
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись - одна строка JSON: время, уровень, логгер, сообщение, контекст, поля extra и исключение"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        entry.update(getattr(record, 'context', None) or {})
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=_json_default)
+
+
+class ContextQueueHandler(QueueHandler):
+    """
+    Кладет запись в очередь, не форматируя ее: в потоке вызова к записи добавляется только
+    контекст, а сообщение и трассировка исключения переводятся в строки (объекты аргументов
+    и traceback не должны жить в очереди). Форматирование и вывод - в потоке QueueListener
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = logging.makeLogRecord(vars(record))
+        record.context = current()
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def setup(level: str = 'INFO', json_format: bool = False, fmt: str = None) -> QueueListener:
+    """
+    Настроить корневой логгер: записи идут в очередь, поток QueueListener выводит их в stderr
+    (JSON или текст в формате fmt). Повторный вызов заменяет предыдущую настройку
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter(fmt))
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(ContextQueueHandler(records))
+    root.setLevel(getattr(logging, level.upper(), logging.INFO))
+    _listener = QueueListener(records, output, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def shutdown():
+    """Вывести оставшиеся записи и остановить поток вывода"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown)
@@ -0,0 +1,139 @@
+"""
+Фотографии и видео объектов: добавление без дубликатов и кэш списка медиафайлов объекта
+"""
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+import metrics
+from models import PropertyPhoto, PropertyVideo
+from storage import Storage
+
+PHOTO = 'photo'
+VIDEO = 'video'
+
+# Результаты добавления файла
+ADDED = 'added'
+DUPLICATE = 'duplicate'
+LIMIT_REACHED = 'limit'
+
+
+@dataclass
+class MediaManifest:
+    """Фотографии и видео объекта в порядке добавления"""
+    photos: List[PropertyPhoto] = field(default_factory=list)
+    videos: List[PropertyVideo] = field(default_factory=list)
+
+    @property
+    def photo_ids(self) -> List[str]:
+        return [photo.file_id for photo in self.photos]
+
+    @property
+    def video_ids(self) -> List[str]:
+        return [video.file_id for video in self.videos]
+
+    def items(self, kind: str) -> list:
+        return self.photos if kind == PHOTO else self.videos
+
+    def contains(self, kind: str, file_unique_id: Optional[str]) -> bool:
+        """Есть ли у объекта файл с таким file_unique_id"""
+        if file_unique_id is None:
+            return False
+        return any(item.file_unique_id == file_unique_id for item in self.items(kind))
+
+
+@dataclass
+class PendingAlbum:
+    """Файлы альбома (media group), ожидающие сохранения"""
+    property_id: int
+    kind: str
+    chat_id: int
+    items: List[Tuple[str, Optional[str]]] = field(default_factory=list)
+    job: Any = None
+
+
+class MediaLibrary:
+    """
+    Кэш медиафайлов объектов. Все изменения медиа идут через этот класс,
+    поэтому запись кэша сбрасывается сразу после изменения, а просмотры объекта
+    не обращаются к БД.
+    """
+
+    def __init__(self, db: Storage):
+        self.db = db
+        self._manifests: Dict[int, MediaManifest] = {}
+        self._lock = threading.Lock()
+
+    def get_manifest(self, property_id: int) -> MediaManifest:
+        """Получить фотографии и видео объекта"""
+        with self._lock:
+            manifest = self._manifests.get(property_id)
+        if manifest is not None:
+            metrics.cache_hit('media')
+            return manifest
+        metrics.cache_miss('media')
+        photos, videos = self.db.get_property_media(property_id)
+        manifest = MediaManifest(photos, videos)
+        with self._lock:
+            self._manifests[property_id] = manifest
+        return manifest
+
+    def invalidate(self, property_id: int):
+        """Сбросить кэш объекта (после удаления объекта или изменения медиа в обход класса)"""
+        with self._lock:
+            self._manifests.pop(property_id, None)
+
+    def add(self, property_id: int, kind: str, file_id: str, file_unique_id: Optional[str]) -> str:
+        """Добавить файл. Возвращает ADDED, DUPLICATE или LIMIT_REACHED"""
+        if self.get_manifest(property_id).contains(kind, file_unique_id):
+            return DUPLICATE
+        if kind == PHOTO:
+            added = self.db.add_property_photo(property_id, file_id, file_unique_id)
+        else:
+            added = self.db.add_property_video(property_id, file_id, file_unique_id)
+        self.invalidate(property_id)
+        if added:
+            return ADDED
+        # Вставка не прошла: файл мог быть добавлен параллельно, иначе достигнут лимит
+        if self.get_manifest(property_id).contains(kind, file_unique_id):
+            return DUPLICATE
+        return LIMIT_REACHED
+
+    def add_many(self, property_id: int, kind: str,
+                 items: List[Tuple[str, Optional[str]]]) -> Tuple[int, int, int]:
+        """
+        Добавить файлы альбома одной транзакцией.
+        Возвращает (добавлено, дубликатов, не поместилось в лимит)
+        """
+        manifest = self.get_manifest(property_id)
+        seen = set()
+        fresh = []
+        duplicates = 0
+        for file_id, file_unique_id in items:
+            if manifest.contains(kind, file_unique_id) or file_unique_id in seen:
+                duplicates += 1
+                continue
+            if file_unique_id is not None:
+                seen.add(file_unique_id)
+            fresh.append((file_id, file_unique_id))
+        # Кэш мог устареть: причину отказа по каждой строке определяет хранилище
+        added, stored = self.db.add_property_media_batch(property_id, kind, fresh) if fresh else (0, 0)
+        self.invalidate(property_id)
+        return added, duplicates + stored, len(fresh) - added - stored
+
+    def delete(self, property_id: int, kind: str, file_id: str) -> bool:
+        """Удалить файл объекта"""
+        if kind == PHOTO:
+            deleted = self.db.delete_property_photo(property_id, file_id)
+        else:
+            deleted = self.db.delete_property_video(property_id, file_id)
+        self.invalidate(property_id)
+        return deleted
+
+    @staticmethod
+    def limit(kind: str) -> int:
+        return config.MAX_PHOTOS if kind == PHOTO else config.MAX_VIDEOS
+
+    def __len__(self):
+        return len(self._manifests)
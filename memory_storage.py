@@ -0,0 +1,578 @@
+"""
+Хранилище в памяти: словари и отсортированные индексы, без дискового ввода-вывода
+"""
+import threading
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import replace
+from datetime import date, datetime, timedelta
+from functools import wraps
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import config
+import search
+from models import Admin, Property, Booking, PropertyPhoto, PropertyVideo
+from storage import Storage
+
+
+def _locked(method):
+    """Выполнять метод под блокировкой хранилища"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+_EPOCH_ORDINAL = datetime(1970, 1, 1).toordinal()
+
+
+def _day(value: datetime) -> datetime:
+    """Дата без времени (как в колонках DATE)"""
+    return datetime.combine(value.date(), datetime.min.time())
+
+
+def _now() -> datetime:
+    """Текущее время с точностью до секунды (как CURRENT_TIMESTAMP)"""
+    return datetime.utcnow().replace(microsecond=0)
+
+
+def _epoch_day(value: datetime) -> int:
+    """Номер дня от 1970-01-01"""
+    return value.toordinal() - _EPOCH_ORDINAL
+
+
+def _booking_row(booking: Booking) -> dict:
+    """Бронирование в виде строки экспорта (как у Database.iter_bookings)"""
+    return {
+        'id': booking.id,
+        'property_id': booking.property_id,
+        'user_id': booking.user_id,
+        'user_username': booking.user_username,
+        'user_phone': booking.user_phone,
+        'start_date': booking.start_date.strftime('%Y-%m-%d'),
+        'end_date': booking.end_date.strftime('%Y-%m-%d'),
+        'advance_paid': 1 if booking.advance_paid else 0,
+        'created_at': booking.created_at.strftime('%Y-%m-%d %H:%M:%S') if booking.created_at else None,
+    }
+
+
+class InMemoryStorage(Storage):
+    """Реализация Storage в памяти процесса"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._admins: Dict[int, Admin] = {}
+        self._admin_seq = 0
+        self._properties: Dict[int, Property] = {}
+        self._property_seq = 0
+        self._by_admin: Dict[int, Set[int]] = {}
+        self._photos: Dict[int, List[PropertyPhoto]] = {}
+        self._videos: Dict[int, List[PropertyVideo]] = {}
+        self._media_seq: Dict[type, int] = {PropertyPhoto: 0, PropertyVideo: 0}
+        self._bookings: Dict[int, Booking] = {}
+        self._booking_seq = 0
+        self._archive: Dict[int, Booking] = {}
+        # Индексы бронирований
+        self._by_property: Dict[int, List[Tuple[datetime, int]]] = {}
+        self._max_stay: Dict[int, timedelta] = {}
+        self._by_user: Dict[int, Set[int]] = {}
+        self._by_start: List[Tuple[datetime, int]] = []
+        self._by_end: List[Tuple[datetime, int]] = []
+        self._by_expiry: List[Tuple[datetime, int]] = []
+        # Производные данные (в SQLite их поддерживают триггеры)
+        self._versions: Dict[int, int] = {}
+        self._stats: Dict[int, Dict[str, int]] = {}
+        self._sent_reminders: Dict[int, Set[str]] = {}
+
+    # Служебные методы
+    def _index_booking(self, booking: Booking):
+        insort(self._by_property.setdefault(booking.property_id, []), (booking.start_date, booking.id))
+        stay = booking.end_date - booking.start_date
+        if stay > self._max_stay.get(booking.property_id, timedelta(0)):
+            self._max_stay[booking.property_id] = stay
+        self._by_user.setdefault(booking.user_id, set()).add(booking.id)
+        insort(self._by_start, (booking.start_date, booking.id))
+        insort(self._by_end, (booking.end_date, booking.id))
+        if booking.expires_at is not None:
+            insort(self._by_expiry, (booking.expires_at, booking.id))
+
+    @staticmethod
+    def _remove_sorted(items: List[Tuple[datetime, int]], key: Tuple[datetime, int]):
+        i = bisect_left(items, key)
+        if i < len(items) and items[i] == key:
+            items.pop(i)
+
+    def _unindex_booking(self, booking: Booking):
+        self._remove_sorted(self._by_property.get(booking.property_id, []), (booking.start_date, booking.id))
+        self._by_user.get(booking.user_id, set()).discard(booking.id)
+        self._remove_sorted(self._by_start, (booking.start_date, booking.id))
+        self._remove_sorted(self._by_end, (booking.end_date, booking.id))
+        if booking.expires_at is not None:
+            self._remove_sorted(self._by_expiry, (booking.expires_at, booking.id))
+
+    def _bump_version(self, property_id: int):
+        self._versions[property_id] = self._versions.get(property_id, 0) + 1
+
+    def _count_stats(self, booking: Booking, sign: int):
+        stats = self._stats.setdefault(booking.property_id,
+                                       {'bookings_count': 0, 'paid_count': 0, 'booked_nights': 0})
+        stats['bookings_count'] += sign
+        stats['paid_count'] += sign * (1 if booking.advance_paid else 0)
+        # Дата выезда - последний день проживания: ночей на одну больше разности дат
+        stats['booked_nights'] += sign * ((booking.end_date - booking.start_date).days + 1)
+
+    def _insert_booking(self, booking: Booking):
+        self._bookings[booking.id] = booking
+        self._index_booking(booking)
+        self._bump_version(booking.property_id)
+        self._count_stats(booking, 1)
+
+    def _remove_booking(self, booking_id: int) -> Optional[Booking]:
+        booking = self._bookings.pop(booking_id, None)
+        if booking is not None:
+            self._unindex_booking(booking)
+            self._bump_version(booking.property_id)
+            self._count_stats(booking, -1)
+            self._sent_reminders.pop(booking_id, None)
+        return booking
+
+    def _overlaps(self, property_id: int, start_date: datetime, end_date: datetime,
+                  exclude_booking_id: Optional[int] = None) -> bool:
+        """Есть ли бронирование объекта, пересекающее [start_date, end_date]"""
+        items = self._by_property.get(property_id, [])
+        # Кандидаты начинаются не позже end_date и не раньше start_date - максимальная длительность
+        lower = bisect_left(items, (start_date - self._max_stay.get(property_id, timedelta(0)), -1))
+        upper = bisect_right(items, (end_date, float('inf')))
+        for _, booking_id in items[lower:upper]:
+            if booking_id == exclude_booking_id:
+                continue
+            if self._bookings[booking_id].end_date >= start_date:
+                return True
+        return False
+
+    # Администраторы
+    @_locked
+    def add_admin(self, user_id: int, phone: Optional[str] = None,
+                  telegram_username: Optional[str] = None) -> bool:
+        self._admin_seq += 1
+        self._admins[user_id] = Admin(id=self._admin_seq, user_id=user_id, phone=phone,
+                                      telegram_username=telegram_username, created_at=_now())
+        config.ADMIN_IDS.add(user_id)
+        return True
+
+    @_locked
+    def get_admin(self, user_id: int) -> Optional[Admin]:
+        admin = self._admins.get(user_id)
+        return replace(admin) if admin else None
+
+    @_locked
+    def update_admin_contacts(self, user_id: int, phone: Optional[str] = None,
+                              telegram_username: Optional[str] = None) -> bool:
+        admin = self._admins.get(user_id)
+        if admin:
+            if phone is not None:
+                admin.phone = phone
+            if telegram_username is not None:
+                admin.telegram_username = telegram_username
+        return True
+
+    @_locked
+    def get_all_admins(self) -> List[Admin]:
+        return [replace(admin) for admin in sorted(self._admins.values(), key=lambda a: a.id)]
+
+    @_locked
+    def set_admin_notifications(self, user_id: int, mode: str) -> bool:
+        admin = self._admins.get(user_id)
+        if admin is None:
+            return False
+        admin.notifications = mode
+        return True
+
+    @_locked
+    def get_watching_admins(self) -> List[int]:
+        return sorted(user_id for user_id, admin in self._admins.items() if admin.notifications == 'all')
+
+    @_locked
+    def get_property_owners(self, property_ids: List[int]) -> Dict[int, Tuple[Optional[int], str]]:
+        owners = {}
+        for property_id in property_ids:
+            prop = self._properties.get(property_id)
+            if prop is not None:
+                admin = self._admins.get(prop.admin_id)
+                owners[property_id] = (prop.admin_id, admin.notifications if admin else 'own')
+        return owners
+
+    # Объекты
+    @_locked
+    def add_property(self, name: str, admin_id: int, description: Optional[str] = None) -> Optional[int]:
+        self._property_seq += 1
+        self._properties[self._property_seq] = Property(
+            id=self._property_seq, name=name, description=description,
+            admin_id=admin_id, created_at=_now()
+        )
+        self._by_admin.setdefault(admin_id, set()).add(self._property_seq)
+        return self._property_seq
+
+    @_locked
+    def delete_property(self, property_id: int) -> bool:
+        self._photos.pop(property_id, None)
+        self._videos.pop(property_id, None)
+        for _, booking_id in list(self._by_property.get(property_id, [])):
+            self._remove_booking(booking_id)
+        self._by_property.pop(property_id, None)
+        self._max_stay.pop(property_id, None)
+        for booking_id in [b.id for b in self._archive.values() if b.property_id == property_id]:
+            del self._archive[booking_id]
+        self._versions.pop(property_id, None)
+        self._stats.pop(property_id, None)
+        prop = self._properties.pop(property_id, None)
+        if prop is not None:
+            self._by_admin.get(prop.admin_id, set()).discard(property_id)
+        return True
+
+    @_locked
+    def get_property(self, property_id: int) -> Optional[Property]:
+        prop = self._properties.get(property_id)
+        return replace(prop) if prop else None
+
+    @_locked
+    def get_all_properties(self) -> List[Property]:
+        return [replace(self._properties[pid]) for pid in sorted(self._properties)]
+
+    @_locked
+    def get_admin_properties(self, admin_id: int) -> List[Property]:
+        return [replace(self._properties[pid]) for pid in sorted(self._by_admin.get(admin_id, ()))]
+
+    @_locked
+    def search_properties(self, text: str, limit: int = 10, offset: int = 0) -> List[Property]:
+        # Линейный просмотр; вместо bm25 - взвешенное число совпадений слов по префиксу
+        terms = search.query_terms(text)
+        if not terms:
+            return []
+        found = []
+        for prop in self._properties.values():
+            score = search.score(terms, search.tokenize(prop.name), search.tokenize(prop.description))
+            if score is not None:
+                found.append((-score, prop.id))
+        found.sort()
+        return [replace(self._properties[pid]) for _, pid in found[offset:offset + limit]]
+
+    @_locked
+    def update_property_description(self, property_id: int, description: str) -> bool:
+        prop = self._properties.get(property_id)
+        if prop:
+            prop.description = description
+        return True
+
+    # Фотографии и видео
+    def _add_media(self, table: Dict[int, list], model, property_id: int, file_id: str,
+                   file_unique_id: Optional[str], limit: int) -> bool:
+        items = table.setdefault(property_id, [])
+        if len(items) >= limit:
+            return False
+        if file_unique_id is not None and any(item.file_unique_id == file_unique_id for item in items):
+            return False
+        self._media_seq[model] += 1
+        items.append(model(id=self._media_seq[model], property_id=property_id, file_id=file_id,
+                           file_unique_id=file_unique_id, created_at=_now()))
+        return True
+
+    @_locked
+    def add_property_photo(self, property_id: int, file_id: str,
+                           file_unique_id: Optional[str] = None) -> bool:
+        return self._add_media(self._photos, PropertyPhoto, property_id, file_id,
+                               file_unique_id, config.MAX_PHOTOS)
+
+    @_locked
+    def get_property_photos(self, property_id: int) -> List[str]:
+        return [item.file_id for item in self._photos.get(property_id, [])]
+
+    @_locked
+    def delete_property_photo(self, property_id: int, file_id: str) -> bool:
+        if property_id in self._photos:
+            self._photos[property_id] = [item for item in self._photos[property_id] if item.file_id != file_id]
+        return True
+
+    @_locked
+    def add_property_video(self, property_id: int, file_id: str,
+                           file_unique_id: Optional[str] = None) -> bool:
+        return self._add_media(self._videos, PropertyVideo, property_id, file_id,
+                               file_unique_id, config.MAX_VIDEOS)
+
+    @_locked
+    def get_property_videos(self, property_id: int) -> List[str]:
+        return [item.file_id for item in self._videos.get(property_id, [])]
+
+    @_locked
+    def delete_property_video(self, property_id: int, file_id: str) -> bool:
+        if property_id in self._videos:
+            self._videos[property_id] = [item for item in self._videos[property_id] if item.file_id != file_id]
+        return True
+
+    @_locked
+    def add_property_media_batch(self, property_id: int, kind: str,
+                                 items: List[Tuple[str, Optional[str]]]) -> Tuple[int, int]:
+        if kind == 'photo':
+            table, model, limit = self._photos, PropertyPhoto, config.MAX_PHOTOS
+        else:
+            table, model, limit = self._videos, PropertyVideo, config.MAX_VIDEOS
+        added = duplicates = 0
+        for file_id, file_unique_id in items:
+            if self._add_media(table, model, property_id, file_id, file_unique_id, limit):
+                added += 1
+            elif file_unique_id is not None and any(
+                    item.file_unique_id == file_unique_id for item in table.get(property_id, [])):
+                duplicates += 1
+        return added, duplicates
+
+    @_locked
+    def get_property_media(self, property_id: int) -> Tuple[List[PropertyPhoto], List[PropertyVideo]]:
+        return ([replace(item) for item in self._photos.get(property_id, [])],
+                [replace(item) for item in self._videos.get(property_id, [])])
+
+    # Бронирования
+    @_locked
+    def add_booking(self, property_id: int, user_id: int, user_username: Optional[str],
+                    user_phone: Optional[str], start_date: datetime, end_date: datetime,
+                    expires_at: Optional[datetime] = None) -> Optional[int]:
+        self._booking_seq += 1
+        self._insert_booking(Booking(
+            id=self._booking_seq, property_id=property_id, user_id=user_id,
+            user_username=user_username, user_phone=user_phone,
+            start_date=_day(start_date), end_date=_day(end_date),
+            advance_paid=False, created_at=_now(),
+            expires_at=expires_at.replace(microsecond=0) if expires_at else None
+        ))
+        return self._booking_seq
+
+    @_locked
+    def add_bookings_batch(self, user_id: int, user_username: Optional[str], user_phone: Optional[str],
+                           ranges: List[Tuple[int, datetime, datetime]],
+                           expires_at: Optional[datetime] = None
+                           ) -> Tuple[List[int], List[Tuple[Tuple[int, datetime, datetime], str]]]:
+        conflicts = []
+        accepted: Dict[int, List[Tuple[datetime, datetime]]] = {}
+        today = date.today()
+        for item in ranges:
+            property_id, start_date, end_date = item[0], _day(item[1]), _day(item[2])
+            if start_date > end_date:
+                conflicts.append((item, 'неверный диапазон дат'))
+            elif start_date.date() < today:
+                conflicts.append((item, 'дата заезда уже прошла'))
+            elif property_id not in self._properties:
+                conflicts.append((item, 'объект не найден'))
+            elif any(start <= end_date and end >= start_date for start, end in accepted.get(property_id, ())):
+                conflicts.append((item, 'пересекается с другим периодом заказа'))
+            elif self._overlaps(property_id, start_date, end_date):
+                conflicts.append((item, 'даты уже забронированы'))
+            else:
+                accepted.setdefault(property_id, []).append((start_date, end_date))
+        if conflicts:
+            return [], conflicts
+        return [self.add_booking(property_id, user_id, user_username, user_phone, start_date, end_date, expires_at)
+                for property_id, start_date, end_date in ranges], []
+
+    @_locked
+    def check_date_availability(self, property_id: int, start_date: datetime,
+                                end_date: datetime, exclude_booking_id: Optional[int] = None) -> bool:
+        return not self._overlaps(property_id, _day(start_date), _day(end_date), exclude_booking_id)
+
+    @_locked
+    def get_booking(self, booking_id: int) -> Optional[Booking]:
+        booking = self._bookings.get(booking_id)
+        return replace(booking) if booking else None
+
+    @_locked
+    def get_admin_bookings(self, admin_id: Optional[int] = None,
+                           limit: Optional[int] = None) -> List[Tuple[Booking, str]]:
+        property_ids = self._properties if admin_id is None else self._by_admin.get(admin_id, ())
+        bookings = [self._bookings[booking_id] for property_id in property_ids
+                    for _, booking_id in self._by_property.get(property_id, ())]
+        bookings.sort(key=lambda b: (b.start_date, b.id))
+        return [(replace(b), self._properties[b.property_id].name) for b in bookings[:limit]]
+
+    @_locked
+    def get_property_bookings(self, property_id: int) -> List[Booking]:
+        return [replace(self._bookings[booking_id])
+                for _, booking_id in self._by_property.get(property_id, [])]
+
+    def iter_property_bookings(self, property_id: int, batch_size: int = 500) -> Iterator[Booking]:
+        yield from self.get_property_bookings(property_id)
+
+    @_locked
+    def get_calendar_state(self, property_id: int) -> Optional[Tuple[str, int]]:
+        prop = self._properties.get(property_id)
+        if prop is None:
+            return None
+        return prop.name, self._versions.get(property_id, 0)
+
+    @_locked
+    def get_user_bookings(self, user_id: int) -> List[Booking]:
+        bookings = [self._bookings[booking_id] for booking_id in self._by_user.get(user_id, ())]
+        return [replace(b) for b in sorted(bookings, key=lambda b: (b.start_date, b.id))]
+
+    @_locked
+    def delete_booking(self, booking_id: int, user_id: int) -> bool:
+        booking = self._bookings.get(booking_id)
+        if booking is None or booking.user_id != user_id:
+            return False
+        self._remove_booking(booking_id)
+        return True
+
+    @_locked
+    def set_advance_paid(self, booking_id: int, paid: bool) -> bool:
+        booking = self._bookings.get(booking_id)
+        if booking:
+            self._count_stats(booking, -1)
+            booking.advance_paid = bool(paid)
+            self._count_stats(booking, 1)
+            if paid and booking.expires_at is not None:
+                self._remove_sorted(self._by_expiry, (booking.expires_at, booking.id))
+                booking.expires_at = None
+            self._bump_version(booking.property_id)
+        return True
+
+    # Статистика
+    @_locked
+    def get_booking_statistics(self, admin_id: Optional[int] = None) -> List[dict]:
+        result = []
+        property_ids = self._properties if admin_id is None else self._by_admin.get(admin_id, ())
+        for property_id in sorted(property_ids):
+            stats = self._stats.get(property_id, {})
+            result.append({
+                'property_id': property_id,
+                'property_name': self._properties[property_id].name,
+                'bookings_count': stats.get('bookings_count', 0),
+                'paid_count': stats.get('paid_count', 0),
+                'booked_nights': stats.get('booked_nights', 0),
+            })
+        return result
+
+    @_locked
+    def get_booking_day_spans(self, start: datetime, end: datetime) -> List[Tuple[int, int, int, int]]:
+        start, end = _day(start), _day(end)
+        return [
+            (booking.property_id, _epoch_day(booking.start_date), _epoch_day(booking.end_date),
+             _epoch_day(booking.created_at or booking.start_date))
+            for booking in list(self._bookings.values()) + list(self._archive.values())
+            if booking.end_date >= start and booking.start_date <= end
+        ]
+
+    @_locked
+    def rebuild_property_stats(self) -> bool:
+        self._stats = {}
+        for booking in list(self._bookings.values()) + list(self._archive.values()):
+            self._count_stats(booking, 1)
+        return True
+
+    # Архивация
+    @_locked
+    def archive_bookings(self, cutoff: datetime, batch_size: int = 500) -> int:
+        upper = bisect_left(self._by_end, (_day(cutoff), -1))
+        ids = [booking_id for _, booking_id in self._by_end[:upper]]
+        for booking_id in ids:
+            booking = self._remove_booking(booking_id)
+            self._archive[booking_id] = booking
+            self._count_stats(booking, 1)
+        return len(ids)
+
+    # Временные брони
+    @_locked
+    def release_expired_holds(self, now: datetime, batch_size: int = 500) -> List[Booking]:
+        upper = bisect_right(self._by_expiry, (now.replace(microsecond=0), float('inf')))
+        ids = [booking_id for _, booking_id in self._by_expiry[:upper]
+               if not self._bookings[booking_id].advance_paid]
+        return [self._remove_booking(booking_id) for booking_id in ids]
+
+    # Напоминания
+    @_locked
+    def get_bookings_due_for_reminder(self, start: datetime, end: datetime,
+                                      kind: str) -> List[Tuple[Booking, str, Optional[int]]]:
+        lower = bisect_left(self._by_start, (_day(start), -1))
+        upper = bisect_right(self._by_start, (_day(end), float('inf')))
+        result = []
+        for _, booking_id in self._by_start[lower:upper]:
+            booking = self._bookings[booking_id]
+            prop = self._properties.get(booking.property_id)
+            if prop is None or kind in self._sent_reminders.get(booking_id, ()):
+                continue
+            result.append((replace(booking), prop.name, prop.admin_id))
+        return result
+
+    @_locked
+    def mark_reminders_sent(self, booking_ids: List[int], kind: str) -> bool:
+        for booking_id in booking_ids:
+            self._sent_reminders.setdefault(booking_id, set()).add(kind)
+        return True
+
+    # Массовый импорт и экспорт
+    def iter_properties(self, batch_size: int = 1000, admin_id: Optional[int] = None) -> Iterator[dict]:
+        with self._lock:
+            properties = self.get_all_properties() if admin_id is None else self.get_admin_properties(admin_id)
+            rows = [
+                {
+                    'id': prop.id,
+                    'name': prop.name,
+                    'description': prop.description,
+                    'admin_id': prop.admin_id,
+                    'created_at': prop.created_at.strftime('%Y-%m-%d %H:%M:%S') if prop.created_at else None,
+                }
+                for prop in properties
+            ]
+        yield from rows
+
+    def iter_bookings(self, batch_size: int = 1000, include_archive: bool = False,
+                      admin_id: Optional[int] = None) -> Iterator[dict]:
+        with self._lock:
+            bookings = list(self._bookings.values())
+            if include_archive:
+                bookings += list(self._archive.values())
+            if admin_id is not None:
+                owned = self._by_admin.get(admin_id, set())
+                bookings = [b for b in bookings if b.property_id in owned]
+            rows = [_booking_row(b) for b in sorted(bookings, key=lambda b: b.id)]
+        yield from rows
+
+    @_locked
+    def bulk_add_properties(self, rows: Iterable[dict], chunk_size: int = 500) -> int:
+        inserted = 0
+        for row in rows:
+            property_id = row.get('id')
+            if property_id is None:
+                property_id = self._property_seq + 1
+            elif property_id in self._properties:
+                continue
+            self._property_seq = max(self._property_seq, property_id)
+            self._properties[property_id] = Property(
+                id=property_id, name=row['name'], description=row.get('description'),
+                admin_id=row.get('admin_id'), created_at=_now()
+            )
+            self._by_admin.setdefault(row.get('admin_id'), set()).add(property_id)
+            inserted += 1
+        return inserted
+
+    @_locked
+    def bulk_add_bookings(self, rows: Iterable[dict],
+                          chunk_size: int = 500) -> Tuple[int, List[Tuple[dict, str]]]:
+        inserted = 0
+        rejected: List[Tuple[dict, str]] = []
+        for row in rows:
+            property_id = row['property_id']
+            start_date, end_date = _day(row['start_date']), _day(row['end_date'])
+            if property_id not in self._properties:
+                rejected.append((row, 'объект не найден'))
+                continue
+            if start_date > end_date:
+                rejected.append((row, 'неверный диапазон дат'))
+                continue
+            if self._overlaps(property_id, start_date, end_date):
+                rejected.append((row, 'даты уже забронированы'))
+                continue
+            self._booking_seq += 1
+            self._insert_booking(Booking(
+                id=self._booking_seq, property_id=property_id, user_id=row['user_id'],
+                user_username=row.get('user_username'), user_phone=row.get('user_phone'),
+                start_date=start_date, end_date=end_date,
+                advance_paid=bool(row.get('advance_paid')), created_at=_now()
+            ))
+            inserted += 1
+        return inserted, rejected
@@ -0,0 +1,319 @@
+"""
+Метрики приложения: счетчики и гистограммы в текстовом формате Prometheus
+"""
+import inspect
+import threading
+import time
+from functools import wraps
+from typing import Callable, Dict, Iterable, List, Tuple
+
+import http_server
+import logs
+
+# Границы корзин гистограмм по умолчанию (в секундах)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    """Форматирование меток в виде {name="value",...}"""
+    pairs = [
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(labelnames, values)
+    ]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value: float) -> str:
+    """Форматирование числа для экспозиции"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """Базовый класс метрики"""
+    type_name = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Монотонно растущий счетчик"""
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def get(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Gauge(_Metric):
+    """Произвольное значение, которое может расти и убывать"""
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._functions: Dict[Tuple[str, ...], Callable[[], float]] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function: Callable[[], float], **labels):
+        """Вычислять значение при каждом чтении"""
+        with self._lock:
+            self._functions[self._key(labels)] = function
+
+    def get(self, **labels) -> float:
+        key = self._key(labels)
+        if key in self._functions:
+            return self._functions[key]()
+        return self._values.get(key, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+            functions = dict(self._functions)
+        for key, function in functions.items():
+            try:
+                values[key] = function()
+            except Exception:
+                continue
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Гистограмма с кумулятивными корзинами"""
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._counts.get(key)
+            if counts is None:
+                counts = self._counts[key] = [0] * len(self.buckets)
+                self._sums[key] = 0.0
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._sums[key] += value
+
+    def count(self, **labels) -> int:
+        return sum(self._counts.get(self._key(labels), ()))
+
+    def sum(self, **labels) -> float:
+        return self._sums.get(self._key(labels), 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, list(counts), self._sums[key]) for key, counts in self._counts.items())
+        lines = []
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = _format_labels(self.labelnames, key, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Реестр метрик процесса"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """Все метрики в текстовом формате Prometheus"""
+        return '\n'.join(metric.render() for metric in self._metrics) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+HANDLER_DURATION = REGISTRY.histogram(
+    'housereserv_handler_duration_seconds', 'Длительность выполнения обработчиков', ['handler'])
+HANDLER_ERRORS = REGISTRY.counter(
+    'housereserv_handler_errors_total', 'Исключения в обработчиках', ['handler'])
+DB_CALLS = REGISTRY.counter(
+    'housereserv_db_calls_total', 'Вызовы методов Database', ['method'])
+DB_DURATION = REGISTRY.histogram(
+    'housereserv_db_duration_seconds', 'Длительность вызовов методов Database', ['method'])
+DB_ERRORS = REGISTRY.counter(
+    'housereserv_db_errors_total', 'Исключения в методах Database', ['method'])
+BOT_API_CALLS = REGISTRY.counter(
+    'housereserv_bot_api_calls_total', 'Запросы к Bot API', ['method'])
+BOT_API_DURATION = REGISTRY.histogram(
+    'housereserv_bot_api_duration_seconds', 'Длительность запросов к Bot API', ['method'])
+BOT_API_ERRORS = REGISTRY.counter(
+    'housereserv_bot_api_errors_total', 'Ошибки запросов к Bot API', ['method'])
+CACHE_HITS = REGISTRY.counter(
+    'housereserv_cache_hits_total', 'Попадания в кэш', ['cache'])
+CACHE_MISSES = REGISTRY.counter(
+    'housereserv_cache_misses_total', 'Промахи кэша', ['cache'])
+
+
+def cache_hit(cache: str):
+    """Учесть попадание в кэш"""
+    CACHE_HITS.inc(cache=cache)
+
+
+def cache_miss(cache: str):
+    """Учесть промах кэша"""
+    CACHE_MISSES.inc(cache=cache)
+
+
+def timed_handler(name: str, callback: Callable) -> Callable:
+    """Обернуть асинхронный обработчик замером длительности"""
+    @wraps(callback)
+    async def wrapper(update, context):
+        start = time.perf_counter()
+        user = getattr(update, 'effective_user', None)
+        # Записи журнала внутри обработчика получают обработчик, обновление и пользователя
+        with logs.bind(handler=name, update_id=getattr(update, 'update_id', None),
+                       user_id=user.id if user else None):
+            try:
+                return await callback(update, context)
+            except Exception:
+                HANDLER_ERRORS.inc(handler=name)
+                raise
+            finally:
+                HANDLER_DURATION.observe(time.perf_counter() - start, handler=name)
+    wrapper.__metrics_wrapped__ = True
+    return wrapper
+
+
+def instrument_handlers(application):
+    """Обернуть callback каждого зарегистрированного обработчика приложения"""
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            callback = handler.callback
+            if getattr(callback, '__metrics_wrapped__', False):
+                continue
+            name = getattr(callback, '__qualname__', None) or repr(callback)
+            handler.callback = timed_handler(name, callback)
+
+
+def _timed_method(name: str, method: Callable) -> Callable:
+    """Обернуть метод замером длительности и счетчиком вызовов"""
+    if inspect.isgeneratorfunction(method):
+        @wraps(method)
+        def generator_wrapper(*args, **kwargs):
+            DB_CALLS.inc(method=name)
+            start = time.perf_counter()
+            try:
+                yield from method(*args, **kwargs)
+            except Exception:
+                DB_ERRORS.inc(method=name)
+                raise
+            finally:
+                DB_DURATION.observe(time.perf_counter() - start, method=name)
+        return generator_wrapper
+
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        DB_CALLS.inc(method=name)
+        start = time.perf_counter()
+        # Записи журнала внутри метода (ошибки, медленные запросы) получают его имя
+        with logs.bind(db_method=name):
+            try:
+                return method(*args, **kwargs)
+            except Exception:
+                DB_ERRORS.inc(method=name)
+                raise
+            finally:
+                DB_DURATION.observe(time.perf_counter() - start, method=name)
+    return wrapper
+
+
+def instrumented(exclude: Iterable[str] = ()):
+    """
+    Декоратор класса: считает и замеряет вызовы всех публичных методов.
+    Методы из exclude (например, контекстные менеджеры) не оборачиваются.
+    """
+    excluded = set(exclude)
+
+    def decorator(cls):
+        for attr_name, attr in list(vars(cls).items()):
+            if attr_name.startswith('_') or attr_name in excluded or not inspect.isfunction(attr):
+                continue
+            setattr(cls, attr_name, _timed_method(attr_name, attr))
+        return cls
+    return decorator
+
+
+def _metrics_route(path: str, query: dict, headers: dict):
+    body = REGISTRY.render().encode('utf-8')
+    return 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}, body
+
+
+http_server.register_route('/metrics', _metrics_route)
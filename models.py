@@ -14,6 +14,8 @@ class Admin:
     phone: Optional[str] = None
     telegram_username: Optional[str] = None
     created_at: Optional[datetime] = None
+    # Уведомления о новых бронированиях: own - по своим объектам, all - по всем, off - отключены
+    notifications: str = 'own'
 
 
 @dataclass
@@ -38,6 +40,8 @@ class Booking:
     end_date: datetime
     advance_paid: bool = False
     created_at: Optional[datetime] = None
+    # Срок неоплаченной брони; None - бессрочное бронирование
+    expires_at: Optional[datetime] = None
 
 
 @dataclass
@@ -46,6 +50,7 @@ class PropertyPhoto:
     id: int
     property_id: int
     file_id: str
+    file_unique_id: Optional[str] = None
     created_at: Optional[datetime] = None
 
 
@@ -55,4 +60,5 @@ class PropertyVideo:
     id: int
     property_id: int
     file_id: str
+    file_unique_id: Optional[str] = None
     created_at: Optional[datetime] = None
@@ -0,0 +1,61 @@
+"""
+Адресная рассылка уведомлений о новых бронированиях: владельцу объекта и наблюдателям
+"""
+import logging
+from typing import Dict, Iterable, Set
+
+import config
+import metrics
+import outbound
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+# Настройки уведомлений администратора
+OWN = 'own'    # бронирования своих объектов
+ALL = 'all'    # все бронирования (наблюдатель)
+OFF = 'off'    # не получать
+
+MODES = {
+    OWN: "Только мои объекты",
+    ALL: "Все бронирования",
+    OFF: "Отключены",
+}
+
+NOTIFICATIONS_SENT = metrics.REGISTRY.counter(
+    'housereserv_notifications_sent_total', 'Отправленные уведомления о новых бронированиях', ['result'])
+NOTIFICATION_FANOUT = metrics.REGISTRY.histogram(
+    'housereserv_notification_fanout', 'Число получателей уведомления об одном заказе',
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50))
+
+
+def route(db: Storage, property_ids: Iterable[int]) -> Dict[int, Set[int]]:
+    """
+    Получатели уведомления: {user_id: объекты заказа, о которых ему сообщить}.
+    Владелец получает свои объекты (если не отключил уведомления), наблюдатели - все.
+    Объекты без владельца уходят администраторам из ADMIN_IDS окружения.
+    """
+    property_ids = list(dict.fromkeys(property_ids))
+    recipients: Dict[int, Set[int]] = {}
+    for property_id, (owner_id, mode) in db.get_property_owners(property_ids).items():
+        if owner_id is None:
+            for admin_id in config.SUPER_ADMIN_IDS:
+                recipients.setdefault(admin_id, set()).add(property_id)
+        elif mode != OFF:
+            recipients.setdefault(owner_id, set()).add(property_id)
+    for watcher_id in config.NOTIFY_WATCHER_IDS.union(db.get_watching_admins()):
+        recipients.setdefault(watcher_id, set()).update(property_ids)
+    return recipients
+
+
+async def send(bot, chat_id: int, text: str) -> bool:
+    """Отправить уведомление с приоритетом NOTIFICATION; False при ошибке"""
+    try:
+        await bot.send_message(chat_id=chat_id, text=text,
+                               rate_limit_args=outbound.priority_args(outbound.NOTIFICATION))
+        NOTIFICATIONS_SENT.inc(result='sent')
+        return True
+    except Exception as e:
+        NOTIFICATIONS_SENT.inc(result='error')
+        logger.warning(f"Ошибка при отправке уведомления администратору {chat_id}: {e}")
+        return False
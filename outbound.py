@@ -0,0 +1,231 @@
+"""
+Планировщик исходящих запросов к Bot API: лимиты Telegram, приоритеты и RetryAfter
+"""
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from datetime import timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+
+import config
+import metrics
+from throttle import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+# Приоритеты (меньше - важнее)
+INTERACTIVE = 0    # ответы на действия пользователя
+NOTIFICATION = 1   # уведомления владельцам и администраторам
+BULK = 2           # напоминания и прочие рассылки
+
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', NOTIFICATION: 'notification', BULK: 'bulk'}
+
+OUTBOUND_QUEUE_DEPTH = metrics.REGISTRY.gauge(
+    'housereserv_outbound_queue_depth', 'Запросы к Bot API, ожидающие отправки', ['priority'])
+OUTBOUND_WAIT = metrics.REGISTRY.histogram(
+    'housereserv_outbound_wait_seconds', 'Время ожидания запроса в очереди отправки', ['priority'])
+OUTBOUND_RETRY_AFTER = metrics.REGISTRY.counter(
+    'housereserv_outbound_retry_after_total', 'Ответы RetryAfter от Bot API', ['method'])
+
+
+def priority_args(priority: int) -> Dict[str, int]:
+    """Аргумент rate_limit_args для методов бота"""
+    return {'priority': priority}
+
+
+def _seconds(value) -> float:
+    """RetryAfter.retry_after: число секунд или timedelta (зависит от версии библиотеки)"""
+    if isinstance(value, timedelta):
+        return value.total_seconds()
+    return float(value)
+
+
+class PrioritizedRateLimiter(BaseRateLimiter):
+    """
+    Очередь с приоритетами перед каждым запросом к Bot API, адресованным в чат.
+    Соблюдает общий лимит и лимит на чат (token bucket с небольшим запасом;
+    для групп отдельный, поминутный),
+    при RetryAfter приостанавливает все отправки на указанное время и повторяет запрос.
+    Приоритет передается через rate_limit_args={'priority': ...}, по умолчанию INTERACTIVE.
+    """
+
+    def __init__(self, global_rate: float = None, chat_rate: float = None, chat_burst: float = None,
+                 group_rate_per_minute: float = None, max_retries: int = None):
+        global_rate = config.OUTBOUND_GLOBAL_RATE if global_rate is None else global_rate
+        self.chat_rate = config.OUTBOUND_CHAT_RATE if chat_rate is None else chat_rate
+        self.chat_burst = config.OUTBOUND_CHAT_BURST if chat_burst is None else chat_burst
+        group_rate = (config.OUTBOUND_GROUP_RATE_PER_MINUTE
+                      if group_rate_per_minute is None else group_rate_per_minute)
+        self.group_rate = group_rate / 60.0
+        self.max_retries = config.OUTBOUND_MAX_RETRIES if max_retries is None else max_retries
+        self._global_interval = 1.0 / global_rate if global_rate > 0 else 0.0
+        # Очередь каждого чата - куча (приоритет, номер, future); _heads - куча первых
+        # запросов чатов (приоритет, номер, chat_id), устаревшие записи в ней пропускаются
+        self._queue: Dict[Any, List[Tuple[int, int, asyncio.Future]]] = {}
+        self._heads: List[Tuple[int, int, Any]] = []
+        self._size = 0
+        self._seq = itertools.count()
+        self._chats: Dict[Any, TokenBucket] = {}
+        self._global_next = 0.0
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        for priority, name in PRIORITY_NAMES.items():
+            OUTBOUND_QUEUE_DEPTH.set_function(lambda p=priority: self.depth(p), priority=name)
+
+    async def initialize(self) -> None:
+        # Application и Updater оба вызывают bot.initialize(): второй вызов не создает вторую задачу
+        if self._dispatcher is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+        for queue in self._queue.values():
+            for _, _, future in queue:
+                future.cancel()
+        self._queue.clear()
+        self._heads.clear()
+        self._size = 0
+
+    def depth(self, priority: int = None) -> int:
+        """Число ожидающих запросов (всех или с указанным приоритетом)"""
+        if priority is None:
+            return self._size
+        return sum(1 for queue in self._queue.values() for entry in queue if entry[0] == priority)
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        priority = (rate_limit_args or {}).get('priority', INTERACTIVE)
+        chat_id = data.get('chat_id')
+        attempt = 0
+        while True:
+            if chat_id is not None and self._dispatcher is not None:
+                await self._acquire(priority, chat_id)
+            else:
+                await self._wait_pause()
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                OUTBOUND_RETRY_AFTER.inc(method=endpoint)
+                delay = _seconds(e.retry_after)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+                if self._wakeup:
+                    self._wakeup.set()
+                attempt += 1
+                logger.warning(f"Bot API: RetryAfter {delay:.0f} с для {endpoint} (попытка {attempt})")
+                if attempt > self.max_retries:
+                    raise
+
+    async def _wait_pause(self):
+        delay = self._paused_until - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    async def _acquire(self, priority: int, chat_id):
+        """Дождаться своей очереди на отправку"""
+        future = asyncio.get_running_loop().create_future()
+        enqueued = time.monotonic()
+        entry = (priority, next(self._seq), future)
+        queue = self._queue.setdefault(chat_id, [])
+        heapq.heappush(queue, entry)
+        self._size += 1
+        if queue[0] is entry:
+            heapq.heappush(self._heads, (priority, entry[1], chat_id))
+        self._wakeup.set()
+        try:
+            await future
+        finally:
+            OUTBOUND_WAIT.observe(time.monotonic() - enqueued,
+                                  priority=PRIORITY_NAMES.get(priority, str(priority)))
+
+    def _chat_bucket(self, chat_id, now: float) -> Optional[TokenBucket]:
+        """Корзина лимита чата (None, если лимит отключен)"""
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            # Отрицательные chat_id - группы и каналы
+            rate = self.group_rate if isinstance(chat_id, int) and chat_id < 0 else self.chat_rate
+            if rate <= 0:
+                return None
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst, now)
+        return bucket
+
+    async def _dispatch(self):
+        """Выдавать разрешения на отправку в порядке приоритета с учетом лимитов"""
+        while True:
+            now = time.monotonic()
+            delay = None
+            if self._size:
+                delay = max(self._paused_until, self._global_next) - now
+                if delay <= 0:
+                    delay = self._release_next(now)
+            if delay is not None and delay <= 0:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _release_next(self, now: float) -> Optional[float]:
+        """
+        Разрешить самый приоритетный запрос, чей чат не превысил лимит.
+        Возвращает 0, если запрос разрешен, иначе сколько ждать до ближайшего доступного чата
+        """
+        soonest = None
+        blocked: Dict[Any, Tuple[int, int, Any]] = {}
+        try:
+            while self._heads:
+                head = heapq.heappop(self._heads)
+                priority, seq, chat_id = head
+                queue = self._queue.get(chat_id)
+                # Запись устарела: первым в очереди чата стал другой запрос
+                if not queue or queue[0][1] != seq or chat_id in blocked:
+                    continue
+                future = queue[0][2]
+                if future.cancelled():
+                    self._pop_chat(chat_id, queue)
+                    continue
+                bucket = self._chat_bucket(chat_id, now)
+                wait = bucket.delay(now) if bucket else 0.0
+                if wait <= 0:
+                    self._pop_chat(chat_id, queue)
+                    if bucket:
+                        bucket.take(now)
+                    self._global_next = now + self._global_interval
+                    self._forget_idle_chats(now)
+                    future.set_result(None)
+                    return 0
+                blocked[chat_id] = head
+                soonest = wait if soonest is None else min(soonest, wait)
+            return soonest
+        finally:
+            for head in blocked.values():
+                heapq.heappush(self._heads, head)
+
+    def _pop_chat(self, chat_id, queue: List[Tuple[int, int, asyncio.Future]]):
+        """Убрать первый запрос чата и поставить в _heads следующий"""
+        heapq.heappop(queue)
+        self._size -= 1
+        if queue:
+            priority, seq, _ = queue[0]
+            heapq.heappush(self._heads, (priority, seq, chat_id))
+        else:
+            del self._queue[chat_id]
+
+    def _forget_idle_chats(self, now: float):
+        """Удалить корзины чатов, которые давно полностью восстановились"""
+        if len(self._chats) > 10000:
+            self._chats = {chat: bucket for chat, bucket in self._chats.items()
+                           if bucket.delay(now) > 0 or now - bucket.updated < 60}
@@ -0,0 +1,218 @@
+"""
+Трассировка SQL-запросов: журнал медленных запросов и планы выполнения
+"""
+import logging
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger(__name__)
+
+# Операторы, для которых имеет смысл EXPLAIN QUERY PLAN
+_EXPLAINABLE = ('SELECT', 'INSERT', 'UPDATE', 'DELETE', 'WITH', 'REPLACE')
+
+
+def normalize_sql(sql: str) -> str:
+    """Привести текст запроса к одной строке без лишних пробелов"""
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def params_shape(parameters) -> str:
+    """Описание формы параметров без самих значений"""
+    if parameters is None:
+        return '()'
+    if isinstance(parameters, dict):
+        return '{' + ', '.join(f"{key}: {type(value).__name__}" for key, value in parameters.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in parameters) + ')'
+
+
+@dataclass
+class QueryStats:
+    """Накопленная статистика по одному тексту запроса"""
+    sql: str
+    params_shape: str
+    calls: int = 0
+    total_time: float = 0.0
+    max_time: float = 0.0
+    rows: int = 0
+    slow_calls: int = 0
+    plan: List[str] = field(default_factory=list)
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class QueryTracer:
+    """Сборщик статистики выполнения SQL-запросов"""
+
+    def __init__(self, slow_threshold_ms: float = config.DB_SLOW_QUERY_MS):
+        self.slow_threshold = slow_threshold_ms / 1000.0
+        self._stats: Dict[str, QueryStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, connection: sqlite3.Connection, sql: str, parameters,
+               elapsed: float, rows: int):
+        """Учесть выполненный запрос; для медленных запросов снять план выполнения"""
+        key = normalize_sql(sql)
+        plan = None
+        if elapsed >= self.slow_threshold:
+            plan = self._explain(connection, sql, parameters)
+            logger.warning(
+                "Медленный запрос (%.1f мс, строк: %d, параметры: %s): %s%s",
+                elapsed * 1000, rows, params_shape(parameters), key,
+                ''.join(f"\n    {line}" for line in plan or [])
+            )
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = QueryStats(sql=key, params_shape=params_shape(parameters))
+            stats.calls += 1
+            stats.total_time += elapsed
+            stats.max_time = max(stats.max_time, elapsed)
+            stats.rows += rows
+            if plan is not None:
+                stats.slow_calls += 1
+                stats.plan = plan
+
+    @staticmethod
+    def _explain(connection: sqlite3.Connection, sql: str, parameters) -> Optional[List[str]]:
+        """Получить EXPLAIN QUERY PLAN для запроса"""
+        statement = sql.lstrip()
+        if not statement.upper().startswith(_EXPLAINABLE):
+            return None
+        try:
+            # Базовый execute, чтобы сам EXPLAIN не попадал в трассировку
+            cursor = sqlite3.Connection.execute(connection, 'EXPLAIN QUERY PLAN ' + statement,
+                                                parameters if parameters is not None else ())
+            return [row[-1] for row in cursor.fetchall()]
+        except sqlite3.Error as e:
+            return [f"план недоступен: {e}"]
+
+    def top(self, limit: int = 10) -> List[QueryStats]:
+        """Запросы с наибольшим суммарным временем"""
+        with self._lock:
+            stats = list(self._stats.values())
+        return sorted(stats, key=lambda s: s.total_time, reverse=True)[:limit]
+
+    def reset(self):
+        """Сбросить накопленную статистику"""
+        with self._lock:
+            self._stats.clear()
+
+
+TRACER = QueryTracer()
+
+
+class TracingCursor(sqlite3.Cursor):
+    """Курсор, замеряющий выполнение запроса и выборку строк"""
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self._trace: Optional[Tuple[str, object]] = None
+        self._trace_elapsed = 0.0
+        self._trace_rows = 0
+
+    def _finish(self):
+        """Передать накопленные данные о текущем запросе в трассировщик"""
+        if self._trace is not None:
+            sql, parameters = self._trace
+            self._trace = None
+            TRACER.record(self.connection, sql, parameters, self._trace_elapsed, self._trace_rows)
+
+    def _timed(self, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self._trace_elapsed += time.perf_counter() - start
+
+    def execute(self, sql, parameters=()):
+        self._finish()
+        self._trace = (sql, parameters)
+        self._trace_elapsed = 0.0
+        result = self._timed(super().execute, sql, parameters)
+        self._trace_rows = max(self.rowcount, 0)
+        return result
+
+    def executemany(self, sql, seq_of_parameters):
+        self._finish()
+        seq_of_parameters = list(seq_of_parameters)
+        self._trace = (sql, seq_of_parameters[0] if seq_of_parameters else ())
+        self._trace_elapsed = 0.0
+        result = self._timed(super().executemany, sql, seq_of_parameters)
+        self._trace_rows = max(self.rowcount, 0)
+        return result
+
+    def fetchone(self):
+        row = self._timed(super().fetchone)
+        if row is not None:
+            self._trace_rows += 1
+        return row
+
+    def fetchmany(self, size=None):
+        rows = self._timed(super().fetchmany, self.arraysize if size is None else size)
+        self._trace_rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._timed(super().fetchall)
+        self._trace_rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def close(self):
+        self._finish()
+        super().close()
+
+
+class TracingConnection(sqlite3.Connection):
+    """Соединение, все курсоры которого трассируются"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._cursors: List[TracingCursor] = []
+
+    def cursor(self, factory=TracingCursor):
+        cursor = super().cursor(factory)
+        if isinstance(cursor, TracingCursor):
+            self._cursors.append(cursor)
+        return cursor
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def flush_trace(self):
+        """Завершить трассировку всех курсоров перед закрытием соединения"""
+        for cursor in self._cursors:
+            cursor._finish()
+        self._cursors.clear()
+
+
+def format_report(stats: List[QueryStats], max_sql_length: int = 300) -> str:
+    """Текстовый отчет по самым затратным запросам"""
+    if not stats:
+        return "Нет данных трассировки."
+    lines = []
+    for i, item in enumerate(stats, 1):
+        sql = item.sql if len(item.sql) <= max_sql_length else item.sql[:max_sql_length] + '…'
+        lines.append(
+            f"{i}. {item.total_time * 1000:.1f} мс всего, {item.calls} вызовов, "
+            f"ср. {item.avg_time * 1000:.2f} мс, макс. {item.max_time * 1000:.2f} мс, "
+            f"строк: {item.rows}, медленных: {item.slow_calls}"
+        )
+        lines.append(f"   {sql}")
+        lines.append(f"   параметры: {item.params_shape}")
+        for plan_line in item.plan:
+            lines.append(f"   план: {plan_line}")
+    return '\n'.join(lines)
@@ -0,0 +1,106 @@
+"""
+Напоминания о заезде для гостей и владельцев
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from telegram.ext import Application, ContextTypes
+from storage import Storage
+from date_utils import format_date_range
+import outbound
+import config
+
+logger = logging.getLogger(__name__)
+
+REMINDER_KIND = 'checkin'
+
+
+class RateLimitedSender:
+    """Отправка сообщений не чаще заданного числа в секунду"""
+
+    def __init__(self, rate_per_second: float):
+        self.interval = 1.0 / rate_per_second if rate_per_second > 0 else 0.0
+        self._next_send = 0.0
+        self._lock = asyncio.Lock()
+
+    async def send(self, bot, chat_id: int, text: str) -> bool:
+        """Отправить сообщение; возвращает False при ошибке"""
+        async with self._lock:
+            delay = self._next_send - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_send = time.monotonic() + self.interval
+        try:
+            await bot.send_message(chat_id=chat_id, text=text,
+                                   rate_limit_args=outbound.priority_args(outbound.BULK))
+            return True
+        except Exception as e:
+            logger.warning(f"Не удалось отправить напоминание {chat_id}: {e}")
+            return False
+
+
+def _guest_text(booking, property_name: str) -> str:
+    return (
+        f"⏰ Напоминание о заезде\n\n"
+        f"🏠 Объект: {property_name}\n"
+        f"📅 Период: {format_date_range(booking.start_date, booking.end_date)}\n"
+        f"💳 Аванс: {'✅ оплачен' if booking.advance_paid else '❌ не оплачен'}"
+    )
+
+
+def _owner_text(booking, property_name: str) -> str:
+    guest = f"@{booking.user_username}" if booking.user_username else f"ID: {booking.user_id}"
+    return (
+        f"⏰ Скоро заезд\n\n"
+        f"🏠 Объект: {property_name}\n"
+        f"📅 Период: {format_date_range(booking.start_date, booking.end_date)}\n"
+        f"👤 Гость: {guest}\n"
+        f"💳 Аванс: {'✅ оплачен' if booking.advance_paid else '❌ не оплачен'}"
+    )
+
+
+async def send_checkin_reminders(bot, db: Storage, sender: RateLimitedSender,
+                                 now: datetime = None) -> int:
+    """
+    Отправить напоминания по заездам в ближайшие REMINDER_DAYS_AHEAD дней.
+    Выборка идет по индексу start_date и пропускает уже отправленные напоминания.
+    Напоминание отмечается сразу после отправки гостю; если гостю отправить не удалось,
+    бронирование не отмечается и повторяется при следующей проверке.
+    """
+    loop = asyncio.get_running_loop()
+    today = (now or datetime.now()).replace(hour=0, minute=0, second=0, microsecond=0)
+    due = await loop.run_in_executor(
+        None, db.get_bookings_due_for_reminder,
+        today, today + timedelta(days=config.REMINDER_DAYS_AHEAD), REMINDER_KIND
+    )
+    sent = 0
+    for booking, property_name, owner_id in due:
+        # У импортированных бронирований гость может быть неизвестен
+        if booking.user_id > 0 and not await sender.send(bot, booking.user_id,
+                                                         _guest_text(booking, property_name)):
+            continue
+        await loop.run_in_executor(None, db.mark_reminders_sent, [booking.id], REMINDER_KIND)
+        sent += 1
+        if owner_id and owner_id != booking.user_id:
+            await sender.send(bot, owner_id, _owner_text(booking, property_name))
+    return sent
+
+
+def schedule_reminders(application: Application, db: Storage):
+    """Запланировать регулярную рассылку напоминаний в JobQueue"""
+    if config.REMINDER_DAYS_AHEAD <= 0:
+        return
+    sender = RateLimitedSender(config.REMINDER_SEND_RATE)
+
+    async def reminders_job(context: ContextTypes.DEFAULT_TYPE):
+        sent = await send_checkin_reminders(context.bot, db, sender)
+        if sent:
+            logger.info(f"Отправлено напоминаний о заезде: {sent}")
+
+    application.job_queue.run_repeating(
+        reminders_job,
+        interval=timedelta(minutes=config.REMINDER_INTERVAL_MINUTES),
+        first=timedelta(seconds=30),
+        name='checkin_reminders'
+    )
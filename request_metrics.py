@@ -0,0 +1,28 @@
+"""
+HTTP-транспорт Bot API с замером запросов
+"""
+import time
+from telegram.request import HTTPXRequest
+import health
+import metrics
+
+
+class InstrumentedHTTPXRequest(HTTPXRequest):
+    """HTTPXRequest, который считает и замеряет каждый запрос к Bot API"""
+
+    async def do_request(self, url: str, method: str, *args, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        metrics.BOT_API_CALLS.inc(method=api_method)
+        start = time.perf_counter()
+        try:
+            code, payload = await super().do_request(url, method, *args, **kwargs)
+        except Exception:
+            metrics.BOT_API_ERRORS.inc(method=api_method)
+            raise
+        finally:
+            metrics.BOT_API_DURATION.observe(time.perf_counter() - start, method=api_method)
+        if code >= 400:
+            metrics.BOT_API_ERRORS.inc(method=api_method)
+        elif api_method == 'getUpdates':
+            health.mark_poll()
+        return code, payload
@@ -0,0 +1,74 @@
+"""
+Полнотекстовый поиск объектов: разбор запроса пользователя в выражение FTS5
+"""
+import re
+import unicodedata
+from typing import List, Optional
+
+# Веса столбцов для bm25: совпадение в названии важнее совпадения в описании
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+# Ограничения на запрос: лишние слова и слишком длинные слова отбрасываются
+MAX_TERMS = 8
+MAX_TERM_LENGTH = 40
+
+# Слово - последовательность букв и цифр (как у токенизатора unicode61)
+_WORD = re.compile(r'[^\W_]+')
+
+
+def normalize(text: str) -> str:
+    """
+    Нижний регистр, "ё" как "е" и латиница без диакритики ("Ёлки" -> "елки", "Café" -> "cafe").
+    Кириллица, кроме "ё", не меняется: "й" остается "й", как у токенизатора unicode61
+    """
+    result = []
+    for char in text.lower().replace('ё', 'е'):
+        if ord(char) < 0x250:
+            char = ''.join(part for part in unicodedata.normalize('NFKD', char)
+                           if not unicodedata.combining(part))
+        result.append(char)
+    return ''.join(result)
+
+
+def tokenize(text: str) -> List[str]:
+    """Слова текста в нормализованном виде"""
+    return _WORD.findall(normalize(text or ''))
+
+
+def query_terms(text: str) -> List[str]:
+    """Уникальные слова запроса в порядке ввода (не больше MAX_TERMS)"""
+    terms = []
+    for term in tokenize(text):
+        term = term[:MAX_TERM_LENGTH]
+        if term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def match_expression(terms: List[str]) -> str:
+    """
+    Выражение MATCH для FTS5: все слова обязательны, каждое ищется по префиксу ("дом" найдет "домик").
+    Слова берутся в кавычки, поэтому операторы FTS5 во вводе пользователя не действуют
+    """
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def score(terms: List[str], name: List[str], description: List[str]) -> Optional[float]:
+    """
+    Оценка совпадения без индекса: взвешенное число слов, начинающихся с каждого слова запроса.
+    None, если какое-то слово запроса не найдено
+    """
+    total = 0.0
+    for term in terms:
+        in_name = sum(1 for word in name if word.startswith(term))
+        in_description = sum(1 for word in description if word.startswith(term))
+        if not in_name and not in_description:
+            return None
+        total += in_name * NAME_WEIGHT + in_description * DESCRIPTION_WEIGHT
+    return total
+
+
+def fold_sql(column: str) -> str:
+    """SQL-выражение текста для индекса: "ё" как "е" (регистр и диакритику латиницы учитывает токенизатор)"""
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
@@ -0,0 +1,54 @@
+"""
+Замер времени запуска бота: этапы инициализации и время до первого обновления
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Момент импорта модуля считается началом запуска
+STARTED_AT = time.perf_counter()
+
+STARTUP_PHASE_SECONDS = metrics.REGISTRY.gauge(
+    'housereserv_startup_phase_seconds', 'Длительность этапов запуска', ['phase'])
+TIME_TO_FIRST_UPDATE = metrics.REGISTRY.gauge(
+    'housereserv_time_to_first_update_seconds', 'Время от запуска процесса до первого обновления')
+
+_phases: Dict[str, float] = {}
+_first_update_at: Optional[float] = None
+
+
+@contextmanager
+def phase(name: str):
+    """Замерить этап запуска (например, отложенный импорт)"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        _phases[name] = _phases.get(name, 0.0) + elapsed
+        STARTUP_PHASE_SECONDS.set(_phases[name], phase=name)
+
+
+def mark_first_update() -> bool:
+    """Отметить первое обработанное обновление. Возвращает True только в первый раз"""
+    global _first_update_at
+    if _first_update_at is not None:
+        return False
+    _first_update_at = time.perf_counter()
+    TIME_TO_FIRST_UPDATE.set(_first_update_at - STARTED_AT)
+    logger.info(report())
+    return True
+
+
+def report() -> str:
+    """Текстовый отчет о запуске"""
+    parts = [f"{name} {seconds * 1000:.1f} мс" for name, seconds in _phases.items()]
+    text = "Время запуска: " + (", ".join(parts) if parts else "нет данных")
+    if _first_update_at is not None:
+        text += f"; до первого обновления {(_first_update_at - STARTED_AT) * 1000:.1f} мс"
+    return text
@@ -0,0 +1,257 @@
+"""
+Интерфейс хранилища данных бота
+"""
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import config
+from models import Admin, Property, Booking, PropertyPhoto, PropertyVideo
+
+
+class Storage(ABC):
+    """
+    Интерфейс хранилища, с которым работают обработчики.
+    Реализации: Database (SQLite) и InMemoryStorage (в памяти, для тестов и бенчмарков).
+    """
+
+    # Трассировка запросов поддерживается не всеми хранилищами
+    trace_enabled = False
+
+    def set_tracing(self, enabled: bool):
+        """Включить или выключить трассировку запросов"""
+
+    def get_query_stats(self, limit: int = 10) -> list:
+        """Получить запросы с наибольшим суммарным временем выполнения"""
+        return []
+
+    def reset_query_stats(self):
+        """Сбросить статистику трассировки"""
+
+    def ping(self) -> bool:
+        """Проверить доступность хранилища (для проверки готовности)"""
+        return True
+
+    # Администраторы
+    @abstractmethod
+    def add_admin(self, user_id: int, phone: Optional[str] = None,
+                  telegram_username: Optional[str] = None) -> bool:
+        """Добавить администратора"""
+
+    @abstractmethod
+    def get_admin(self, user_id: int) -> Optional[Admin]:
+        """Получить администратора по user_id"""
+
+    @abstractmethod
+    def update_admin_contacts(self, user_id: int, phone: Optional[str] = None,
+                              telegram_username: Optional[str] = None) -> bool:
+        """Обновить контактные данные администратора"""
+
+    @abstractmethod
+    def get_all_admins(self) -> List[Admin]:
+        """Получить всех администраторов"""
+
+    @abstractmethod
+    def set_admin_notifications(self, user_id: int, mode: str) -> bool:
+        """Изменить настройку уведомлений администратора (own, all, off); False, если администратора нет"""
+
+    @abstractmethod
+    def get_watching_admins(self) -> List[int]:
+        """user_id администраторов, подписанных на уведомления по всем объектам"""
+
+    @abstractmethod
+    def get_property_owners(self, property_ids: List[int]) -> Dict[int, Tuple[Optional[int], str]]:
+        """Владельцы объектов и их настройка уведомлений: {property_id: (admin_id, notifications)}"""
+
+    # Объекты
+    @abstractmethod
+    def add_property(self, name: str, admin_id: int, description: Optional[str] = None) -> Optional[int]:
+        """Добавить объект"""
+
+    @abstractmethod
+    def delete_property(self, property_id: int) -> bool:
+        """Удалить объект вместе с медиа и бронированиями"""
+
+    @abstractmethod
+    def get_property(self, property_id: int) -> Optional[Property]:
+        """Получить объект по ID"""
+
+    @abstractmethod
+    def get_all_properties(self) -> List[Property]:
+        """Получить все объекты в порядке ID"""
+
+    @abstractmethod
+    def get_admin_properties(self, admin_id: int) -> List[Property]:
+        """Получить объекты владельца в порядке ID"""
+
+    @abstractmethod
+    def search_properties(self, text: str, limit: int = 10, offset: int = 0) -> List[Property]:
+        """Найти объекты по словам в названии и описании, лучшие совпадения первыми"""
+
+    @abstractmethod
+    def update_property_description(self, property_id: int, description: str) -> bool:
+        """Обновить описание объекта"""
+
+    # Фотографии и видео
+    @abstractmethod
+    def add_property_photo(self, property_id: int, file_id: str,
+                           file_unique_id: Optional[str] = None) -> bool:
+        """Добавить фотографию к объекту (False, если достигнут лимит или файл уже добавлен)"""
+
+    @abstractmethod
+    def get_property_photos(self, property_id: int) -> List[str]:
+        """Получить все фотографии объекта"""
+
+    @abstractmethod
+    def delete_property_photo(self, property_id: int, file_id: str) -> bool:
+        """Удалить фотографию объекта"""
+
+    @abstractmethod
+    def add_property_video(self, property_id: int, file_id: str,
+                           file_unique_id: Optional[str] = None) -> bool:
+        """Добавить видео к объекту (False, если достигнут лимит или файл уже добавлен)"""
+
+    @abstractmethod
+    def get_property_videos(self, property_id: int) -> List[str]:
+        """Получить все видео объекта"""
+
+    @abstractmethod
+    def delete_property_video(self, property_id: int, file_id: str) -> bool:
+        """Удалить видео объекта"""
+
+    @abstractmethod
+    def add_property_media_batch(self, property_id: int, kind: str,
+                                 items: List[Tuple[str, Optional[str]]]) -> Tuple[int, int]:
+        """
+        Добавить несколько файлов (photo или video) одной транзакцией.
+        Возвращает (добавлено, уже были у объекта); остальные не поместились в лимит
+        """
+
+    @abstractmethod
+    def get_property_media(self, property_id: int) -> Tuple[List[PropertyPhoto], List[PropertyVideo]]:
+        """Получить фотографии и видео объекта в порядке добавления"""
+
+    # Бронирования
+    @abstractmethod
+    def add_booking(self, property_id: int, user_id: int, user_username: Optional[str],
+                    user_phone: Optional[str], start_date: datetime, end_date: datetime,
+                    expires_at: Optional[datetime] = None) -> Optional[int]:
+        """Добавить бронирование (expires_at - срок неоплаченной брони)"""
+
+    @abstractmethod
+    def add_bookings_batch(self, user_id: int, user_username: Optional[str], user_phone: Optional[str],
+                           ranges: List[Tuple[int, datetime, datetime]],
+                           expires_at: Optional[datetime] = None
+                           ) -> Tuple[List[int], List[Tuple[Tuple[int, datetime, datetime], str]]]:
+        """
+        Добавить несколько бронирований гостя по принципу "все или ничего": (ID, []) или ([], конфликты).
+        Периоды с датой заезда раньше сегодняшнего дня отклоняются
+        """
+
+    @abstractmethod
+    def check_date_availability(self, property_id: int, start_date: datetime,
+                                end_date: datetime, exclude_booking_id: Optional[int] = None) -> bool:
+        """Проверить доступность дат для бронирования"""
+
+    @abstractmethod
+    def get_booking(self, booking_id: int) -> Optional[Booking]:
+        """Получить бронирование по ID"""
+
+    @abstractmethod
+    def get_admin_bookings(self, admin_id: Optional[int] = None,
+                           limit: Optional[int] = None) -> List[Tuple[Booking, str]]:
+        """Бронирования объектов владельца (None - всех) в порядке дат: (бронирование, название объекта)"""
+
+    @abstractmethod
+    def get_property_bookings(self, property_id: int) -> List[Booking]:
+        """Получить текущие бронирования объекта в порядке дат"""
+
+    @abstractmethod
+    def iter_property_bookings(self, property_id: int, batch_size: int = 500) -> Iterator[Booking]:
+        """Построчно выдать текущие бронирования объекта в порядке дат"""
+
+    @abstractmethod
+    def get_calendar_state(self, property_id: int) -> Optional[Tuple[str, int]]:
+        """Получить название объекта и версию его бронирований (None, если объекта нет)"""
+
+    @abstractmethod
+    def get_user_bookings(self, user_id: int) -> List[Booking]:
+        """Получить текущие бронирования пользователя в порядке дат"""
+
+    @abstractmethod
+    def delete_booking(self, booking_id: int, user_id: int) -> bool:
+        """Удалить бронирование (только свое)"""
+
+    @abstractmethod
+    def set_advance_paid(self, booking_id: int, paid: bool) -> bool:
+        """Установить признак оплаты аванса (оплата снимает срок брони)"""
+
+    # Статистика
+    @abstractmethod
+    def get_booking_statistics(self, admin_id: Optional[int] = None) -> List[dict]:
+        """
+        Статистика по объектам (включая архив): bookings_count, paid_count, booked_nights
+        (ночей в бронировании - дней с заезда по выезд включительно, как в analytics).
+        admin_id - только объекты владельца
+        """
+
+    @abstractmethod
+    def get_booking_day_spans(self, start: datetime, end: datetime) -> List[Tuple[int, int, int, int]]:
+        """
+        Бронирования (включая архив), пересекающие [start, end]:
+        (property_id, день начала, день окончания, день создания), дни отсчитываются от 1970-01-01
+        """
+
+    @abstractmethod
+    def rebuild_property_stats(self) -> bool:
+        """Пересчитать счетчики статистики"""
+
+    # Архивация
+    @abstractmethod
+    def archive_bookings(self, cutoff: datetime, batch_size: int = 500) -> int:
+        """Перенести в архив бронирования, закончившиеся до cutoff"""
+
+    # Временные брони
+    @abstractmethod
+    def release_expired_holds(self, now: datetime, batch_size: int = 500) -> List[Booking]:
+        """Удалить неоплаченные брони со сроком до now включительно, вернуть удаленные"""
+
+    # Напоминания
+    @abstractmethod
+    def get_bookings_due_for_reminder(self, start: datetime, end: datetime,
+                                      kind: str) -> List[Tuple[Booking, str, Optional[int]]]:
+        """Бронирования с заездом в [start, end] без отправленного напоминания kind"""
+
+    @abstractmethod
+    def mark_reminders_sent(self, booking_ids: List[int], kind: str) -> bool:
+        """Отметить напоминания как отправленные"""
+
+    # Массовый импорт и экспорт
+    @abstractmethod
+    def iter_properties(self, batch_size: int = 1000, admin_id: Optional[int] = None) -> Iterator[dict]:
+        """Построчно выдать объекты (admin_id - только объекты владельца)"""
+
+    @abstractmethod
+    def iter_bookings(self, batch_size: int = 1000, include_archive: bool = False,
+                      admin_id: Optional[int] = None) -> Iterator[dict]:
+        """Построчно выдать бронирования (admin_id - только по объектам владельца)"""
+
+    @abstractmethod
+    def bulk_add_properties(self, rows: Iterable[dict], chunk_size: int = 500) -> int:
+        """Массово добавить объекты"""
+
+    @abstractmethod
+    def bulk_add_bookings(self, rows: Iterable[dict],
+                          chunk_size: int = 500) -> Tuple[int, List[Tuple[dict, str]]]:
+        """Массово добавить бронирования с проверкой пересечений"""
+
+
+def create_storage(backend: str = None) -> Storage:
+    """Создать хранилище по имени: sqlite (по умолчанию) или memory"""
+    backend = (backend or config.STORAGE_BACKEND).lower()
+    if backend == 'memory':
+        from memory_storage import InMemoryStorage
+        return InMemoryStorage()
+    if backend == 'sqlite':
+        from database import Database
+        return Database()
+    raise ValueError(f"Неизвестное хранилище: {backend}")
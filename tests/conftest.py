@@ -0,0 +1,21 @@
+"""
+Общие фикстуры тестов: хранилище, параметризованное по реализациям Storage
+"""
+import os
+import sys
+
+import pytest
+
+# Модули проекта лежат в корне репозитория
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database  # noqa: E402
+from memory_storage import InMemoryStorage  # noqa: E402
+
+
+@pytest.fixture(params=['sqlite', 'memory'])
+def storage(request, tmp_path):
+    """Пустое хранилище: Database во временном файле или InMemoryStorage"""
+    if request.param == 'sqlite':
+        return Database(str(tmp_path / 'test.db'))
+    return InMemoryStorage()
@@ -0,0 +1,55 @@
+"""
+Обработчики администратора: область видимости экранов
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import config
+from admin_handlers import AdminHandlers
+
+
+class FakeQuery:
+    """callback_query: запоминает последний показанный экран"""
+
+    def __init__(self, user_id: int, data: str):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.data = data
+        self.text = None
+        self.buttons = []
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    async def edit_message_text(self, text, reply_markup=None):
+        self.text = text
+        self.buttons = [button.callback_data for row in reply_markup.inline_keyboard for button in row]
+
+
+def press(handlers, user_id: int, data: str) -> FakeQuery:
+    query = FakeQuery(user_id, data)
+    asyncio.run(handlers.admin_callback(SimpleNamespace(callback_query=query), None))
+    return query
+
+
+def test_payment_toggle_keeps_own_scope(storage, monkeypatch):
+    monkeypatch.setattr(config, 'ADMIN_IDS', {1})
+    monkeypatch.setattr(config, 'SUPER_ADMIN_IDS', frozenset({1}))
+    storage.add_admin(2)
+    own = storage.add_property("Мой дом", 1)
+    other = storage.add_property("Чужой дом", 2)
+    booking_id = storage.add_booking(own, 10, None, None, datetime(2030, 6, 1), datetime(2030, 6, 3))
+    storage.add_booking(other, 11, None, None, datetime(2030, 6, 1), datetime(2030, 6, 3))
+    handlers = AdminHandlers(storage)
+
+    screen = press(handlers, 1, "admin_stats_mine")
+    toggle = f"admin_booking_payment_mine_{booking_id}"
+    assert toggle in screen.buttons and "Чужой дом" not in screen.text
+
+    screen = press(handlers, 1, toggle)
+    assert storage.get_booking(booking_id).advance_paid
+    assert "Чужой дом" not in screen.text and "admin_stats" in screen.buttons
+
+    screen = press(handlers, 1, f"admin_booking_payment_{booking_id}")
+    assert not storage.get_booking(booking_id).advance_paid
+    assert "Чужой дом" in screen.text
@@ -0,0 +1,45 @@
+"""
+Архивация завершившихся бронирований
+"""
+import asyncio
+import threading
+from datetime import datetime
+
+import archive
+import config
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = {}
+
+    def run_repeating(self, callback, interval, first, name):
+        self.jobs[name] = callback
+
+
+class FakeApplication:
+    def __init__(self):
+        self.job_queue = FakeJobQueue()
+
+
+def test_archive_old_bookings(storage, monkeypatch):
+    monkeypatch.setattr(config, 'ARCHIVE_AFTER_DAYS', 30)
+    storage.add_admin(1)
+    property_id = storage.add_property("Дом", 1)
+    storage.add_booking(property_id, 10, None, None, datetime(2030, 1, 1), datetime(2030, 1, 5))
+    storage.add_booking(property_id, 10, None, None, datetime(2030, 2, 1), datetime(2030, 2, 5))
+
+    assert archive.archive_old_bookings(storage, now=datetime(2030, 2, 20)) == 1
+    assert [booking.start_date.month for booking in storage.get_property_bookings(property_id)] == [2]
+
+
+def test_archive_job_runs_off_loop(storage, monkeypatch):
+    monkeypatch.setattr(config, 'ARCHIVE_AFTER_DAYS', 30)
+    threads = []
+    monkeypatch.setattr(archive, 'archive_old_bookings',
+                        lambda db: threads.append(threading.current_thread()) or 0)
+    application = FakeApplication()
+    archive.schedule_archiving(application, storage)
+
+    asyncio.run(application.job_queue.jobs['archive_bookings'](None))
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,90 @@
+"""
+Заказ из нескольких периодов и объектов: одна транзакция по принципу "все или ничего"
+"""
+import asyncio
+import sqlite3
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import config
+from database import Database
+from user_handlers import UserHandlers
+
+
+def ahead(days: int) -> datetime:
+    return datetime.combine(date.today() + timedelta(days=days), datetime.min.time())
+
+
+class FakeBot:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.messages.append((chat_id, text))
+
+
+class FakeQuery:
+    def __init__(self, data: str):
+        self.from_user = SimpleNamespace(id=20)
+        self.data = data
+        self.text = None
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    async def edit_message_text(self, text, reply_markup=None):
+        self.text = text
+
+
+def checkout(handlers, context) -> str:
+    query = FakeQuery("user_cart_checkout")
+    update = SimpleNamespace(callback_query=query, effective_user=SimpleNamespace(id=20, username='guest'))
+    asyncio.run(handlers.user_callback(update, context))
+    return query.text
+
+
+def test_checkout_all_or_nothing(storage, monkeypatch):
+    monkeypatch.setattr(config, 'HOLD_TTL_HOURS', 0)
+    monkeypatch.setattr(config, 'NOTIFY_WATCHER_IDS', frozenset())
+    storage.add_admin(1)
+    storage.add_admin(2)
+    house = storage.add_property("Дом", 1)
+    cottage = storage.add_property("Дача", 2)
+    storage.add_booking(cottage, 10, None, None, ahead(12), ahead(14))
+    handlers = UserHandlers(storage)
+    context = SimpleNamespace(bot=FakeBot(), user_data={'booking_cart': [
+        (house, ahead(10).date(), ahead(12).date()),
+        (cottage, ahead(14).date(), ahead(15).date()),
+    ]})
+
+    text = checkout(handlers, context)
+    assert "не оформлен" in text and "Дача" in text
+    assert storage.get_user_bookings(20) == [] and context.bot.messages == []
+    assert len(context.user_data['booking_cart']) == 2
+
+    context.user_data['booking_cart'][1] = (cottage, ahead(16).date(), ahead(17).date())
+    text = checkout(handlers, context)
+    assert "успешно созданы" in text
+    assert len(storage.get_user_bookings(20)) == 2
+    assert 'booking_cart' not in context.user_data
+    # Каждый владелец получает одно уведомление только о своем объекте
+    assert sorted(chat_id for chat_id, _ in context.bot.messages) == [1, 2]
+
+
+def test_failed_insert_rolls_back(tmp_path):
+    path = str(tmp_path / 'test.db')
+    db = Database(path)
+    db.add_admin(1)
+    house = db.add_property("Дом", 1)
+    cottage = db.add_property("Дача", 1)
+    # Вставка второго периода завершается ошибкой уже после вставки первого
+    with sqlite3.connect(path) as conn:
+        conn.execute(f'''
+            CREATE TRIGGER fail_cottage BEFORE INSERT ON bookings WHEN NEW.property_id = {cottage}
+            BEGIN SELECT RAISE(ABORT, 'сбой'); END
+        ''')
+
+    ids, conflicts = db.add_bookings_batch(20, None, None, [
+        (house, ahead(10), ahead(12)), (cottage, ahead(10), ahead(12))])
+    assert ids == [] and {reason for _, reason in conflicts} == {'ошибка базы данных'}
+    assert db.get_user_bookings(20) == []
@@ -0,0 +1,40 @@
+"""
+Массовый импорт и экспорт (bulk_io)
+"""
+import io
+import json
+from datetime import datetime
+
+import bulk_io
+from database import Database
+
+
+def test_export_format_from_extension(tmp_path):
+    db_path = str(tmp_path / 'test.db')
+    db = Database(db_path)
+    db.add_admin(1)
+    db.add_property("Дом", 1)
+
+    output = tmp_path / 'properties.json'
+    bulk_io.main(['--db', db_path, 'export', 'properties', '--output', str(output)])
+    assert [row['name'] for row in json.loads(output.read_text(encoding='utf-8'))] == ["Дом"]
+
+    output = tmp_path / 'properties.csv'
+    bulk_io.main(['--db', db_path, 'export', 'properties', '--output', str(output)])
+    assert output.read_text(encoding='utf-8').startswith('id,name,')
+
+
+def test_export_owner_scope(storage):
+    storage.add_admin(1)
+    storage.add_admin(2)
+    own = storage.add_property("Мой дом", 1)
+    other = storage.add_property("Чужой дом", 2)
+    storage.add_booking(own, 10, None, None, datetime(2030, 6, 1), datetime(2030, 6, 3))
+    storage.add_booking(other, 11, None, None, datetime(2030, 6, 1), datetime(2030, 6, 3))
+
+    out = io.StringIO()
+    assert bulk_io.export_rows(storage, 'bookings', 'json', out, admin_id=1) == 1
+    assert [row['property_id'] for row in json.loads(out.getvalue())] == [own]
+    out = io.StringIO()
+    assert bulk_io.export_rows(storage, 'properties', 'csv', out, admin_id=2) == 1
+    assert "Чужой дом" in out.getvalue() and "Мой дом" not in out.getvalue()
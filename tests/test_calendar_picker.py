@@ -0,0 +1,88 @@
+"""
+Календарь выбора дат: кэш сеток и выбор со старой клавиатуры
+"""
+import asyncio
+from datetime import date, datetime
+from types import SimpleNamespace
+
+import calendar_picker
+from user_handlers import UserHandlers
+
+TODAY = [date(2030, 6, 10)]
+
+
+class FakeDate(date):
+    @classmethod
+    def today(cls):
+        return TODAY[0]
+
+
+class FakeQuery:
+    def __init__(self, user_id: int, data: str):
+        self.from_user = SimpleNamespace(id=user_id)
+        self.data = data
+        self.text = None
+        self.buttons = []
+
+    async def answer(self, *args, **kwargs):
+        pass
+
+    async def edit_message_text(self, text, reply_markup=None):
+        self.text = text
+        self.buttons = [button.callback_data for row in reply_markup.inline_keyboard for button in row] \
+            if reply_markup else []
+
+
+def press(handlers, context, data: str) -> FakeQuery:
+    query = FakeQuery(10, data)
+    update = SimpleNamespace(callback_query=query, effective_user=SimpleNamespace(id=10, username=None))
+    asyncio.run(handlers.user_callback(update, context))
+    return query
+
+
+def setup_property(storage, monkeypatch):
+    monkeypatch.setattr(calendar_picker, 'date', FakeDate)
+    TODAY[0] = date(2030, 6, 10)
+    storage.add_admin(1)
+    return storage.add_property("Дом", 1)
+
+
+def test_grids_follow_current_day(storage, monkeypatch):
+    property_id = setup_property(storage, monkeypatch)
+    storage.add_booking(property_id, 11, None, None, datetime(2030, 6, 9), datetime(2030, 6, 11))
+    cache = calendar_picker.AvailabilityCache(storage)
+
+    busy = {day for week in cache.get_month(property_id, 203006) for day, occupied in week if occupied}
+    assert busy == {10, 11}
+    TODAY[0] = date(2030, 6, 11)
+    busy = {day for week in cache.get_month(property_id, 203006) for day, occupied in week if occupied}
+    assert busy == {11}
+    assert len(cache) == 1
+
+
+def test_stale_pick_rejected(storage, monkeypatch):
+    property_id = setup_property(storage, monkeypatch)
+    handlers = UserHandlers(storage)
+    context = SimpleNamespace(user_data={})
+
+    press(handlers, context, f"user_book_{property_id}")
+    screen = press(handlers, context, f"user_cal_{property_id}_203006")
+    assert f"user_calpick_{property_id}_20300615" in screen.buttons
+
+    # Даты заняты в обход кэша, кнопки на экране гостя устарели
+    storage.add_booking(property_id, 11, None, None, datetime(2030, 6, 15), datetime(2030, 6, 16))
+    screen = press(handlers, context, f"user_calpick_{property_id}_20300615")
+    assert "недоступна" in screen.text
+    assert 'booking_checkin' not in context.user_data
+    screen = press(handlers, context, f"user_cal_{property_id}_203006")
+    assert f"user_calpick_{property_id}_20300615" not in screen.buttons
+
+    # Листание месяцев тоже сверяет версию бронирований
+    storage.add_booking(property_id, 11, None, None, datetime(2030, 7, 1), datetime(2030, 7, 2))
+    screen = press(handlers, context, f"user_cal_{property_id}_203007")
+    assert f"user_calpick_{property_id}_20300701" not in screen.buttons
+
+    press(handlers, context, f"user_calpick_{property_id}_20300612")
+    TODAY[0] = date(2030, 6, 13)
+    screen = press(handlers, context, f"user_calpick_{property_id}_20300614")
+    assert "недоступна" in screen.text
@@ -0,0 +1,101 @@
+"""
+Стенд сквозного замера: локальный Bot API, замкнутая нагрузка и короткий прогон бота
+"""
+import asyncio
+import json
+import threading
+import time
+import urllib.parse
+import urllib.request
+
+import pytest
+
+import config
+import e2e_bench
+
+
+def test_parse_params():
+    params = e2e_bench._parse_params(
+        'application/x-www-form-urlencoded',
+        b'chat_id=-100&message_id=7&text=%D0%94%D0%BE%D0%BC&media=%5B%7B%22type%22%3A%22photo%22%7D%5D')
+    assert params == {'chat_id': -100, 'message_id': 7, 'text': 'Дом', 'media': [{'type': 'photo'}]}
+
+    body = (b'--b\r\nContent-Disposition: form-data; name="chat_id"\r\n\r\n42\r\n'
+            b'--b\r\nContent-Disposition: form-data; name="photo"; filename="a.jpg"\r\n\r\nxx\r\n--b--\r\n')
+    assert e2e_bench._parse_params('multipart/form-data; boundary=b', body) == {'chat_id': 42, 'photo': '<file>'}
+
+
+@pytest.fixture
+def api():
+    replies = []
+    api = e2e_bench.FakeBotApi(lambda *args: replies.append(args))
+    api.replies = replies
+    api.start()
+    yield api
+    api.close()
+
+
+def post(api, method, **params):
+    request = urllib.request.Request(f'{api.base_url}{e2e_bench.BOT_TOKEN}/{method}',
+                                     data=urllib.parse.urlencode(params).encode(), method='POST')
+    with urllib.request.urlopen(request, timeout=5) as response:
+        return json.loads(response.read())['result']
+
+
+def test_fake_api_replies(api):
+    assert api.call('getMe', {})['username'] == e2e_bench.BOT_USER['username']
+    sent = api.call('sendMessage', {'chat_id': 5, 'text': 'Привет'})
+    edited = api.call('editMessageText', {'chat_id': 5, 'message_id': sent['message_id'], 'text': 'Пока'})
+    album = api.call('sendMediaGroup', {'chat_id': 5, 'media': [{}, {}]})
+    api.call('sendChatAction', {'chat_id': 5})
+    assert edited['message_id'] == sent['message_id'] and len(album) == 2
+    assert [(chat_id, method) for chat_id, method, _, _ in api.replies] == [
+        (5, 'sendMessage'), (5, 'editMessageText'), (5, 'sendMediaGroup')]
+    assert api.calls['sendChatAction'] == 1
+
+
+def test_get_updates_waits_for_enqueue(api):
+    delivered = []
+    timer = threading.Timer(0.1, api.enqueue, ({'update_id': 1}, delivered.append))
+    timer.start()
+    # Запрос по HTTP ждет обновления, как long polling
+    assert post(api, 'getUpdates', timeout=5) == [{'update_id': 1}]
+    assert len(delivered) == 1
+    assert post(api, 'getUpdates', timeout=0) == []
+
+
+def test_driver_dispatches_after_full_reply():
+    steps = [e2e_bench.Step('/start'), e2e_bench.Step('user_search', callback=True, replies=2)]
+    user = e2e_bench.VirtualUser(e2e_bench.FIRST_USER_ID, steps)
+    driver = e2e_bench.LoadDriver([user], step_timeout=5)
+    driver.api = e2e_bench.FakeBotApi(driver.on_reply)
+    driver.api.start()
+    sent = []
+    driver._deliver = lambda update, on_deliver: (sent.append(update), on_deliver(time.monotonic()))
+    try:
+        driver.begin_measurement(e2e_bench.BenchReport(mode='polling', users=1, duration=0))
+        driver._dispatch(user)
+        assert sent[0]['message']['text'] == '/start'
+        driver.on_reply(user.id, 'sendMessage', 10, time.monotonic())
+        # Нажатие кнопки привязано к последнему сообщению бота и ждет двух ответов
+        assert sent[1]['callback_query']['message']['message_id'] == 10
+        driver.on_reply(user.id, 'editMessageText', 10, time.monotonic())
+        assert len(sent) == 2
+        driver.on_reply(user.id, 'sendMessage', 11, time.monotonic())
+        assert len(sent) == 3
+        report = driver.finish()
+    finally:
+        driver.api.close()
+    assert report.updates == 2
+
+
+def test_run_bench_smoke(monkeypatch):
+    for name in ('BOT_TOKEN', 'BOT_API_BASE_URL', 'BOT_API_FILE_URL', 'THROTTLE_USER_RATE',
+                 'THROTTLE_GLOBAL_RATE', 'THROTTLE_COALESCE_SECONDS', 'OUTBOUND_GLOBAL_RATE',
+                 'OUTBOUND_CHAT_RATE', 'OUTBOUND_GROUP_RATE_PER_MINUTE'):
+        monkeypatch.setattr(config, name, getattr(config, name))
+    report = asyncio.run(e2e_bench.run_bench(
+        users=2, duration=1.0, warmup=0.3, properties=2, photos=1, storage='memory', step_timeout=2.0))
+    assert report.updates > 0 and report.timeouts == 0 and report.delivery_errors == 0
+    assert report.calls['sendMessage'] > 0
+    assert "Обработано обновлений" in report.summary()
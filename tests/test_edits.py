@@ -0,0 +1,84 @@
+"""
+Пропуск редактирований сообщений без изменений (EditAwareBot)
+"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+from telegram.ext import ExtBot
+
+import edits
+
+
+def keyboard(label: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup([[InlineKeyboardButton(label, callback_data='x')]])
+
+
+@pytest.fixture
+def api(monkeypatch):
+    """Бот без сети: запросы к Bot API записываются в api.sent, ответы задаются в api.responses"""
+    api = SimpleNamespace(bot=edits.EditAwareBot(token='123:abc'), sent=[], responses=[])
+
+    async def post(self, endpoint, data=None, **kwargs):
+        api.sent.append(endpoint)
+        response = api.responses.pop(0) if api.responses else True
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(ExtBot, '_post', post)
+    return api
+
+
+def test_unchanged_edit_skipped(api):
+    bot = api.bot
+
+    async def main():
+        await bot.edit_message_text('Текст', chat_id=1, message_id=2, reply_markup=keyboard('a'))
+        # Те же текст и клавиатура (новые объекты, аргументы по имени) - запрос не отправляется
+        assert await bot.edit_message_text(text='Текст', chat_id=1, message_id=2, reply_markup=keyboard('a'))
+        await bot.edit_message_text('Текст', chat_id=1, message_id=2, reply_markup=keyboard('b'))
+        await bot.edit_message_text('Текст', chat_id=1, message_id=3, reply_markup=keyboard('b'))
+
+    asyncio.run(main())
+    assert api.sent == ['editMessageText'] * 3
+
+
+def test_other_changes_forget_fingerprint(api):
+    bot = api.bot
+
+    async def main():
+        await bot.edit_message_text('Текст', chat_id=1, message_id=2)
+        await bot.edit_message_reply_markup(chat_id=1, message_id=2, reply_markup=keyboard('a'))
+        await bot.edit_message_text('Текст', chat_id=1, message_id=2)
+
+    asyncio.run(main())
+    assert api.sent == ['editMessageText', 'editMessageReplyMarkup', 'editMessageText']
+
+
+def test_not_modified_is_not_an_error(api):
+    bot = api.bot
+
+    skipped = edits.EDITS_SKIPPED.get(reason='not_modified')
+    api.responses = [BadRequest("Message is not modified"), BadRequest("Message to edit not found")]
+
+    async def main():
+        assert await bot.edit_message_text('Текст', chat_id=1, message_id=2)
+        # Отпечаток запомнен: повтор не отправляется
+        assert await bot.edit_message_text('Текст', chat_id=1, message_id=2)
+        with pytest.raises(BadRequest):
+            await bot.edit_message_text('Другой', chat_id=1, message_id=2)
+        await bot.edit_message_text('Текст', chat_id=1, message_id=2)
+
+    asyncio.run(main())
+    assert api.sent == ['editMessageText'] * 3
+    assert edits.EDITS_SKIPPED.get(reason='not_modified') == skipped + 1
+
+
+def test_fingerprints_lru():
+    store = edits.EditFingerprints(max_size=2)
+    for key in ('a', 'b', 'c'):
+        store.remember(key, key)
+    assert len(store) == 2 and not store.is_same('a', 'a') and store.is_same('c', 'c')
@@ -0,0 +1,94 @@
+"""
+Проверки живости и готовности: /health, /ready и /stats
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+import config
+import health
+import http_server
+
+
+@pytest.fixture
+def state(storage, monkeypatch):
+    now = time.monotonic()
+    monkeypatch.setattr(config, 'WEBHOOK_URL', '')
+    monkeypatch.setattr(health.LOOP, 'beat_at', now)
+    monkeypatch.setattr(health, '_last_poll_at', now)
+    monkeypatch.setattr(health, '_last_update_at', None)
+    monkeypatch.setattr(health, '_storage', None)
+    monkeypatch.setattr(health, '_stats', {})
+    monkeypatch.setattr(health, '_caches', {})
+    health.set_storage(storage)
+    return now
+
+
+def get(path):
+    status, headers, body = http_server._resolve(path)(path, {}, {})
+    assert headers['Cache-Control'] == 'no-store'
+    return status, json.loads(body)
+
+
+def test_ready(state):
+    assert get('/health')[0] == 200
+    status, result = get('/ready')
+    assert status == 200 and result['ready'] and result['database']
+    assert result['seconds_since_update'] is None
+
+
+def test_stalled_loop(state, monkeypatch):
+    monkeypatch.setattr(health.LOOP, 'beat_at', state - config.HEALTH_LOOP_STALL_SECONDS - 1)
+    status, result = get('/health')
+    assert status == 503 and not result['live']
+    assert get('/ready')[0] == 503
+
+
+def test_stale_polling(state, monkeypatch):
+    now = state + config.HEALTH_UPDATE_MAX_AGE_SECONDS + 1
+    monkeypatch.setattr(health.LOOP, 'beat_at', now)
+    monkeypatch.setattr(health, '_STARTED_AT', state)
+    result = health.readiness(now)
+    assert result['live'] and not result['polling'] and not result['ready']
+    # Свежее обновление или webhook снимают требование к опросу
+    monkeypatch.setattr(health, '_last_update_at', now)
+    assert health.readiness(now)['ready']
+    monkeypatch.setattr(health, '_last_update_at', None)
+    monkeypatch.setattr(config, 'WEBHOOK_URL', 'https://example.org/hook')
+    assert health.readiness(now)['ready']
+
+
+def test_database_unavailable(state, monkeypatch):
+    monkeypatch.setattr(health._storage, 'ping', lambda: False)
+    status, result = get('/ready')
+    assert status == 503 and not result['database']
+
+
+def test_stats(state):
+    health.register_stat('update_queue', lambda: 3)
+    health.register_cache('calendar', lambda: 12)
+    status, stats = get('/stats')
+    assert status == 200 and stats['ready']
+    assert stats['update_queue'] == 3 and stats['caches'] == {'calendar': 12}
+    assert stats['uptime_seconds'] >= 0
+
+
+def test_loop_monitor_measures_lag():
+    async def run():
+        monitor = health.LoopMonitor(interval=0.01)
+        monitor.start()
+        await asyncio.sleep(0.02)
+        # Блокирующий вызов задерживает пробуждение монитора
+        time.sleep(0.1)
+        await asyncio.sleep(0.03)
+        await monitor.stop()
+        return monitor
+
+    try:
+        monitor = asyncio.run(run())
+    finally:
+        health.EVENT_LOOP_LAG.set_function(lambda: health.LOOP.lag)
+    assert monitor.max_lag >= 0.05
+    assert time.monotonic() - monitor.beat_at < 1
@@ -0,0 +1,68 @@
+"""
+Временные брони: срок брони и снятие истекших
+"""
+import asyncio
+import threading
+from datetime import datetime
+
+import config
+import holds
+
+
+class FakeJobQueue:
+    def __init__(self):
+        self.jobs = {}
+
+    def run_repeating(self, callback, interval, first, name):
+        self.jobs[name] = callback
+
+
+class FakeApplication:
+    def __init__(self):
+        self.job_queue = FakeJobQueue()
+
+
+class FakeCalendars:
+    def __init__(self):
+        self.invalidated = []
+
+    def invalidate(self, property_id):
+        self.invalidated.append(property_id)
+
+
+def test_holds_disabled_by_default(monkeypatch):
+    monkeypatch.setattr(config, 'HOLD_TTL_HOURS', 0)
+    assert holds.hold_expires_at() is None
+    application = FakeApplication()
+    holds.schedule_hold_sweeper(application, None)
+    assert application.job_queue.jobs == {}
+
+
+def test_release_expired_holds(storage, monkeypatch):
+    monkeypatch.setattr(config, 'HOLD_TTL_HOURS', 24)
+    storage.add_admin(1)
+    first = storage.add_property("Дом", 1)
+    second = storage.add_property("Дача", 1)
+    now = datetime(2030, 6, 1, 12)
+    storage.add_booking(first, 10, None, None, datetime(2030, 7, 1), datetime(2030, 7, 3),
+                        expires_at=holds.hold_expires_at(now))
+    storage.add_booking(second, 11, None, None, datetime(2030, 7, 1), datetime(2030, 7, 3),
+                        expires_at=holds.hold_expires_at(datetime(2030, 6, 2, 12)))
+
+    calendars = FakeCalendars()
+    released = holds.release_expired_holds(storage, [calendars], now=datetime(2030, 6, 2, 13))
+    assert [booking.user_id for booking in released] == [10]
+    assert calendars.invalidated == [first]
+    assert storage.get_property_bookings(first) == []
+
+
+def test_holds_job_runs_off_loop(storage, monkeypatch):
+    monkeypatch.setattr(config, 'HOLD_TTL_HOURS', 24)
+    threads = []
+    monkeypatch.setattr(holds, 'release_expired_holds',
+                        lambda db, calendars: threads.append(threading.current_thread()) or [])
+    application = FakeApplication()
+    holds.schedule_hold_sweeper(application, storage)
+
+    asyncio.run(application.job_queue.jobs['expired_holds'](None))
+    assert threads and threads[0] is not threading.main_thread()
@@ -0,0 +1,54 @@
+"""
+Календари объектов (.ics): кэш по версии бронирований, ETag и 304, импорт
+"""
+import io
+from datetime import datetime
+
+import http_server
+import ical
+
+
+def get(path: str, headers: dict = None):
+    return http_server._resolve(path)(path, {}, headers or {})
+
+
+def test_feed_cached_until_bookings_change(storage):
+    storage.add_admin(1)
+    property_id = storage.add_property("Дом; у моря", 1)
+    storage.add_booking(property_id, 10, None, None, datetime(2030, 6, 1), datetime(2030, 6, 3))
+    cache = ical.CalendarCache(storage)
+
+    etag, body = cache.get_feed(property_id)
+    text = body.decode('utf-8')
+    assert 'X-WR-CALNAME:Дом\\; у моря' in text
+    # Дата окончания в iCalendar не входит в событие
+    assert 'DTSTART;VALUE=DATE:20300601' in text and 'DTEND;VALUE=DATE:20300604' in text
+    assert cache.get_feed(property_id)[1] is body
+
+    storage.add_booking(property_id, 11, None, None, datetime(2030, 7, 1), datetime(2030, 7, 1))
+    new_etag, new_body = cache.get_feed(property_id)
+    assert new_etag != etag and new_body.count(b'BEGIN:VEVENT') == 2
+    assert list(ical.read_events(io.StringIO(new_body.decode('utf-8')))) == [
+        (datetime(2030, 6, 1), datetime(2030, 6, 3)), (datetime(2030, 7, 1), datetime(2030, 7, 1))]
+
+
+def test_http_etag_and_not_modified(storage):
+    storage.add_admin(1)
+    property_id = storage.add_property("Дом", 1)
+    ical.register_http_route(ical.CalendarCache(storage))
+
+    status, headers, body = get(f'/ical/{property_id}.ics')
+    assert status == 200 and headers['Content-Type'].startswith('text/calendar')
+    etag = headers['ETag']
+    assert get(f'/ical/{property_id}.ics', {'If-None-Match': etag}) == (304, {'ETag': etag}, b'')
+
+    storage.add_booking(property_id, 10, None, None, datetime(2030, 6, 1), datetime(2030, 6, 3))
+    status, headers, _ = get(f'/ical/{property_id}.ics', {'If-None-Match': etag})
+    assert status == 200 and headers['ETag'] != etag
+    assert get('/ical/999.ics')[0] == 404
+
+
+def test_long_lines_folded():
+    line = ical._fold('SUMMARY:' + 'Дом' * 40)
+    assert all(len(part.encode('utf-8')) <= 75 for part in line.rstrip('\r\n').split('\r\n'))
+    assert list(ical._unfold(io.StringIO(line))) == ['SUMMARY:' + 'Дом' * 40]
@@ -0,0 +1,79 @@
+"""
+Встроенный поиск: ранжирование как у search_properties, кэш запросов и обновление каталога
+"""
+import inline_search
+
+
+def make_cache(storage, **kwargs):
+    cache = inline_search.InlineResultCache(storage, **kwargs)
+    loads = []
+    iter_properties = storage.iter_properties
+
+    def counting(*args, **kw):
+        loads.append(1)
+        return iter_properties(*args, **kw)
+
+    storage.iter_properties = counting
+    return cache, loads
+
+
+def test_ranking_matches_storage(storage):
+    storage.add_admin(1)
+    storage.add_property("Квартира", 1, "Вид на дом культуры")
+    storage.add_property("Гостевой дом", 1, "Дом у озера")
+    storage.add_property("Баня", 1, "Березовые веники")
+    cache, _ = make_cache(storage)
+    for text in ("дом", "Дом озер", "берёз", "пляж"):
+        assert cache.lookup(text) == [prop.id for prop in storage.search_properties(text)]
+    assert cache.lookup("") == sorted(prop.id for prop in storage.get_all_properties())
+
+
+def test_results_cached_until_invalidate(storage):
+    storage.add_admin(1)
+    house = storage.add_property("Дом", 1)
+    cache, loads = make_cache(storage)
+    first = cache.lookup("дом")
+    # Тот же нормализованный запрос берется из кэша без обращения к хранилищу
+    assert cache.lookup("  ДОМ ") is first
+    assert len(loads) == 1
+
+    cottage = storage.add_property("Домик", 1)
+    cache.invalidate(cottage)
+    assert cache.lookup("дом") == [house, cottage]
+    storage.delete_property(house)
+    cache.invalidate(house)
+    assert cache.lookup("дом") == [cottage]
+    assert len(loads) == 1 and len(cache) == 1
+
+    cache.invalidate()
+    assert cache.lookup("дом") == [cottage]
+    assert len(loads) == 2
+
+
+def test_query_cache_bounded(storage):
+    storage.add_admin(1)
+    storage.add_property("Дом", 1)
+    cache, _ = make_cache(storage, max_queries=2)
+    first = cache.lookup("д")
+    cache.lookup("до")
+    cache.lookup("дом")
+    assert cache.lookup("д") is not first
+    assert len(cache._results) == 2
+
+
+def test_page_and_articles(storage):
+    storage.add_admin(1)
+    for i in range(inline_search.PAGE_SIZE + 5):
+        storage.add_property(f"Домик {i}", 1, "Описание")
+    cache, _ = make_cache(storage)
+    articles, next_offset = cache.page("домик", 0, "house_bot")
+    assert len(articles) == inline_search.PAGE_SIZE and next_offset == str(inline_search.PAGE_SIZE)
+    assert "house_bot?start=property_" in articles[0].reply_markup.inline_keyboard[0][0].url
+    rest, next_offset = cache.page("домик", int(next_offset), "house_bot")
+    assert len(rest) == 5 and next_offset == ""
+
+    # Карточки строятся один раз и пересобираются при смене имени бота
+    again, _ = cache.page("домик", 0, "house_bot")
+    assert again[0] is articles[0]
+    renamed, _ = cache.page("домик", 0, "other_bot")
+    assert "other_bot" in renamed[0].reply_markup.inline_keyboard[0][0].url
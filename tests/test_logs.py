@@ -0,0 +1,85 @@
+"""
+Структурированное логирование: контекст записей, JSON-формат и вывод через очередь
+"""
+import asyncio
+import json
+import logging
+import queue
+from types import SimpleNamespace
+
+import pytest
+
+import logs
+import metrics
+
+
+def test_bind_nests_and_resets():
+    with logs.bind(handler='start', user_id=None):
+        assert logs.current() == {'handler': 'start'}
+        with logs.bind(db_method='get_property', handler='callback'):
+            assert logs.current() == {'handler': 'callback', 'db_method': 'get_property'}
+        assert logs.current() == {'handler': 'start'}
+    assert logs.current() == {}
+
+
+def test_queue_handler_captures_context():
+    records = queue.SimpleQueue()
+    handler = logs.ContextQueueHandler(records)
+    logger = logging.getLogger('test_logs.queue')
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        with logs.bind(handler='user_callback', update_id=7):
+            try:
+                raise ValueError("сбой")
+            except ValueError:
+                logger.exception("Ошибка %s", 'обработчика', extra={'property_id': 3})
+    finally:
+        logger.removeHandler(handler)
+        logger.propagate = True
+
+    # Запись в очереди уже не зависит от контекста и объектов вызова
+    record = records.get_nowait()
+    assert record.msg == "Ошибка обработчика" and record.args is None and record.exc_info is None
+    entry = json.loads(logs.JsonFormatter().format(record))
+    assert entry['message'] == "Ошибка обработчика" and entry['level'] == 'ERROR'
+    assert entry['handler'] == 'user_callback' and entry['update_id'] == 7 and entry['property_id'] == 3
+    assert 'ValueError: сбой' in entry['exception']
+
+
+def test_timed_handler_binds_update():
+    seen = []
+
+    async def callback(update, context):
+        seen.append(logs.current())
+
+    update = SimpleNamespace(update_id=42, effective_user=SimpleNamespace(id=5))
+    asyncio.run(metrics.timed_handler('callback', callback)(update, None))
+    assert seen == [{'handler': 'callback', 'update_id': 42, 'user_id': 5}]
+
+
+@pytest.fixture
+def root_logger():
+    root = logging.getLogger()
+    handlers, level = list(root.handlers), root.level
+    yield root
+    logs.shutdown()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for handler in handlers:
+        root.addHandler(handler)
+    root.setLevel(level)
+
+
+def test_setup_writes_json(root_logger, capsys):
+    logs.setup('INFO', json_format=True)
+    with logs.bind(db_method='add_booking'):
+        logging.getLogger('database').info("Медленный запрос", extra={'elapsed_ms': 120})
+    logging.getLogger('database').debug("Не выводится")
+    logs.shutdown()
+
+    lines = capsys.readouterr().err.splitlines()
+    assert len(lines) == 1
+    entry = json.loads(lines[0])
+    assert entry['logger'] == 'database' and entry['db_method'] == 'add_booking'
+    assert entry['elapsed_ms'] == 120
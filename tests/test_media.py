@@ -0,0 +1,88 @@
+"""
+Медиафайлы объектов (MediaLibrary): дубликаты, лимит и кэш списка файлов
+"""
+import config
+import media
+
+
+def test_add_many_counts(storage, monkeypatch):
+    monkeypatch.setattr(config, 'MAX_PHOTOS', 3)
+    storage.add_admin(1)
+    property_id = storage.add_property("Дом", 1)
+    library = media.MediaLibrary(storage)
+    library.add(property_id, media.PHOTO, 'f1', 'u1')
+
+    # Закэшированный список устарел: файл u2 добавлен в обход кэша
+    library.get_manifest(property_id)
+    storage.add_property_photo(property_id, 'f2', 'u2')
+
+    items = [('f1', 'u1'), ('f2', 'u2'), ('f3', 'u3'), ('f4', 'u4')]
+    assert library.add_many(property_id, media.PHOTO, items) == (1, 2, 1)
+    assert library.get_manifest(property_id).photo_ids == ['f1', 'f2', 'f3']
+
+
+def test_add_many_stale_manifest_at_limit(storage, monkeypatch):
+    monkeypatch.setattr(config, 'MAX_PHOTOS', 3)
+    storage.add_admin(1)
+    property_id = storage.add_property("Дом", 1)
+    library = media.MediaLibrary(storage)
+    library.add(property_id, media.PHOTO, 'f1', 'u1')
+
+    # Кэш видит одно фото, а лимит уже заполнен в обход кэша
+    library.get_manifest(property_id)
+    storage.add_property_photo(property_id, 'f2', 'u2')
+    storage.add_property_photo(property_id, 'f3', 'u3')
+
+    items = [('f4', 'u4'), ('f2', 'u2'), ('f5', None)]
+    assert library.add_many(property_id, media.PHOTO, items) == (0, 1, 2)
+
+
+class CountingStorage:
+    """Обертка хранилища, считающая чтения списка медиафайлов"""
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.reads = 0
+
+    def get_property_media(self, property_id):
+        self.reads += 1
+        return self.storage.get_property_media(property_id)
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+
+def test_add_single_file(storage, monkeypatch):
+    monkeypatch.setattr(config, 'MAX_VIDEOS', 2)
+    storage.add_admin(1)
+    property_id = storage.add_property("Дом", 1)
+    counting = CountingStorage(storage)
+    library = media.MediaLibrary(counting)
+
+    assert library.add(property_id, media.VIDEO, 'v1', 'u1') == media.ADDED
+    assert library.add(property_id, media.VIDEO, 'v1-again', 'u1') == media.DUPLICATE
+    assert library.add(property_id, media.VIDEO, 'v2', 'u2') == media.ADDED
+    assert library.add(property_id, media.VIDEO, 'v3', 'u3') == media.LIMIT_REACHED
+    # Файл, добавленный в обход кэша, распознается как дубликат, а не как превышение лимита
+    assert library.delete(property_id, media.VIDEO, 'v2')
+    assert library.get_manifest(property_id).video_ids == ['v1']
+    storage.add_property_video(property_id, 'v2', 'u2')
+    assert library.add(property_id, media.VIDEO, 'v2-again', 'u2') == media.DUPLICATE
+    assert library.add(property_id, media.VIDEO, 'v4', 'u4') == media.LIMIT_REACHED
+
+
+def test_manifest_cached_until_change(storage):
+    storage.add_admin(1)
+    property_id = storage.add_property("Дом", 1)
+    counting = CountingStorage(storage)
+    library = media.MediaLibrary(counting)
+
+    library.add(property_id, media.PHOTO, 'p1', 'u1')
+    reads = counting.reads
+    for _ in range(3):
+        assert library.get_manifest(property_id).photo_ids == ['p1']
+    assert counting.reads == reads + 1
+
+    assert library.delete(property_id, media.PHOTO, 'p1')
+    assert library.get_manifest(property_id).photo_ids == []
+    assert counting.reads == reads + 2
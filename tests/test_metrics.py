@@ -0,0 +1,59 @@
+"""
+Метрики: формат Prometheus, замер обработчиков и методов Database
+"""
+import asyncio
+
+import pytest
+
+import metrics
+from database import Database
+
+
+def test_histogram_render():
+    registry = metrics.MetricsRegistry()
+    histogram = registry.histogram('test_seconds', 'Тест', ['name'], buckets=(0.1, 1.0))
+    histogram.observe(0.05, name='a"b')
+    histogram.observe(0.5, name='a"b')
+    histogram.observe(5, name='a"b')
+    lines = registry.render().splitlines()
+    assert lines[:2] == ['# HELP test_seconds Тест', '# TYPE test_seconds histogram']
+    assert lines[2:] == [
+        'test_seconds_bucket{name="a\\"b",le="0.1"} 1',
+        'test_seconds_bucket{name="a\\"b",le="1"} 2',
+        'test_seconds_bucket{name="a\\"b",le="+Inf"} 3',
+        'test_seconds_sum{name="a\\"b"} 5.55',
+        'test_seconds_count{name="a\\"b"} 3',
+    ]
+
+
+def test_gauge_function_and_counter():
+    registry = metrics.MetricsRegistry()
+    gauge = registry.gauge('test_depth', 'Глубина')
+    gauge.set_function(lambda: 7)
+    counter = registry.counter('test_total', 'Счетчик', ['kind'])
+    counter.inc(kind='x')
+    counter.inc(2, kind='x')
+    assert gauge.get() == 7 and counter.get(kind='x') == 3
+    assert 'test_depth 7' in registry.render()
+    assert 'test_total{kind="x"} 3' in registry.render()
+
+
+def test_database_methods_counted(tmp_path):
+    db = Database(str(tmp_path / 'test.db'))
+    calls = metrics.DB_CALLS.get(method='get_property')
+    observed = metrics.DB_DURATION.count(method='iter_properties')
+    db.get_property(1)
+    list(db.iter_properties())
+    assert metrics.DB_CALLS.get(method='get_property') == calls + 1
+    assert metrics.DB_DURATION.count(method='iter_properties') == observed + 1
+
+
+def test_timed_handler_counts_errors():
+    async def failing(update, context):
+        raise RuntimeError("сбой")
+
+    handler = metrics.timed_handler('test_failing', failing)
+    with pytest.raises(RuntimeError):
+        asyncio.run(handler(None, None))
+    assert metrics.HANDLER_ERRORS.get(handler='test_failing') == 1
+    assert metrics.HANDLER_DURATION.count(handler='test_failing') == 1
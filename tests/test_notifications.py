@@ -0,0 +1,58 @@
+"""
+Адресная рассылка уведомлений: владелец объекта, наблюдатели и объекты без владельца
+"""
+import asyncio
+
+import config
+import notifications
+
+
+def test_route_to_owners_and_watchers(storage, monkeypatch):
+    monkeypatch.setattr(config, 'SUPER_ADMIN_IDS', frozenset({100}))
+    monkeypatch.setattr(config, 'NOTIFY_WATCHER_IDS', frozenset({200}))
+    for user_id in (1, 2, 3, 4):
+        storage.add_admin(user_id)
+    house = storage.add_property("Дом", 1)
+    cottage = storage.add_property("Дача", 2)
+    silent = storage.add_property("Сарай", 3)
+    orphan = storage.add_property("Без владельца", None)
+    storage.set_admin_notifications(3, notifications.OFF)
+    storage.set_admin_notifications(4, notifications.ALL)
+
+    recipients = notifications.route(storage, [house, cottage, silent, orphan, house])
+    assert recipients == {
+        1: {house},
+        2: {cottage},
+        100: {orphan},
+        200: {house, cottage, silent, orphan},
+        4: {house, cottage, silent, orphan},
+    }
+
+
+def test_route_merges_owner_and_watcher(storage, monkeypatch):
+    monkeypatch.setattr(config, 'NOTIFY_WATCHER_IDS', frozenset({1}))
+    storage.add_admin(1)
+    storage.add_admin(2)
+    house = storage.add_property("Дом", 1)
+    cottage = storage.add_property("Дача", 2)
+    # Владелец-наблюдатель получает одно уведомление обо всем заказе
+    assert notifications.route(storage, [house, cottage]) == {1: {house, cottage}, 2: {cottage}}
+
+
+class FakeBot:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, rate_limit_args=None):
+        if chat_id in self.fail:
+            raise RuntimeError("чат недоступен")
+        self.sent.append((chat_id, text, rate_limit_args))
+
+
+def test_send_reports_failure():
+    bot = FakeBot(fail={2})
+    assert asyncio.run(notifications.send(bot, 1, "Новое бронирование"))
+    assert not asyncio.run(notifications.send(bot, 2, "Новое бронирование"))
+    assert [chat_id for chat_id, _, _ in bot.sent] == [1]
+    assert bot.sent[0][2] is not None
@@ -0,0 +1,63 @@
+"""
+Планировщик исходящих запросов: порядок приоритетов и лимит чата
+"""
+import asyncio
+
+import outbound
+
+
+def send_all(limiter, requests, cancel=()):
+    """Отправить запросы (chat_id, приоритет, метка) одновременно, вернуть порядок отправки"""
+    order = []
+
+    async def callback(label):
+        order.append(label)
+
+    async def main():
+        await limiter.initialize()
+        tasks = [
+            asyncio.create_task(limiter.process_request(
+                callback, (label,), {}, 'sendMessage', {'chat_id': chat_id},
+                outbound.priority_args(priority)))
+            for chat_id, priority, label in requests
+        ]
+        await asyncio.sleep(0)
+        for index in cancel:
+            tasks[index].cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        assert limiter.depth() == 0
+        await limiter.shutdown()
+
+    asyncio.run(main())
+    return order
+
+
+def test_priority_order():
+    limiter = outbound.PrioritizedRateLimiter(global_rate=0, chat_rate=0)
+    order = send_all(limiter, [
+        (1, outbound.BULK, 'bulk'),
+        (2, outbound.NOTIFICATION, 'notification'),
+        (3, outbound.INTERACTIVE, 'interactive'),
+        (1, outbound.INTERACTIVE, 'interactive-1'),
+    ])
+    assert order == ['interactive', 'interactive-1', 'notification', 'bulk']
+
+
+def test_blocked_chat_does_not_hold_others():
+    limiter = outbound.PrioritizedRateLimiter(global_rate=0, chat_rate=20, chat_burst=1)
+    order = send_all(limiter, [
+        (1, outbound.INTERACTIVE, 'a1'),
+        (1, outbound.INTERACTIVE, 'a2'),
+        (2, outbound.BULK, 'b1'),
+    ])
+    assert order == ['a1', 'b1', 'a2']
+
+
+def test_cancelled_requests_are_skipped():
+    limiter = outbound.PrioritizedRateLimiter(global_rate=0, chat_rate=0)
+    order = send_all(limiter, [
+        (1, outbound.INTERACTIVE, 'a1'),
+        (2, outbound.INTERACTIVE, 'b1'),
+        (1, outbound.BULK, 'a2'),
+    ], cancel=[1])
+    assert order == ['a1', 'a2']
@@ -0,0 +1,36 @@
+"""
+Трассировка SQL-запросов: статистика, медленные запросы и планы
+"""
+import query_trace
+from database import Database
+
+
+def test_normalize_and_params_shape():
+    assert query_trace.normalize_sql("SELECT *\n    FROM t\n  WHERE id = ?") == "SELECT * FROM t WHERE id = ?"
+    assert query_trace.params_shape((1, 'a', None)) == '(int, str, NoneType)'
+    assert query_trace.params_shape({'id': 1}) == '{id: int}'
+
+
+def test_tracing_collects_stats_and_plans(tmp_path, monkeypatch):
+    monkeypatch.setattr(query_trace.TRACER, 'slow_threshold', 0.0)
+    db = Database(str(tmp_path / 'test.db'))
+    db.add_admin(1)
+    property_id = db.add_property("Дом", 1)
+    db.set_tracing(True)
+    db.reset_query_stats()
+
+    for _ in range(3):
+        db.get_property(property_id)
+    stats = [item for item in db.get_query_stats(50) if item.sql.startswith('SELECT') and 'FROM properties' in item.sql]
+    assert stats and stats[0].calls == 3 and stats[0].rows == 3
+    assert stats[0].slow_calls == 3 and stats[0].plan
+    assert stats[0].params_shape == '(int)'
+    assert any('SEARCH properties' in line for line in stats[0].plan)
+
+    report = query_trace.format_report(stats)
+    assert 'FROM properties' in report and 'план:' in report
+
+    db.set_tracing(False)
+    db.reset_query_stats()
+    db.get_property(property_id)
+    assert db.get_query_stats() == []
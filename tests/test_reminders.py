@@ -0,0 +1,45 @@
+"""
+Напоминания о заезде: отметка отправленных и повтор после ошибки
+"""
+import asyncio
+from datetime import datetime
+
+import config
+import reminders
+
+
+class FakeBot:
+    """Бот, у которого отправка выбранным получателям завершается ошибкой"""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        if chat_id in self.failing:
+            raise RuntimeError("Forbidden: bot was blocked by the user")
+        self.sent.append(chat_id)
+
+
+def run(bot, storage):
+    sender = reminders.RateLimitedSender(0)
+    return asyncio.run(reminders.send_checkin_reminders(bot, storage, sender, now=datetime(2030, 6, 1)))
+
+
+def test_failed_guest_send_is_retried(storage, monkeypatch):
+    monkeypatch.setattr(config, 'REMINDER_DAYS_AHEAD', 7)
+    storage.add_admin(1)
+    property_id = storage.add_property("Дом", 1)
+    storage.add_booking(property_id, 10, None, None, datetime(2030, 6, 2), datetime(2030, 6, 4))
+    storage.add_booking(property_id, 11, None, None, datetime(2030, 6, 5), datetime(2030, 6, 6))
+    storage.add_booking(property_id, 12, None, None, datetime(2030, 6, 1), datetime(2030, 6, 1))
+
+    bot = FakeBot(failing={11})
+    assert run(bot, storage) == 2
+    # Владелец получает напоминание только по отмеченным бронированиям
+    assert sorted(bot.sent) == [1, 1, 10, 12]
+
+    bot = FakeBot()
+    assert run(bot, storage) == 1
+    assert bot.sent == [11, 1]
+    assert run(FakeBot(), storage) == 0
@@ -0,0 +1,56 @@
+"""
+Полнотекстовый поиск объектов: разбор запроса и ранжирование в обоих хранилищах
+"""
+import search
+
+
+def test_query_terms():
+    assert search.query_terms("Ёлки  у озера, ЁЛКИ!") == ["елки", "у", "озера"]
+    assert search.query_terms("Café") == ["cafe"]
+    assert search.query_terms('дом OR "баня" NEAR*') == ["дом", "or", "баня", "near"]
+    assert len(search.query_terms(" ".join(f"слово{i}" for i in range(20)))) == search.MAX_TERMS
+    assert search.match_expression(["дом", "баня"]) == '"дом"* "баня"*'
+
+
+def names(props):
+    return [prop.name for prop in props]
+
+
+def test_name_match_ranks_first(storage):
+    storage.add_admin(1)
+    storage.add_property("Гостевой дом", 1, "Уютный, рядом лес")
+    storage.add_property("Квартира", 1, "Вид на дом культуры и озеро")
+    storage.add_property("Баня", 1, "Березовые веники")
+    assert names(storage.search_properties("дом")) == ["Гостевой дом", "Квартира"]
+    # Поиск по префиксу и без учета "ё"
+    assert names(storage.search_properties("берёз")) == ["Баня"]
+    assert names(storage.search_properties("гост")) == ["Гостевой дом"]
+
+
+def test_all_terms_required(storage):
+    storage.add_admin(1)
+    storage.add_property("Дом у озера", 1)
+    storage.add_property("Дом в лесу", 1)
+    assert names(storage.search_properties("дом озер")) == ["Дом у озера"]
+    assert storage.search_properties("дом пляж") == []
+    assert storage.search_properties("  !!  ") == []
+
+
+def test_limit_offset(storage):
+    storage.add_admin(1)
+    for i in range(5):
+        storage.add_property(f"Домик {i}", 1)
+    first = storage.search_properties("домик", limit=2)
+    rest = storage.search_properties("домик", limit=10, offset=2)
+    assert len(first) == 2 and len(rest) == 3
+    assert not {prop.id for prop in first} & {prop.id for prop in rest}
+
+
+def test_index_follows_changes(storage):
+    storage.add_admin(1)
+    pid = storage.add_property("Коттедж", 1, "Камин")
+    assert storage.update_property_description(pid, "Сауна и бассейн")
+    assert storage.search_properties("камин") == []
+    assert names(storage.search_properties("сауна")) == ["Коттедж"]
+    assert storage.delete_property(pid)
+    assert storage.search_properties("коттедж") == []
@@ -0,0 +1,52 @@
+"""
+Быстрый запуск: однократная проверка схемы, отложенные импорты, замер этапов
+"""
+import os
+import sqlite3
+import subprocess
+import sys
+
+import database
+import startup
+from database import Database
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_schema_bootstrap_runs_once(tmp_path, monkeypatch):
+    path = str(tmp_path / 'test.db')
+    Database(path)
+
+    statements = []
+    connect = sqlite3.connect
+
+    def traced_connect(*args, **kwargs):
+        conn = connect(*args, **kwargs)
+        conn.set_trace_callback(statements.append)
+        return conn
+
+    monkeypatch.setattr(database.sqlite3, 'connect', traced_connect)
+    # Тот же процесс: файл уже проверен, БД не открывается
+    Database(path)
+    assert statements == []
+    # Новый процесс: только чтение версии схемы, без DDL
+    database._checked_schemas.discard(path)
+    Database(path)
+    assert [s for s in statements if s not in ('BEGIN', 'COMMIT')] == ['PRAGMA user_version']
+
+
+def test_missing_token_skips_telegram_import(tmp_path):
+    env = dict(os.environ, BOT_TOKEN='', PYTHONPATH=ROOT)
+    code = "import sys, bot; bot.main(); print('telegram' in sys.modules, 'database' in sys.modules)"
+    result = subprocess.run([sys.executable, '-c', code], cwd=tmp_path, env=env,
+                            capture_output=True, text=True, timeout=60)
+    assert result.stdout.split() == ['False', 'False']
+
+
+def test_phase_timing():
+    with startup.phase('test_phase'):
+        pass
+    with startup.phase('test_phase'):
+        pass
+    assert startup.STARTUP_PHASE_SECONDS.get(phase='test_phase') >= 0
+    assert 'test_phase' in startup.report()
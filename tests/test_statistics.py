@@ -0,0 +1,81 @@
+"""
+Счетчики статистики (property_stats): триггеры, пересчет и согласованность с аналитикой загрузки
+"""
+import sqlite3
+from datetime import date, datetime
+
+import analytics
+import database
+from database import Database
+
+
+def day(value: str) -> datetime:
+    return datetime.strptime(value, '%d.%m.%Y')
+
+
+BOOKINGS = [
+    ('30.01.2030', '02.02.2030'),   # через границу месяцев: 4 ночи
+    ('10.02.2030', '10.02.2030'),   # один день: 1 ночь
+    ('20.02.2030', '25.02.2030'),
+]
+
+
+def test_statistics_match_occupancy(storage):
+    storage.add_admin(1)
+    first = storage.add_property("Дом", 1)
+    second = storage.add_property("Дача", 1)
+    for start, end in BOOKINGS:
+        storage.add_booking(first, 10, None, None, day(start), day(end))
+    storage.add_booking(second, 11, None, None, day('01.03.2030'), day('03.03.2030'))
+    storage.archive_bookings(day('05.02.2030'))
+
+    report = analytics.compute_occupancy(storage, date(2030, 1, 1), date(2030, 12, 31))
+    occupancy = {row['property_id']: row['booked_nights'] for row in report.totals()}
+    stats = {row['property_id']: row['booked_nights'] for row in storage.get_booking_statistics()}
+    assert stats == occupancy == {first: 4 + 1 + 6, second: 3}
+
+
+def test_upgrade_recounts_nights(tmp_path):
+    path = str(tmp_path / 'old.db')
+    db = Database(path)
+    db.add_admin(1)
+    property_id = db.add_property("Дом", 1)
+    db.add_booking(property_id, 10, None, None, day('01.06.2030'), day('03.06.2030'))
+
+    # База версии 6: счетчики по старой формуле (end_date - start_date)
+    with sqlite3.connect(path) as conn:
+        conn.execute('UPDATE property_stats SET booked_nights = 2')
+        conn.execute('PRAGMA user_version = 6')
+    database._checked_schemas.discard(path)
+
+    db = Database(path)
+    assert db.get_booking_statistics()[0]['booked_nights'] == 3
+    # Триггеры пересозданы с новой формулой
+    db.add_booking(property_id, 10, None, None, day('10.06.2030'), day('10.06.2030'))
+    assert db.get_booking_statistics()[0]['booked_nights'] == 4
+
+
+def test_triggers_follow_every_change(tmp_path):
+    path = str(tmp_path / 'stats.db')
+    db = Database(path)
+    db.add_admin(1)
+    property_id = db.add_property("Дом", 1)
+    kept = db.add_booking(property_id, 10, None, None, day('01.06.2030'), day('03.06.2030'))
+    removed = db.add_booking(property_id, 11, None, None, day('10.06.2030'), day('12.06.2030'))
+    db.add_booking(property_id, 12, None, None, day('01.01.2030'), day('02.01.2030'))
+    db.bulk_add_bookings([{'property_id': property_id, 'user_id': 13, 'start_date': day('01.08.2030'),
+                           'end_date': day('01.08.2030'), 'advance_paid': True}])
+    db.set_advance_paid(kept, True)
+    db.delete_booking(removed, 11)
+    db.archive_bookings(day('01.03.2030'))
+    # Изменение дат в обход методов тоже учитывается триггером
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE bookings SET end_date = '2030-06-05' WHERE id = ?", (kept,))
+
+    def counters():
+        return [(row['bookings_count'], row['paid_count'], row['booked_nights'])
+                for row in db.get_booking_statistics()]
+
+    assert counters() == [(3, 2, 5 + 2 + 1)]
+    assert db.rebuild_property_stats()
+    assert counters() == [(3, 2, 8)]
@@ -0,0 +1,291 @@
+"""
+Общие проверки реализаций Storage: обе (SQLite и в памяти) должны вести себя одинаково
+"""
+from datetime import date, datetime, timedelta
+
+import config
+
+
+def day(value: str) -> datetime:
+    return datetime.strptime(value, '%d.%m.%Y')
+
+
+def add_owner_with_property(storage, owner: int = 1, name: str = "Дом") -> int:
+    storage.add_admin(owner)
+    return storage.add_property(name, owner)
+
+
+def test_ping(storage):
+    assert storage.ping()
+
+
+def test_admins(storage):
+    assert storage.add_admin(1, phone='+79990000000')
+    assert storage.add_admin(2, telegram_username='owner2')
+    assert storage.update_admin_contacts(1, telegram_username='owner1')
+    admin = storage.get_admin(1)
+    assert (admin.phone, admin.telegram_username) == ('+79990000000', 'owner1')
+    assert storage.get_admin(99) is None
+    assert sorted(admin.user_id for admin in storage.get_all_admins()) == [1, 2]
+
+    assert storage.set_admin_notifications(2, 'all')
+    assert not storage.set_admin_notifications(99, 'all')
+    assert storage.get_watching_admins() == [2]
+
+    property_id = storage.add_property("Дом", 1)
+    owners = storage.get_property_owners([property_id, 999])
+    assert owners == {property_id: (1, 'own')}
+
+
+def test_property_crud(storage):
+    storage.add_admin(1)
+    storage.add_admin(2)
+    first = storage.add_property("Дом у моря", 1, "Вид на море")
+    second = storage.add_property("Дача", 2)
+    assert first and second and first != second
+
+    prop = storage.get_property(first)
+    assert (prop.name, prop.description, prop.admin_id) == ("Дом у моря", "Вид на море", 1)
+    assert [p.id for p in storage.get_all_properties()] == [first, second]
+    assert [p.id for p in storage.get_admin_properties(2)] == [second]
+    assert [row['id'] for row in storage.iter_properties()] == [first, second]
+
+    assert storage.update_property_description(second, "С баней")
+    assert storage.get_property(second).description == "С баней"
+
+    storage.add_property_photo(first, 'photo', 'photo-unique')
+    booking_id = storage.add_booking(first, 10, 'guest', None, day('01.06.2030'), day('03.06.2030'))
+    assert storage.delete_property(first)
+    assert storage.get_property(first) is None
+    assert storage.get_booking(booking_id) is None
+    assert storage.get_property_photos(first) == []
+    assert storage.get_calendar_state(first) is None
+    assert [p.id for p in storage.get_all_properties()] == [second]
+
+
+def test_search_properties(storage):
+    storage.add_admin(1)
+    house = storage.add_property("Домик у моря", 1, "Уютный дом")
+    firs = storage.add_property("Ёлки", 1, "Лесной домик")
+    storage.add_property("Квартира", 1, "Центр города")
+
+    assert [p.id for p in storage.search_properties("домик")] == [house, firs]
+    assert [p.id for p in storage.search_properties("ЕЛКИ")] == [firs]
+    assert [p.id for p in storage.search_properties("дом", limit=1, offset=1)] == [firs]
+    assert storage.search_properties('"x" OR') == []
+    assert storage.search_properties("") == []
+
+
+def test_media_limits_and_duplicates(storage):
+    property_id = add_owner_with_property(storage)
+    for index in range(config.MAX_PHOTOS + 2):
+        storage.add_property_photo(property_id, f'photo-{index}', f'unique-{index}')
+    assert len(storage.get_property_photos(property_id)) == config.MAX_PHOTOS
+
+    # Тот же файл (file_unique_id) второй раз не добавляется
+    video = storage.add_property_video(property_id, 'video-a', 'video-unique')
+    duplicate = storage.add_property_video(property_id, 'video-b', 'video-unique')
+    assert (video, duplicate) == (True, False)
+    assert storage.get_property_videos(property_id) == ['video-a']
+
+    assert storage.delete_property_photo(property_id, 'photo-0')
+    assert storage.delete_property_video(property_id, 'video-a')
+    assert 'photo-0' not in storage.get_property_photos(property_id)
+    assert storage.get_property_videos(property_id) == []
+
+    added, duplicates = storage.add_property_media_batch(
+        property_id, 'video', [('v1', 'u1'), ('v1-again', 'u1'), ('v2', 'u2'), ('v3', 'u3')])
+    assert (added, duplicates) == (config.MAX_VIDEOS, 1)
+    photos, videos = storage.get_property_media(property_id)
+    assert len(photos) == config.MAX_PHOTOS - 1
+    assert [video.file_id for video in videos] == ['v1', 'v2'][:config.MAX_VIDEOS]
+
+
+def test_booking_overlap_rejected(storage):
+    property_id = add_owner_with_property(storage)
+    booking_id = storage.add_booking(property_id, 10, 'guest', '+7', day('10.06.2030'), day('12.06.2030'))
+
+    # Дата выезда - последний день проживания: пересечение включает границы
+    assert not storage.check_date_availability(property_id, day('12.06.2030'), day('14.06.2030'))
+    assert not storage.check_date_availability(property_id, day('08.06.2030'), day('10.06.2030'))
+    assert not storage.check_date_availability(property_id, day('01.06.2030'), day('30.06.2030'))
+    assert storage.check_date_availability(property_id, day('13.06.2030'), day('15.06.2030'))
+    assert storage.check_date_availability(property_id, day('10.06.2030'), day('12.06.2030'),
+                                           exclude_booking_id=booking_id)
+
+    inserted, rejected = storage.bulk_add_bookings([
+        {'property_id': property_id, 'user_id': 11, 'start_date': day('11.06.2030'), 'end_date': day('13.06.2030')},
+        {'property_id': property_id, 'user_id': 11, 'start_date': day('20.06.2030'), 'end_date': day('21.06.2030')},
+        {'property_id': property_id, 'user_id': 12, 'start_date': day('21.06.2030'), 'end_date': day('22.06.2030')},
+        {'property_id': 999, 'user_id': 12, 'start_date': day('01.07.2030'), 'end_date': day('02.07.2030')},
+        {'property_id': property_id, 'user_id': 12, 'start_date': day('05.07.2030'), 'end_date': day('04.07.2030')},
+    ], chunk_size=2)
+    assert inserted == 1
+    assert [row['start_date'] for row, _ in rejected] == [
+        day('11.06.2030'), day('21.06.2030'), day('01.07.2030'), day('05.07.2030')]
+    assert len(storage.get_property_bookings(property_id)) == 2
+
+
+def test_add_bookings_batch_all_or_nothing(storage):
+    first = add_owner_with_property(storage)
+    second = storage.add_property("Дача", 1)
+    storage.add_booking(second, 10, None, None, day('05.06.2030'), day('06.06.2030'))
+
+    ids, conflicts = storage.add_bookings_batch(20, 'guest', '+7', [
+        (first, day('01.06.2030'), day('03.06.2030')),
+        (second, day('06.06.2030'), day('08.06.2030')),
+    ])
+    assert ids == []
+    assert [item[0] for item, _ in conflicts] == [second]
+    assert storage.get_user_bookings(20) == []
+
+    ids, conflicts = storage.add_bookings_batch(20, 'guest', '+7', [
+        (first, day('01.06.2030'), day('03.06.2030')),
+        (first, day('03.06.2030'), day('04.06.2030')),
+    ])
+    assert ids == [] and len(conflicts) == 1
+
+    ids, conflicts = storage.add_bookings_batch(20, 'guest', '+7', [
+        (first, day('01.06.2030'), day('03.06.2030')),
+        (second, day('07.06.2030'), day('08.06.2030')),
+    ])
+    assert conflicts == [] and len(ids) == 2
+    assert [booking.id for booking in storage.get_user_bookings(20)] == ids
+
+
+def test_booking_queries_and_changes(storage):
+    property_id = add_owner_with_property(storage)
+    later = storage.add_booking(property_id, 10, 'guest', None, day('10.07.2030'), day('12.07.2030'))
+    earlier = storage.add_booking(property_id, 11, None, '+7', day('01.07.2030'), day('02.07.2030'))
+
+    booking = storage.get_booking(later)
+    assert (booking.property_id, booking.user_id, booking.start_date, booking.end_date) == (
+        property_id, 10, day('10.07.2030'), day('12.07.2030'))
+    assert [b.id for b in storage.get_property_bookings(property_id)] == [earlier, later]
+    assert [b.id for b in storage.iter_property_bookings(property_id, batch_size=1)] == [earlier, later]
+    assert [b.id for b, name in storage.get_admin_bookings(1)] == [earlier, later]
+    assert [b.id for b, name in storage.get_admin_bookings(None, limit=1)] == [earlier]
+    assert storage.get_admin_bookings(2) == []
+
+    name, version = storage.get_calendar_state(property_id)
+    assert name == "Дом"
+    assert not storage.delete_booking(later, 11)
+    assert storage.delete_booking(later, 10)
+    assert storage.get_booking(later) is None
+    assert storage.get_calendar_state(property_id)[1] != version
+
+    assert storage.set_advance_paid(earlier, True)
+    assert storage.get_booking(earlier).advance_paid
+
+
+def test_holds(storage):
+    property_id = add_owner_with_property(storage)
+    now = datetime(2030, 1, 1, 12, 0)
+    expiring = storage.add_booking(property_id, 10, None, None, day('01.06.2030'), day('02.06.2030'),
+                                   expires_at=now - timedelta(minutes=1))
+    paid = storage.add_booking(property_id, 11, None, None, day('03.06.2030'), day('04.06.2030'),
+                               expires_at=now - timedelta(minutes=1))
+    storage.set_advance_paid(paid, True)
+    future = storage.add_booking(property_id, 12, None, None, day('05.06.2030'), day('06.06.2030'),
+                                 expires_at=now + timedelta(hours=1))
+    permanent = storage.add_booking(property_id, 13, None, None, day('07.06.2030'), day('08.06.2030'))
+
+    released = storage.release_expired_holds(now, batch_size=1)
+    assert [booking.id for booking in released] == [expiring]
+    assert storage.get_booking(expiring) is None
+    assert storage.check_date_availability(property_id, day('01.06.2030'), day('02.06.2030'))
+
+    released = storage.release_expired_holds(now + timedelta(hours=2))
+    assert [booking.id for booking in released] == [future]
+    assert storage.get_booking(paid) is not None
+    assert storage.get_booking(permanent) is not None
+
+
+def test_archive(storage):
+    property_id = add_owner_with_property(storage)
+    old = storage.add_booking(property_id, 10, None, None, day('01.01.2030'), day('03.01.2030'))
+    current = storage.add_booking(property_id, 10, None, None, day('01.03.2030'), day('02.03.2030'))
+
+    assert storage.archive_bookings(day('01.02.2030'), batch_size=1) == 1
+    assert storage.archive_bookings(day('01.02.2030')) == 0
+    assert [b.id for b in storage.get_property_bookings(property_id)] == [current]
+    assert [b.id for b in storage.get_user_bookings(10)] == [current]
+    assert storage.get_booking(old) is None
+    assert [row['id'] for row in storage.iter_bookings()] == [current]
+    assert [row['id'] for row in storage.iter_bookings(include_archive=True)] == [old, current]
+    # Статистика и выгрузка учитывают архив
+    assert storage.get_booking_statistics()[0]['bookings_count'] == 2
+    spans = storage.get_booking_day_spans(day('01.01.2030'), day('31.03.2030'))
+    assert sorted(span[:3] for span in spans) == [
+        (property_id, 21915, 21917), (property_id, 21974, 21975)]
+
+
+def test_statistics(storage):
+    first = add_owner_with_property(storage, owner=1)
+    second = add_owner_with_property(storage, owner=2, name="Дача")
+    paid = storage.add_booking(first, 10, None, None, day('01.06.2030'), day('03.06.2030'))
+    storage.add_booking(first, 11, None, None, day('10.06.2030'), day('10.06.2030'))
+    storage.add_booking(second, 12, None, None, day('30.01.2030'), day('02.02.2030'))
+    storage.set_advance_paid(paid, True)
+
+    def summary(admin_id=None):
+        return {row['property_id']: (row['bookings_count'], row['paid_count'], row['booked_nights'])
+                for row in storage.get_booking_statistics(admin_id)}
+
+    # Дата выезда - последний день проживания: 01.06-03.06 - три ночи, 10.06-10.06 - одна
+    expected = {first: (2, 1, 4), second: (1, 0, 4)}
+    assert summary() == expected
+    assert summary(2) == {second: expected[second]}
+    assert storage.rebuild_property_stats()
+    assert summary() == expected
+
+
+def test_reminders(storage):
+    property_id = add_owner_with_property(storage)
+    due = storage.add_booking(property_id, 10, None, None, day('02.06.2030'), day('04.06.2030'))
+    storage.add_booking(property_id, 11, None, None, day('10.06.2030'), day('11.06.2030'))
+
+    found = storage.get_bookings_due_for_reminder(day('01.06.2030'), day('03.06.2030'), 'checkin')
+    assert [(booking.id, name, owner) for booking, name, owner in found] == [(due, "Дом", 1)]
+    assert storage.mark_reminders_sent([due], 'checkin')
+    assert storage.get_bookings_due_for_reminder(day('01.06.2030'), day('03.06.2030'), 'checkin') == []
+    assert len(storage.get_bookings_due_for_reminder(day('01.06.2030'), day('03.06.2030'), 'owner')) == 1
+
+
+def test_bulk_add_properties(storage):
+    storage.add_admin(1)
+    existing = storage.add_property("Дом", 1)
+    inserted = storage.bulk_add_properties([
+        {'id': None, 'name': "Новый", 'admin_id': 1},
+        {'id': existing, 'name': "Повтор", 'admin_id': 1},
+        {'id': 50, 'name': "С номером", 'description': "Описание", 'admin_id': 1},
+    ], chunk_size=2)
+    assert inserted == 2
+    assert storage.get_property(existing).name == "Дом"
+    assert storage.get_property(50).description == "Описание"
+    assert storage.add_property("После импорта", 1) > 50
+
+
+def test_iter_owner_scope(storage):
+    storage.add_admin(1)
+    storage.add_admin(2)
+    own = storage.add_property("Мой дом", 1)
+    other = storage.add_property("Чужой дом", 2)
+    old = storage.add_booking(own, 10, None, None, day('01.01.2030'), day('03.01.2030'))
+    current = storage.add_booking(own, 10, None, None, day('01.06.2030'), day('03.06.2030'))
+    storage.add_booking(other, 11, None, None, day('01.06.2030'), day('03.06.2030'))
+    storage.archive_bookings(day('01.03.2030'))
+
+    assert [row['id'] for row in storage.iter_properties(admin_id=1)] == [own]
+    assert [row['id'] for row in storage.iter_bookings(admin_id=1)] == [current]
+    assert [row['id'] for row in storage.iter_bookings(include_archive=True, admin_id=1)] == [old, current]
+    assert list(storage.iter_bookings(include_archive=True, admin_id=3)) == []
+
+
+def test_add_bookings_batch_rejects_past_dates(storage):
+    property_id = add_owner_with_property(storage)
+    yesterday = datetime.combine(date.today() - timedelta(days=1), datetime.min.time())
+    ids, conflicts = storage.add_bookings_batch(20, 'guest', None, [
+        (property_id, yesterday, yesterday + timedelta(days=2)),
+    ])
+    assert ids == [] and conflicts[0][1] == 'дата заезда уже прошла'
@@ -0,0 +1,31 @@
+"""
+Ограничение частоты входящих обновлений (InboundThrottle)
+"""
+import throttle
+
+
+def test_global_limit_keeps_user_tokens(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(throttle.time, 'monotonic', lambda: now[0])
+    limiter = throttle.InboundThrottle(user_rate=0.1, user_burst=3, global_rate=1, global_burst=1,
+                                       coalesce_seconds=0)
+
+    assert limiter.check(1)[0] == throttle.ALLOWED
+    # Общая корзина пуста: обновления отброшены, токены пользователя не списаны
+    assert limiter.check(1)[0] == throttle.DROPPED
+    assert limiter.check(1)[0] == throttle.DROPPED
+    for _ in range(2):
+        now[0] += 1
+        assert limiter.check(1)[0] == throttle.ALLOWED
+
+
+def test_user_limit_keeps_global_tokens(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(throttle.time, 'monotonic', lambda: now[0])
+    limiter = throttle.InboundThrottle(user_rate=1, user_burst=1, global_rate=1, global_burst=2,
+                                       coalesce_seconds=0)
+
+    assert limiter.check(1)[0] == throttle.ALLOWED
+    # Превышение лимита одним пользователем не расходует общий лимит
+    assert limiter.check(1)[0] == throttle.DROPPED
+    assert limiter.check(2)[0] == throttle.ALLOWED
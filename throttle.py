@@ -0,0 +1,181 @@
+"""
+Ограничение частоты входящих обновлений: token bucket на пользователя и общий
+"""
+import logging
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from telegram import Update
+from telegram.ext import Application, ApplicationHandlerStop, ContextTypes, TypeHandler
+
+import config
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Результаты проверки обновления
+ALLOWED = 'allowed'
+COALESCED = 'coalesced'
+DROPPED = 'dropped'
+
+THROTTLE_UPDATES = metrics.REGISTRY.counter(
+    'housereserv_throttle_updates_total', 'Входящие обновления по результату ограничения частоты', ['result'])
+THROTTLE_NOTICES = metrics.REGISTRY.counter(
+    'housereserv_throttle_notices_total', 'Отправленные уведомления о превышении частоты')
+THROTTLED_USERS = metrics.REGISTRY.gauge(
+    'housereserv_throttle_tracked_users', 'Пользователи с активным счетчиком частоты')
+
+# Через сколько секунд бездействия счетчик пользователя удаляется
+IDLE_SECONDS = 600
+
+NOTICE_TEXT = "⏳ Слишком много запросов. Подождите несколько секунд."
+
+
+class TokenBucket:
+    """Корзина токенов: rate токенов в секунду, не больше burst"""
+
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Через сколько секунд в корзине будет токен (0 - уже есть)"""
+        tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def take(self, now: float) -> bool:
+        """Забрать токен; False, если корзина пуста"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class _UserState:
+    __slots__ = ('bucket', 'last_callback', 'last_callback_at', 'notified')
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket = bucket
+        self.last_callback: Optional[str] = None
+        self.last_callback_at = 0.0
+        self.notified = False
+
+
+class InboundThrottle:
+    """
+    Решает, обрабатывать ли обновление. Повторное нажатие той же кнопки в течение
+    coalesce_seconds склеивается с предыдущим; обновления сверх лимита отбрасываются,
+    а пользователь получает одно уведомление на серию отброшенных обновлений.
+    Лимит 0 отключает соответствующую проверку.
+    """
+
+    def __init__(self, user_rate: float = None, user_burst: float = None,
+                 global_rate: float = None, global_burst: float = None,
+                 coalesce_seconds: float = None):
+        self.user_rate = config.THROTTLE_USER_RATE if user_rate is None else user_rate
+        self.user_burst = config.THROTTLE_USER_BURST if user_burst is None else user_burst
+        global_rate = config.THROTTLE_GLOBAL_RATE if global_rate is None else global_rate
+        global_burst = config.THROTTLE_GLOBAL_BURST if global_burst is None else global_burst
+        self.coalesce_seconds = (config.THROTTLE_COALESCE_SECONDS
+                                 if coalesce_seconds is None else coalesce_seconds)
+        now = time.monotonic()
+        self._global = TokenBucket(global_rate, global_burst, now) if global_rate > 0 else None
+        self._users: Dict[int, _UserState] = {}
+        self._lock = threading.Lock()
+        self._last_cleanup = now
+        THROTTLED_USERS.set_function(lambda: len(self._users))
+
+    def check(self, user_id: int, callback_data: Optional[str] = None,
+              bypass_user_limit: bool = False) -> Tuple[str, bool]:
+        """
+        Проверить обновление пользователя.
+        Возвращает (результат, нужно ли отправить уведомление)
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._cleanup(now)
+            state = self._users.get(user_id)
+            if state is None:
+                state = self._users[user_id] = _UserState(
+                    TokenBucket(self.user_rate, self.user_burst, now))
+            if (callback_data is not None and callback_data == state.last_callback
+                    and now - state.last_callback_at < self.coalesce_seconds):
+                return COALESCED, False
+            # Общий лимит проверяется первым и без списания: отброшенное им обновление
+            # не расходует токен пользователя, а отброшенное по лимиту пользователя - общий
+            allowed = self._global is None or self._global.delay(now) == 0
+            if allowed and not bypass_user_limit and self.user_rate > 0:
+                allowed = state.bucket.take(now)
+            if allowed and self._global is not None:
+                self._global.take(now)
+            if not allowed:
+                notify = not state.notified
+                state.notified = True
+                return DROPPED, notify
+            state.notified = False
+            if callback_data is not None:
+                state.last_callback, state.last_callback_at = callback_data, now
+            return ALLOWED, False
+
+    def _cleanup(self, now: float):
+        """Удалить счетчики давно неактивных пользователей"""
+        if now - self._last_cleanup < IDLE_SECONDS:
+            return
+        self._last_cleanup = now
+        for user_id in [uid for uid, state in self._users.items() if now - state.bucket.updated > IDLE_SECONDS]:
+            del self._users[user_id]
+
+
+async def _notify(update: Update):
+    """Короткое уведомление: ответ на нажатие кнопки или сообщение"""
+    try:
+        if update.callback_query:
+            await update.callback_query.answer(NOTICE_TEXT)
+        elif update.effective_message:
+            await update.effective_message.reply_text(NOTICE_TEXT)
+        THROTTLE_NOTICES.inc()
+    except Exception as e:
+        logger.warning(f"Не удалось отправить уведомление об ограничении: {e}")
+
+
+def install(application: Application, throttle: InboundThrottle = None, group: int = -1) -> InboundThrottle:
+    """Зарегистрировать ограничение частоты перед всеми обработчиками"""
+    throttle = throttle or InboundThrottle()
+
+    async def guard(update: Update, context: ContextTypes.DEFAULT_TYPE):
+        user = update.effective_user
+        if user is None or user.id in config.ADMIN_IDS:
+            THROTTLE_UPDATES.inc(result=ALLOWED)
+            return
+        query = update.callback_query
+        message = update.effective_message
+        # Файлы альбома приходят пачкой и не расходуют лимит пользователя. Встроенные запросы
+        # приходят на каждое нажатие клавиши и отвечаются из кэша: отброшенный последний запрос
+        # оставил бы пользователя с результатами для недописанного текста
+        bypass = bool(message and message.media_group_id) or update.inline_query is not None
+        result, notify = throttle.check(user.id, query.data if query else None, bypass)
+        THROTTLE_UPDATES.inc(result=result)
+        if result == ALLOWED:
+            return
+        if notify:
+            await _notify(update)
+        elif query:
+            # Нажатие кнопки нужно подтвердить, иначе у пользователя останется индикатор загрузки
+            try:
+                await query.answer()
+            except Exception:
+                pass
+        raise ApplicationHandlerStop
+
+    # ApplicationHandlerStop - штатный результат, а не ошибка обработчика, поэтому guard
+    # не оборачивается замером metrics.instrument_handlers
+    guard.__metrics_wrapped__ = True
+    application.add_handler(TypeHandler(Update, guard), group=group)
+    return throttle
@@ -2,18 +2,35 @@
 Обработчики команд для пользователей
 """
 from datetime import datetime
+from typing import List, Tuple
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
-from database import Database
+from storage import Storage
+import holds
+import inline_search
+import media
+import notifications
+import calendar_picker
 from date_utils import parse_date, format_date, get_available_dates, find_nearest_available_dates, format_date_range, validate_date_range
 import config
 
+# Максимум периодов в одном заказе
+MAX_CART_ITEMS = 10
+
+# Объектов на странице результатов поиска
+SEARCH_PAGE_SIZE = 10
+
 
 class UserHandlers:
     """Класс обработчиков пользователя"""
     
-    def __init__(self, db: Database):
+    def __init__(self, db: Storage, media_library: media.MediaLibrary = None,
+                 availability: calendar_picker.AvailabilityCache = None,
+                 inline_results: inline_search.InlineResultCache = None):
         self.db = db
+        self.media = media_library or media.MediaLibrary(db)
+        self.availability = availability or calendar_picker.AvailabilityCache(db)
+        self.inline_results = inline_results or inline_search.InlineResultCache(db)
     
     def _is_admin(self, user_id: int) -> bool:
         """Проверить, является ли пользователь администратором"""
@@ -24,8 +41,23 @@ class UserHandlers:
         user_id = update.effective_user.id
         is_admin = self._is_admin(user_id)
         
+        # Переход из карточки встроенного режима: /start property_<id>
+        if context.args and context.args[0].startswith(inline_search.START_PREFIX):
+            property_id = context.args[0][len(inline_search.START_PREFIX):]
+            property_obj = self.db.get_property(int(property_id)) if property_id.isdigit() else None
+            if property_obj:
+                await update.message.reply_text(
+                    f"🏠 {property_obj.name}",
+                    reply_markup=InlineKeyboardMarkup([
+                        [InlineKeyboardButton("ℹ️ Подробнее", callback_data=f"user_property_{property_obj.id}")],
+                        [InlineKeyboardButton("📅 Забронировать", callback_data=f"user_book_{property_obj.id}")],
+                    ])
+                )
+                return
+        
         keyboard = [
             [InlineKeyboardButton("🏠 Список объектов", callback_data="user_properties")],
+            [InlineKeyboardButton("🔍 Поиск объектов", callback_data="user_search")],
             [InlineKeyboardButton("📅 Мои бронирования", callback_data="user_bookings")]
         ]
         
@@ -75,16 +107,56 @@ class UserHandlers:
         elif data.startswith("user_cancel_booking_"):
             booking_id = int(data.split("_")[-1])
             await self._cancel_booking(query, booking_id)
+        elif data == "user_search":
+            context.user_data['waiting_for_search'] = True
+            await query.edit_message_text(
+                "🔍 Введите слова для поиска по названию и описанию объектов:",
+                reply_markup=InlineKeyboardMarkup([[InlineKeyboardButton("◀️ Назад", callback_data="user_back")]])
+            )
+        elif data.startswith("user_search_"):
+            page = int(data.split("_")[-1])
+            text, reply_markup = self._search_results(context.user_data.get('search_query', ''), page)
+            await query.edit_message_text(text, reply_markup=reply_markup)
         elif data == "user_back":
+            context.user_data.pop('waiting_for_search', None)
             await self._show_main_menu(query, is_admin)
         elif data.startswith("user_available_dates_"):
             property_id = int(data.split("_")[-1])
             await self._show_available_dates_callback(query, property_id, is_admin)
+        elif data.startswith("user_cal_"):
+            _, _, property_id, month = data.split("_")
+            if await self._refresh_calendar(query, int(property_id)):
+                await self._show_calendar(query, int(property_id), int(month), context)
+        elif data.startswith("user_calpick_"):
+            _, _, property_id, day = data.split("_")
+            if await self._refresh_calendar(query, int(property_id)):
+                await self._pick_calendar_day(update, query, int(property_id), day, context)
+        elif data.startswith("user_calreset_"):
+            property_id = int(data.split("_")[-1])
+            context.user_data.pop('booking_checkin', None)
+            if await self._refresh_calendar(query, property_id):
+                await self._show_calendar(query, property_id, None, context)
+        elif data == "user_cart":
+            await self._show_cart(query, context)
+        elif data == "user_cart_clear":
+            context.user_data.pop('booking_cart', None)
+            await query.edit_message_text("🗑 Заказ очищен.", reply_markup=InlineKeyboardMarkup(
+                [[InlineKeyboardButton("🏠 Список объектов", callback_data="user_properties")]]))
+        elif data == "user_cart_checkout":
+            cart = context.user_data.get('booking_cart') or []
+            if not cart:
+                await self._show_cart(query, context)
+                return
+            ranges = [(pid, datetime.combine(start, datetime.min.time()), datetime.combine(end, datetime.min.time()))
+                      for pid, start, end in cart]
+            text = await self._create_bookings(update, context, ranges)
+            await query.edit_message_text(text)
     
     async def _show_main_menu(self, query, is_admin: bool = False):
         """Показать главное меню"""
         keyboard = [
             [InlineKeyboardButton("🏠 Список объектов", callback_data="user_properties")],
+            [InlineKeyboardButton("🔍 Поиск объектов", callback_data="user_search")],
             [InlineKeyboardButton("📅 Мои бронирования", callback_data="user_bookings")]
         ]
         
@@ -120,6 +192,7 @@ class UserHandlers:
                 )
             ])
         
+        keyboard.append([InlineKeyboardButton("🔍 Поиск", callback_data="user_search")])
         keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="user_back")])
         
         # Если администратор, добавляем кнопку для админ-панели
@@ -134,6 +207,63 @@ class UserHandlers:
         
         await query.edit_message_text(text, reply_markup=reply_markup)
     
+    async def search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Команда /search <слова>: поиск объектов по названию и описанию"""
+        if not context.args:
+            context.user_data['waiting_for_search'] = True
+            await update.message.reply_text("🔍 Введите слова для поиска по названию и описанию объектов:")
+            return
+        await self._reply_search(update, context, " ".join(context.args))
+    
+    async def handle_search_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обработка текста поискового запроса"""
+        context.user_data.pop('waiting_for_search', None)
+        await self._reply_search(update, context, update.message.text)
+    
+    async def _reply_search(self, update: Update, context: ContextTypes.DEFAULT_TYPE, text: str):
+        """Сохранить запрос (для листания страниц) и отправить первую страницу результатов"""
+        context.user_data['search_query'] = text.strip()
+        reply, reply_markup = self._search_results(text, 0)
+        await update.message.reply_text(reply, reply_markup=reply_markup)
+    
+    def _search_results(self, text: str, page: int) -> Tuple[str, InlineKeyboardMarkup]:
+        """Страница результатов поиска: текст и клавиатура с объектами и листанием"""
+        # Лишний объект в выборке показывает, что есть следующая страница, без подсчета всех совпадений
+        found = self.db.search_properties(text, limit=SEARCH_PAGE_SIZE + 1, offset=page * SEARCH_PAGE_SIZE)
+        has_next = len(found) > SEARCH_PAGE_SIZE
+        found = found[:SEARCH_PAGE_SIZE]
+        
+        keyboard = [[InlineKeyboardButton(f"🏠 {prop.name}", callback_data=f"user_property_{prop.id}")]
+                    for prop in found]
+        navigation = []
+        if page > 0:
+            navigation.append(InlineKeyboardButton("◀️", callback_data=f"user_search_{page - 1}"))
+        if has_next:
+            navigation.append(InlineKeyboardButton("▶️", callback_data=f"user_search_{page + 1}"))
+        if navigation:
+            keyboard.append(navigation)
+        keyboard.append([InlineKeyboardButton("🔍 Новый поиск", callback_data="user_search")])
+        keyboard.append([InlineKeyboardButton("◀️ Назад", callback_data="user_back")])
+        
+        if not found:
+            reply = f"🔍 По запросу «{text.strip()}» ничего не найдено."
+        else:
+            reply = f"🔍 Результаты по запросу «{text.strip()}»"
+            if page > 0 or has_next:
+                reply += f" (страница {page + 1})"
+            reply += ":\n\n"
+            for prop in found:
+                reply += f"• {prop.name}\n"
+        return reply, InlineKeyboardMarkup(keyboard)
+    
+    async def inline_query(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Встроенный режим: карточки объектов по запросу из кэша результатов"""
+        query = update.inline_query
+        offset = int(query.offset) if query.offset.isdigit() else 0
+        results, next_offset = self.inline_results.page(query.query, offset, context.bot.username)
+        await query.answer(results, cache_time=config.INLINE_CACHE_TIME, is_personal=False,
+                           next_offset=next_offset)
+    
     async def _show_property_info(self, query, property_id: int, is_admin: bool = False):
         """Показать информацию об объекте"""
         property_obj = self.db.get_property(property_id)
@@ -142,8 +272,9 @@ class UserHandlers:
             return
         
         # Получаем фотографии и видео
-        photos = self.db.get_property_photos(property_id)
-        videos = self.db.get_property_videos(property_id)
+        manifest = self.media.get_manifest(property_id)
+        photos = manifest.photo_ids
+        videos = manifest.video_ids
         
         # Получаем забронированные даты
         bookings = self.db.get_property_bookings(property_id)
@@ -208,16 +339,96 @@ class UserHandlers:
         """Начать процесс бронирования"""
         # Сохраняем property_id в user_data
         context.user_data['booking_property_id'] = property_id
+        context.user_data.pop('booking_checkin', None)
+        context.user_data.pop('waiting_for_search', None)
         
-        property_obj = self.db.get_property(property_id)
-        property_name = property_obj.name if property_obj else "объект"
+        if await self._refresh_calendar(query, property_id):
+            await self._show_calendar(query, property_id, None, context)
+    
+    async def _refresh_calendar(self, query, property_id: int) -> bool:
+        """
+        Сверить кэш календаря с версией бронирований объекта (при каждом действии в календаре,
+        чтобы не показывать и не принимать устаревшие даты). False, если объекта нет
+        """
+        if self.availability.refresh(property_id):
+            return True
+        await query.edit_message_text("❌ Объект не найден.")
+        return False
+    
+    async def _show_calendar(self, query, property_id: int, month, context: ContextTypes.DEFAULT_TYPE,
+                             notice: str = None):
+        """Показать календарь выбора даты заезда или выезда"""
+        checkin = context.user_data.get('booking_checkin')
+        if checkin and checkin[0] != property_id:
+            checkin = None
+        checkin_day = checkin[1] if checkin else None
+        if month is None:
+            month = calendar_picker.month_key(checkin_day or datetime.now().date())
+        
+        text = f"{notice}\n\n" if notice else ""
+        text += f"📅 Бронирование: {self.availability.property_name(property_id)}\n\n"
+        if checkin_day:
+            text += f"Заезд: {format_date(checkin_day)}\nВыберите дату выезда (последний день проживания):\n\n"
+        else:
+            text += "Выберите дату заезда. ✖ - занятые дни.\n\n"
+        text += "Можно также ввести даты сообщением: DD.MM.YYYY - DD.MM.YYYY"
         
-        await query.edit_message_text(
-            f"📅 Бронирование: {property_name}\n\n"
-            "Введите даты бронирования в формате:\n"
-            "DD.MM.YYYY - DD.MM.YYYY\n\n"
-            "Например: 01.12.2024 - 05.12.2024"
-        )
+        reply_markup = calendar_picker.build_keyboard(self.availability, property_id, month, checkin_day)
+        await query.edit_message_text(text, reply_markup=reply_markup)
+    
+    async def _pick_calendar_day(self, update: Update, query, property_id: int, day: str,
+                                 context: ContextTypes.DEFAULT_TYPE):
+        """Обработать выбор дня в календаре"""
+        picked = calendar_picker.parse_day(day).date()
+        checkin = context.user_data.get('booking_checkin')
+        if checkin and checkin[0] != property_id:
+            checkin = None
+        context.user_data['booking_property_id'] = property_id
+        
+        # Кнопка со старой клавиатуры: день уже занят или прошел - выбор начинается заново
+        if not calendar_picker.is_selectable(self.availability, property_id, picked,
+                                             checkin[1] if checkin else None):
+            context.user_data.pop('booking_checkin', None)
+            await self._show_calendar(query, property_id, None, context,
+                                      "❌ Эта дата уже недоступна, выберите другую.")
+            return
+        
+        if not checkin:
+            context.user_data['booking_checkin'] = (property_id, picked)
+            await self._show_calendar(query, property_id, calendar_picker.month_key(picked), context)
+            return
+        
+        context.user_data.pop('booking_checkin', None)
+        cart = context.user_data.setdefault('booking_cart', [])
+        notice = None
+        if len(cart) >= MAX_CART_ITEMS:
+            notice = f"❌ В заказе не больше {MAX_CART_ITEMS} периодов."
+        elif any(pid == property_id and start <= picked and end >= checkin[1] for pid, start, end in cart):
+            notice = "❌ Период пересекается с уже выбранным и не добавлен."
+        else:
+            cart.append((property_id, checkin[1], picked))
+        await self._show_cart(query, context, notice)
+    
+    async def _show_cart(self, query, context: ContextTypes.DEFAULT_TYPE, notice: str = None):
+        """Показать выбранные периоды заказа"""
+        cart = context.user_data.get('booking_cart') or []
+        property_id = context.user_data.get('booking_property_id')
+        keyboard = []
+        if cart:
+            text = f"{notice}\n\n" if notice else ""
+            text += "🧾 Ваш заказ:\n\n"
+            for pid, start, end in cart:
+                text += f"🏠 {self.availability.property_name(pid)}\n   📅 {format_date_range(start, end)}\n"
+            text += "\nДобавьте еще периоды или оформите заказ. Все периоды бронируются вместе."
+            keyboard.append([InlineKeyboardButton(f"✅ Оформить ({len(cart)})", callback_data="user_cart_checkout")])
+        else:
+            text = "🧾 Заказ пуст."
+        if property_id:
+            keyboard.append([InlineKeyboardButton("➕ Еще даты", callback_data=f"user_book_{property_id}")])
+        keyboard.append([InlineKeyboardButton("🏠 Другой объект", callback_data="user_properties")])
+        if cart:
+            keyboard.append([InlineKeyboardButton("🗑 Очистить", callback_data="user_cart_clear")])
+        await query.edit_message_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
     
     async def _cancel_booking(self, query, booking_id: int):
         """Отменить бронирование"""
@@ -252,6 +463,8 @@ class UserHandlers:
             text += f"🏠 {prop.name if prop else 'Неизвестно'}\n"
             text += f"   Период: {format_date(booking.start_date)} - {format_date(booking.end_date)}\n"
             text += f"   Статус оплаты: {'✅ Оплачено' if booking.advance_paid else '❌ Не оплачено'}\n"
+            if booking.expires_at:
+                text += f"   ⏳ Бронь до: {holds.format_expiry(booking.expires_at)}\n"
             
             # Получаем контакты администратора
             if prop and prop.admin_id:
@@ -278,38 +491,41 @@ class UserHandlers:
         await query.edit_message_text(text, reply_markup=reply_markup)
     
     async def handle_booking_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обработка текста с датами бронирования"""
-        user_id = update.effective_user.id
-        text = update.message.text.strip()
+        """Обработка текста с датами бронирования (по одному периоду в строке)"""
+        lines = [line.strip() for line in update.message.text.strip().splitlines() if line.strip()]
         
-        # Проверяем формат дат
-        if " - " not in text and " -" not in text and "- " not in text:
-            await update.message.reply_text(
-                "❌ Неверный формат. Используйте: DD.MM.YYYY - DD.MM.YYYY"
-            )
-            return
-        
-        # Парсим даты
-        try:
-            parts = text.replace(" - ", "-").replace(" -", "-").replace("- ", "-").split("-")
-            if len(parts) != 2:
-                raise ValueError
-            
-            start_date = parse_date(parts[0].strip())
-            end_date = parse_date(parts[1].strip())
-            
-            if not validate_date_range(start_date, end_date):
+        ranges = []
+        for line in lines:
+            # Проверяем формат дат
+            if " - " not in line and " -" not in line and "- " not in line:
                 await update.message.reply_text(
-                    "❌ Неверный диапазон дат. Дата начала должна быть раньше или равна дате окончания, "
-                    "и не раньше сегодняшнего дня."
+                    "❌ Неверный формат. Используйте: DD.MM.YYYY - DD.MM.YYYY\n"
+                    "Несколько периодов - по одному в строке."
                 )
                 return
             
-        except ValueError:
-            await update.message.reply_text(
-                "❌ Неверный формат даты. Используйте формат DD.MM.YYYY"
-            )
-            return
+            # Парсим даты
+            try:
+                parts = line.replace(" - ", "-").replace(" -", "-").replace("- ", "-").split("-")
+                if len(parts) != 2:
+                    raise ValueError
+                
+                start_date = parse_date(parts[0].strip())
+                end_date = parse_date(parts[1].strip())
+                
+                if not validate_date_range(start_date, end_date):
+                    await update.message.reply_text(
+                        f"❌ Неверный диапазон дат: {line}. Дата начала должна быть раньше или равна "
+                        "дате окончания, и не раньше сегодняшнего дня."
+                    )
+                    return
+                
+            except ValueError:
+                await update.message.reply_text(
+                    f"❌ Неверный формат даты: {line}. Используйте формат DD.MM.YYYY"
+                )
+                return
+            ranges.append((start_date, end_date))
         
         # Получаем property_id из user_data
         property_id = context.user_data.get('booking_property_id')
@@ -321,78 +537,95 @@ class UserHandlers:
             )
             return
         
-        # Проверяем доступность дат
-        if not self.db.check_date_availability(property_id, start_date, end_date):
-            # Находим ближайшие доступные даты
-            nearest_dates = find_nearest_available_dates(property_id, start_date, end_date, self.db)
-            
-            text = "❌ Выбранные даты уже забронированы.\n\n"
-            
-            if nearest_dates:
-                text += "📅 Ближайшие доступные периоды:\n"
-                for period_start, period_end in nearest_dates[:5]:  # Показываем первые 5
-                    text += f"   • {format_date_range(period_start, period_end)}\n"
-            else:
-                text += "К сожалению, свободных дат в ближайшее время нет."
-            
-            await update.message.reply_text(text)
+        if len(ranges) > MAX_CART_ITEMS:
+            await update.message.reply_text(f"❌ В одном заказе не больше {MAX_CART_ITEMS} периодов.")
             return
         
-        # Создаем бронирование
+        text = await self._create_bookings(
+            update, context, [(property_id, start_date, end_date) for start_date, end_date in ranges])
+        await update.message.reply_text(text)
+    
+    async def _create_bookings(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
+                               ranges: List[Tuple[int, datetime, datetime]]) -> str:
+        """
+        Забронировать все периоды одной транзакцией (все или ничего) и отправить
+        администраторам по одному уведомлению на весь заказ. Возвращает текст ответа
+        """
+        user_id = update.effective_user.id
         username = update.effective_user.username
         phone = None  # Можно добавить запрос телефона
         
-        booking_id = self.db.add_booking(
-            property_id, user_id, username, phone, start_date, end_date
-        )
-        
-        if booking_id:
-            property_obj = self.db.get_property(property_id)
+        expires_at = holds.hold_expires_at()
+        booking_ids, conflicts = self.db.add_bookings_batch(user_id, username, phone, ranges, expires_at)
+        
+        if conflicts:
+            if len(ranges) == 1 and conflicts[0][1] == 'даты уже забронированы':
+                property_id, start_date, end_date = ranges[0]
+                # Находим ближайшие доступные даты
+                nearest_dates = find_nearest_available_dates(property_id, start_date, end_date, self.db)
+                
+                text = "❌ Выбранные даты уже забронированы.\n\n"
+                
+                if nearest_dates:
+                    text += "📅 Ближайшие доступные периоды:\n"
+                    for period_start, period_end in nearest_dates[:5]:  # Показываем первые 5
+                        text += f"   • {format_date_range(period_start, period_end)}\n"
+                else:
+                    text += "К сожалению, свободных дат в ближайшее время нет."
+                
+                return text
             
-            # Очищаем состояние
-            context.user_data.pop('booking_property_id', None)
-            
-            # Отправляем уведомление администраторам
-            await self._notify_admins(update, context, property_obj, start_date, end_date, username)
-            
-            await update.message.reply_text(
-                f"✅ Бронирование успешно создано!\n\n"
-                f"🏠 Объект: {property_obj.name}\n"
-                f"📅 Период: {format_date_range(start_date, end_date)}\n\n"
-                f"Используйте /my_bookings для просмотра ваших бронирований."
-            )
-        else:
-            await update.message.reply_text("❌ Ошибка при создании бронирования.")
+            text = "❌ Заказ не оформлен, ни один период не забронирован:\n\n"
+            for (property_id, start_date, end_date), reason in conflicts:
+                text += (f"🏠 {self.availability.property_name(property_id)}, "
+                         f"{format_date_range(start_date, end_date)}: {reason}\n")
+            text += "\nИзмените выбор и попробуйте снова."
+            return text
+        
+        if not booking_ids:
+            return "❌ Ошибка при создании бронирования."
+        
+        items = []
+        for property_id, start_date, end_date in ranges:
+            self.availability.invalidate(property_id)
+            items.append((self.db.get_property(property_id), start_date, end_date))
+        
+        # Очищаем состояние
+        context.user_data.pop('booking_property_id', None)
+        context.user_data.pop('booking_cart', None)
+        
+        # Отправляем одно уведомление на заказ каждому администратору
+        await self._notify_admins(update, context, items, username)
+        
+        title = "✅ Бронирование успешно создано!" if len(items) == 1 else "✅ Бронирования успешно созданы!"
+        text = f"{title}\n\n"
+        for property_obj, start_date, end_date in items:
+            text += f"🏠 Объект: {property_obj.name}\n📅 Период: {format_date_range(start_date, end_date)}\n\n"
+        if expires_at:
+            text += (f"⏳ Бронь действует до {holds.format_expiry(expires_at)}. "
+                     f"Если аванс не будет внесен к этому сроку, бронь снимется автоматически.\n\n")
+        return text + "Используйте /my_bookings для просмотра ваших бронирований."
     
     async def _notify_admins(self, update: Update, context: ContextTypes.DEFAULT_TYPE,
-                            property_obj, start_date: datetime, end_date: datetime, username: str):
-        """Отправить уведомление администраторам о новом бронировании"""
-        admins = self.db.get_all_admins()
-        
-        message = (
-            f"🔔 Новое бронирование!\n\n"
-            f"🏠 Объект: {property_obj.name}\n"
-            f"📅 Период: {format_date_range(start_date, end_date)}\n"
-            f"👤 Пользователь: @{username if username else 'не указан'}\n"
-            f"🆔 ID пользователя: {update.effective_user.id}"
-        )
-        
-        # Отправляем уведомления всем администраторам
-        for admin in admins:
-            try:
-                await context.bot.send_message(
-                    chat_id=admin.user_id,
-                    text=message
-                )
-            except Exception as e:
-                print(f"Ошибка при отправке уведомления администратору {admin.user_id}: {e}")
-        
-        # Также отправляем всем администраторам из config.ADMIN_IDS
-        for admin_id in config.ADMIN_IDS:
-            try:
-                await context.bot.send_message(chat_id=admin_id, text=message)
-            except Exception:
-                pass
+                            items: List[Tuple[object, datetime, datetime]], username: str):
+        """
+        Уведомить о новых бронированиях заказа владельцев объектов и наблюдателей:
+        каждый получатель получает одно сообщение только о касающихся его объектах
+        """
+        routes = notifications.route(self.db, [property_obj.id for property_obj, _, _ in items])
+        notifications.NOTIFICATION_FANOUT.observe(len(routes))
+        
+        for admin_id, property_ids in routes.items():
+            own_items = [item for item in items if item[0].id in property_ids]
+            message = ("🔔 Новое бронирование!\n\n" if len(own_items) == 1
+                       else f"🔔 Новые бронирования ({len(own_items)})!\n\n")
+            for property_obj, start_date, end_date in own_items:
+                message += f"🏠 Объект: {property_obj.name}\n📅 Период: {format_date_range(start_date, end_date)}\n"
+            message += (
+                f"👤 Пользователь: @{username if username else 'не указан'}\n"
+                f"🆔 ID пользователя: {update.effective_user.id}"
+            )
+            await notifications.send(context.bot, admin_id, message)
     
     async def _show_available_dates_callback(self, query, property_id: int, is_admin: bool = False):
         """Показать свободные даты для объекта через callback"""